@@ -22,7 +22,7 @@ from collection_manager.services import (CollectionProcessor,
                                          CollectionWatcher, MessagePublisher)
 from collection_manager.services.history_manager import (
     FileIngestionHistoryBuilder, SolrIngestionHistoryBuilder,
-    md5sum_from_filepath)
+    SignatureCalculator, SqliteIngestionHistoryBuilder)
 
 
 log_level = os.getenv('LOG_LEVEL', 'INFO')
@@ -73,6 +73,28 @@ def get_args() -> argparse.Namespace:
     history_group.add_argument("--history-url",
                                metavar="URL",
                                help="URL to ingestion history solr database")
+    parser.add_argument('--history-backend',
+                        default='csv',
+                        choices=['csv', 'sqlite'],
+                        help='Format of the ingestion history kept in --history-path: a CSV file per dataset, or an '
+                             'indexed SQLite database per dataset, which is not loaded in memory and is never '
+                             'rewritten. The SQLite history imports the CSV history of a dataset the first time it is '
+                             'opened. (Default: csv)')
+    parser.add_argument('--signature',
+                        default='md5',
+                        choices=['md5', 'blake2b', 'xxhash'],
+                        help='Hash of the granule contents recorded in the ingestion history. blake2b and xxhash are '
+                             'faster than md5, but an existing history recorded with another hash sees all its '
+                             'granules as changed. xxhash requires the xxhash package. Not used with --s3-bucket, '
+                             'where granules are identified by their modified time. (Default: md5)')
+    parser.add_argument('--history-cache',
+                        default='none',
+                        choices=['none', 'map', 'bloom'],
+                        help='How much of the Solr ingestion history (--history-url) of each dataset is loaded in '
+                             'memory before its first lookup, and kept up to date with the pushes: "map" loads every '
+                             'granule and its signature so that lookups never query Solr, "bloom" loads a Bloom '
+                             'filter of the granule names so that only the granules that may have been ingested are '
+                             'looked up in Solr, and "none" looks up every granule in Solr. (Default: none)')
     parser.add_argument('--rabbitmq-host',
                         default='localhost',
                         metavar='HOST',
@@ -96,6 +118,52 @@ def get_args() -> argparse.Namespace:
     parser.add_argument('--s3-bucket',
                         metavar='S3-BUCKET',
                         help='Optional name of an AWS S3 bucket where granules are stored. If this option is set, then all collections to be scanned must have their granules on S3, not the local filesystem.')
+    parser.add_argument('--scan-threads',
+                        default='8',
+                        metavar='THREADS',
+                        help='Number of threads listing directories concurrently when scanning the granules of a '
+                             'new or updated collection. (Default: 8)')
+    parser.add_argument('--scan-concurrency',
+                        default='16',
+                        metavar='TASKS',
+                        help='Number of scanned granules checked against the ingestion history and published '
+                             'concurrently. Each task checks the granules waiting to be checked together, up to '
+                             '--scan-batch-size of them. (Default: 16)')
+    parser.add_argument('--scan-batch-size',
+                        default='500',
+                        metavar='GRANULES',
+                        help='Largest number of scanned granules checked against the ingestion history in a single '
+                             'lookup. (Default: 500)')
+    parser.add_argument('--scan-snapshot-path',
+                        metavar='PATH',
+                        help='Optional path to a local database file in which the state of the collection directories '
+                             'is kept between restarts, so that only the directories changed since the last scan are '
+                             'listed again. Not used with --s3-bucket.')
+    parser.add_argument('--observer',
+                        default='polling',
+                        choices=['polling', 'inotify', 'auto'],
+                        help='How local granule directories are watched for new and modified granules: "polling" '
+                             're-reads the directory trees periodically, "inotify" uses Linux kernel events, and '
+                             '"auto" uses inotify for directories on local filesystems and polling for NFS and other '
+                             'network filesystems. (Default: polling)')
+    parser.add_argument('--s3-full-listing-interval',
+                        metavar='SECONDS',
+                        help='Optional number of seconds between full listings of the S3 prefixes. In between, S3 '
+                             'polls only list the objects whose keys sort after the latest partition (the deepest '
+                             '"directory" of the greatest key) of each prefix, which finds new granules of '
+                             'date-partitioned collections; objects added to or modified in older partitions are found '
+                             'by the next full listing. By default, every poll is a full listing.')
+    parser.add_argument('--s3-event-queue',
+                        metavar='QUEUE',
+                        help='Optional SQS queue URL receiving the S3 event notifications of --s3-bucket (directly or '
+                             'through SNS), or path of a local file with one notification per line. New granules are '
+                             'then found from the notifications, and the bucket is only listed every '
+                             '--s3-reconciliation-interval seconds to catch missed notifications.')
+    parser.add_argument('--s3-reconciliation-interval',
+                        default='3600',
+                        metavar='SECONDS',
+                        help='Number of seconds between listings of the S3 prefixes when --s3-event-queue is set. '
+                             '(Default: 3600)')
 
     return parser.parse_args()
 
@@ -104,14 +172,18 @@ async def main():
     try:
         options = get_args()
 
-        signature_fun = None if options.s3_bucket else md5sum_from_filepath
+        signature_fun = None if options.s3_bucket else SignatureCalculator(algorithm=options.signature)
 
-        if options.history_path:
+        if options.history_path and options.history_backend == 'sqlite':
+            history_manager_builder = SqliteIngestionHistoryBuilder(history_path=options.history_path,
+                                                                    signature_fun=signature_fun)
+        elif options.history_path:
             history_manager_builder = FileIngestionHistoryBuilder(history_path=options.history_path,
                                                                   signature_fun=signature_fun)
         else:
             history_manager_builder = SolrIngestionHistoryBuilder(solr_url=options.history_url,
-                                                                  signature_fun=signature_fun)
+                                                                  signature_fun=signature_fun,
+                                                                  history_cache=options.history_cache)
         async with MessagePublisher(host=options.rabbitmq_host,
                                     username=options.rabbitmq_username,
                                     password=options.rabbitmq_password,
@@ -120,16 +192,29 @@ async def main():
                                                        history_manager_builder=history_manager_builder)
             collection_watcher = CollectionWatcher(collections_path=options.collections_path,
                                                    granule_updated_callback=collection_processor.process_granule,
+                                                   granules_updated_callback=collection_processor.process_granules,
                                                    dataset_added_callback=collection_processor.add_plugin_collection,
                                                    collections_refresh_interval=int(options.refresh),
-                                                   s3_bucket=options.s3_bucket)
-
-            await collection_watcher.start_watching()
-            while True:
-                try:
-                    await asyncio.sleep(1)
-                except KeyboardInterrupt:
-                    return
+                                                   s3_bucket=options.s3_bucket,
+                                                   scan_threads=int(options.scan_threads),
+                                                   scan_concurrency=int(options.scan_concurrency),
+                                                   scan_batch_size=int(options.scan_batch_size),
+                                                   scan_snapshot_path=options.scan_snapshot_path,
+                                                   observer=options.observer,
+                                                   s3_full_listing_interval=float(options.s3_full_listing_interval)
+                                                   if options.s3_full_listing_interval else None,
+                                                   s3_event_queue=options.s3_event_queue,
+                                                   s3_reconciliation_interval=float(options.s3_reconciliation_interval))
+
+            try:
+                await collection_watcher.start_watching()
+                while True:
+                    try:
+                        await asyncio.sleep(1)
+                    except KeyboardInterrupt:
+                        return
+            finally:
+                await collection_processor.close()
 
     except Exception as e:
         logger.exception(e)
@@ -16,7 +16,7 @@
 import json
 import logging
 import os.path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 
 import yaml
 from collection_manager.entities import Collection
@@ -55,7 +55,38 @@ class CollectionProcessor:
                                                                   modified_time,
                                                                   collection.date_from,
                                                                   collection.date_to)
+        await self._publish_granule(granule, modified_time, granule_status, collection, history_manager)
 
+    async def process_granules(self, granules: List[Tuple[str, int]], collection: Collection):
+        """
+        Determine which of several granules need to be ingested, looking their statuses up in the ingestion history
+        together, and publish a RabbitMQ message for each of them.
+        :param granules: (path, modified time) of each granule file
+        :param collection: A Collection against which to evaluate the granules
+        :return: None
+        """
+        supported_granules = []
+        for granule, modified_time in granules:
+            if self._file_supported(granule):
+                supported_granules.append((granule, modified_time))
+            else:
+                logger.warning(f'Tried to process unsupported file {granule}. Skipping.')
+        if not supported_granules:
+            return
+
+        history_manager = self._get_history_manager(collection.dataset_id)
+        granule_statuses = await history_manager.get_granule_statuses(supported_granules,
+                                                                      collection.date_from,
+                                                                      collection.date_to)
+        for (granule, modified_time), granule_status in zip(supported_granules, granule_statuses):
+            await self._publish_granule(granule, modified_time, granule_status, collection, history_manager)
+
+    async def _publish_granule(self,
+                               granule: str,
+                               modified_time: int,
+                               granule_status: GranuleStatus,
+                               collection: Collection,
+                               history_manager: IngestionHistory):
         if granule_status is GranuleStatus.DESIRED_FORWARD_PROCESSING:
             logger.info(f"New granule '{granule}' detected for forward-processing ingestion "
                         f"in collection '{collection.dataset_id}'.")
@@ -76,6 +107,13 @@ class CollectionProcessor:
         await self._publisher.publish_message(body=dataset_config, priority=use_priority)
         await history_manager.push(granule, modified_time)
 
+    async def close(self):
+        """
+        Flush the records buffered by the ingestion histories, before the collection manager exits.
+        """
+        for history_manager in self._history_manager_cache.values():
+            await history_manager.flush()
+
     def add_plugin_collection(self, collection: Collection):
         history_manager = self._get_history_manager(None)
 
@@ -16,13 +16,22 @@
 import asyncio
 from datetime import datetime
 from collection_manager.entities.Collection import CollectionStorageType, Collection
+from collection_manager.services.GranuleScanner import (DEFAULT_BATCH_SIZE, DEFAULT_CALLBACK_CONCURRENCY,
+                                                        DEFAULT_SCAN_THREADS, GranuleScanner)
+from collection_manager.services.InotifyObserver import InotifyObserver
+from collection_manager.services.S3NotificationObserver import (DEFAULT_RECONCILIATION_INTERVAL,
+                                                                S3NotificationObserver)
 from collection_manager.services.S3Observer import S3Event, S3Observer
+from collection_manager.services.ScanSnapshot import ScanSnapshot
+import dataclasses
+import hashlib
+import json
 import logging
 import os
 import time
 from collections import defaultdict
-from glob import glob
-from typing import Awaitable, Callable, Dict, List, Optional, Set
+from functools import partial
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
 
 import yaml
 from collection_manager.entities.exceptions import (CollectionConfigFileNotFoundError,
@@ -44,17 +53,46 @@ class CollectionWatcher:
                  granule_updated_callback: Callable[[str, Collection], Awaitable],
                  dataset_added_callback: Callable[[Collection], None],
                  s3_bucket: Optional[str] = None,
-                 collections_refresh_interval: float = 30):
+                 collections_refresh_interval: float = 30,
+                 scan_threads: int = DEFAULT_SCAN_THREADS,
+                 scan_concurrency: int = DEFAULT_CALLBACK_CONCURRENCY,
+                 scan_snapshot_path: Optional[str] = None,
+                 observer: str = 'polling',
+                 s3_full_listing_interval: Optional[float] = None,
+                 s3_event_queue: Optional[str] = None,
+                 s3_reconciliation_interval: float = DEFAULT_RECONCILIATION_INTERVAL,
+                 granules_updated_callback: Optional[Callable[[List[Tuple[str, int]], Collection], Awaitable]] = None,
+                 scan_batch_size: int = DEFAULT_BATCH_SIZE):
         if not os.path.isabs(collections_path):
             raise RelativePathError("Collections config  path must be an absolute path.")
 
         self._collections_path = collections_path
         self._granule_updated_callback = granule_updated_callback
+        # Scans pass the granules they find to this callback in batches, when it is set.
+        self._granules_updated_callback = granules_updated_callback
+        self._scan_batch_size = scan_batch_size
         self._dataset_added_callback = dataset_added_callback
         self._collections_refresh_interval = collections_refresh_interval
 
         self._collections_by_dir: Dict[str, Set[Collection]] = defaultdict(set)
-        self._observer = S3Observer(s3_bucket, initial_scan=True) if s3_bucket else Observer()
+        if observer not in ('polling', 'inotify', 'auto'):
+            raise ValueError(f"Unknown observer '{observer}'; expected 'polling', 'inotify' or 'auto'")
+        if s3_bucket and s3_event_queue:
+            self._observer = S3NotificationObserver(s3_bucket, s3_event_queue, initial_scan=True,
+                                                    reconciliation_interval=s3_reconciliation_interval)
+        elif s3_bucket:
+            self._observer = S3Observer(s3_bucket, initial_scan=True, full_listing_interval=s3_full_listing_interval)
+        elif observer == 'inotify':
+            self._observer = InotifyObserver()
+        else:
+            self._observer = Observer()
+        # In auto mode, directories on local filesystems are watched with inotify and the others are polled.
+        auto_inotify = observer == 'auto' and not s3_bucket and InotifyObserver.available()
+        self._inotify_observer = InotifyObserver() if auto_inotify else None
+        # The snapshot makes the scan that follows a restart incremental; it is not used for S3 collections.
+        snapshot = ScanSnapshot(scan_snapshot_path) if scan_snapshot_path and not s3_bucket else None
+        self._scanner = GranuleScanner(scan_threads=scan_threads, callback_concurrency=scan_concurrency,
+                                       snapshot=snapshot)
 
         self._granule_watches = set()
 
@@ -74,6 +112,8 @@ class CollectionWatcher:
             await self._observer.start()
         else:
             self._observer.start()
+        if self._inotify_observer is not None:
+            self._inotify_observer.start()
 
     def _collections(self) -> Set[Collection]:
         """
@@ -138,19 +178,35 @@ class CollectionWatcher:
     async def _call_callback_for_all_granules(self, collections: List[Collection]):
         logger.info(f"Scanning files for {len(collections)} collections...")
         start = time.perf_counter()
+        file_count = 0
         for collection in collections:
-            for granule_path in self._get_files_at_path(collection.path):
-                modified_time = int(os.path.getmtime(granule_path))
-                await self._granule_updated_callback(granule_path, modified_time, collection)
-        logger.info(f"Finished scanning files in {time.perf_counter() - start} seconds.")
-
-    def _get_files_at_path(self, path: str) -> List[str]:
-        if os.path.isfile(path):
-            return [path]
-        elif os.path.isdir(path):
-            return [f for f in glob(path + '/**', recursive=True) if os.path.isfile(f)]
-        else:
-            return [f for f in glob(path, recursive=True) if os.path.isfile(f)]
+            if self._granules_updated_callback is not None:
+                callback = partial(self._granules_updated_callback, collection=collection)
+                file_count += await self._scanner.scan_batches(collection.path,
+                                                               callback,
+                                                               batch_size=self._scan_batch_size,
+                                                               scope=collection.dataset_id,
+                                                               fingerprint=self._collection_fingerprint(collection))
+                continue
+
+            callback = partial(self._call_granule_updated_callback, collection=collection)
+            file_count += await self._scanner.scan(collection.path,
+                                                   callback,
+                                                   scope=collection.dataset_id,
+                                                   fingerprint=self._collection_fingerprint(collection))
+        logger.info(f"Finished scanning {file_count} files in {time.perf_counter() - start} seconds.")
+
+    @staticmethod
+    def _collection_fingerprint(collection: Collection) -> str:
+        # Any change of the collection configuration can change which of its granules are desired, so it invalidates
+        # the scan snapshot. Frozensets are sorted, since their iteration order changes from one run to the next.
+        fields = {field.name: getattr(collection, field.name) for field in dataclasses.fields(collection)}
+        canonical = json.dumps({name: sorted(value) if isinstance(value, frozenset) else value
+                                for name, value in fields.items()}, sort_keys=True, default=str)
+        return hashlib.blake2b(canonical.encode('utf-8'), digest_size=16).hexdigest()
+
+    async def _call_granule_updated_callback(self, granule_path: str, modified_time: int, collection: Collection):
+        await self._granule_updated_callback(granule_path, modified_time, collection)
 
     async def _reload_and_reschedule(self):
         try:
@@ -167,8 +223,8 @@ class CollectionWatcher:
             logger.error(e)
 
     def _unschedule_watches(self):
-        for watch in self._granule_watches:
-            self._observer.unschedule(watch)
+        for observer, watch in self._granule_watches:
+            observer.unschedule(watch)
         self._granule_watches.clear()
 
     def _schedule_watches(self):
@@ -180,13 +236,29 @@ class CollectionWatcher:
             # if one is already scheduled for the same directory
             try:
                 if isinstance(self._observer, S3Observer):
-                    self._granule_watches.add(self._observer.schedule(granule_event_handler, directory))
+                    self._granule_watches.add((self._observer, self._observer.schedule(granule_event_handler,
+                                                                                       directory)))
                 else:
-                    self._granule_watches.add(self._observer.schedule(granule_event_handler, directory, recursive=True))
+                    observer = self._observer_for_directory(directory)
+                    try:
+                        watch = observer.schedule(granule_event_handler, directory, recursive=True)
+                    except OSError as e:
+                        # e.g. the inotify watch limit was reached
+                        if observer is self._observer or isinstance(e, (FileNotFoundError, NotADirectoryError)):
+                            raise
+                        logger.warning(f"Could not watch {directory} with inotify ({e}); polling it instead.")
+                        observer = self._observer
+                        watch = observer.schedule(granule_event_handler, directory, recursive=True)
+                    self._granule_watches.add((observer, watch))
             except (FileNotFoundError, NotADirectoryError):
                 bad_collection_names = ' and '.join([col.dataset_id for col in collections])
                 logger.error(f"Granule directory {directory} does not exist. Ignoring {bad_collection_names}.")
 
+    def _observer_for_directory(self, directory: str):
+        if self._inotify_observer is not None and InotifyObserver.supports(directory):
+            return self._inotify_observer
+        return self._observer
+
     @classmethod
     async def _run_periodically(cls,
                                 loop: Optional[asyncio.AbstractEventLoop],
@@ -240,6 +312,8 @@ class _GranuleEventHandler(FileSystemEventHandler):
                         modified_time = int(event.modified_time.timestamp())
                     else:
                         modified_time = int(os.path.getmtime(path))
-                    self._loop.create_task(self._callback(path, modified_time, collection))
+                    # Observers other than the S3 one call handlers from their own thread.
+                    self._loop.call_soon_threadsafe(self._loop.create_task,
+                                                    self._callback(path, modified_time, collection))
             except IsADirectoryError:
                 return
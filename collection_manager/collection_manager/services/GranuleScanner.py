@@ -0,0 +1,280 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import logging
+import os
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from glob import glob
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+from collection_manager.services.ScanSnapshot import ScanSnapshot
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCAN_THREADS = 8
+DEFAULT_CALLBACK_CONCURRENCY = 16
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BATCH_SIZE = 500
+
+# (path, modified time in seconds)
+ScannedFile = Tuple[str, int]
+
+# (path, (st_dev, st_ino), modified time in nanoseconds)
+ScannedDirectory = Tuple[str, Tuple[int, int], int]
+
+
+class GranuleScanner:
+    """
+    Lists the files under a collection path and calls a callback for each of them.
+
+    Directories are listed concurrently with os.scandir on a thread pool, reusing the file type reported by the
+    directory entries so that each file costs a single stat (for its modified time). Files are streamed through a
+    bounded queue to a pool of callback tasks, so neither the listing nor the callbacks have to wait for the other to
+    finish, and memory stays bounded however large the tree is.
+
+    With scan_batches(), each callback task takes up to batch_size of the files waiting in the queue at once, so that
+    the callback can handle them together (e.g. look them up in the ingestion history in a single request).
+
+    Like glob(path + '/**'), hidden files and directories are skipped and symbolic links are followed.
+
+    With a ScanSnapshot, directory scans are incremental: directories whose modified time is the one recorded at the
+    previous complete scan are not listed, and only the files that are new or whose modified time or size changed are
+    passed to the callback.
+    """
+
+    def __init__(self,
+                 scan_threads: int = DEFAULT_SCAN_THREADS,
+                 callback_concurrency: int = DEFAULT_CALLBACK_CONCURRENCY,
+                 queue_size: int = DEFAULT_QUEUE_SIZE,
+                 snapshot: Optional[ScanSnapshot] = None):
+        self._scan_threads = max(1, int(scan_threads))
+        self._callback_concurrency = max(1, int(callback_concurrency))
+        self._queue_size = queue_size
+        self._snapshot = snapshot
+
+    async def scan(self,
+                   path: str,
+                   callback: Callable[[str, int], Awaitable],
+                   scope: Optional[str] = None,
+                   fingerprint: str = '') -> int:
+        """
+        Awaits callback(path, modified_time) for every file at the given path, which can be a file, a directory
+        (scanned recursively) or a glob pattern. Returns the number of files passed to the callback.
+
+        :param scope: the name under which the snapshot of the directory is kept. Scans without a scope, or of
+                      paths that are not directories, are always complete.
+        :param fingerprint: the snapshot of the scope is only used by scans with the same fingerprint.
+        """
+        async def call_for_each(files: List[ScannedFile]):
+            for scanned_file in files:
+                await callback(*scanned_file)
+
+        return await self.scan_batches(path, call_for_each, batch_size=1, scope=scope, fingerprint=fingerprint)
+
+    async def scan_batches(self,
+                           path: str,
+                           callback: Callable[[List[ScannedFile]], Awaitable],
+                           batch_size: int = DEFAULT_BATCH_SIZE,
+                           scope: Optional[str] = None,
+                           fingerprint: str = '') -> int:
+        """
+        Like scan(), but awaits callback(files) with lists of up to batch_size (path, modified_time) tuples. Batches
+        are not held back to fill up: each holds the files that were waiting in the queue when it was taken.
+        """
+        snapshot = self._snapshot if scope is not None and os.path.isdir(path) else None
+        usable = snapshot.begin(scope, fingerprint) if snapshot is not None else False
+        visited = set()
+
+        queue = asyncio.Queue(maxsize=self._queue_size)
+        producer = asyncio.create_task(self._produce(path, queue, snapshot, scope, usable, visited))
+        batch_size = max(1, int(batch_size))
+        consumers = [asyncio.create_task(self._consume(queue, callback, batch_size))
+                     for _ in range(self._callback_concurrency)]
+        tasks = [producer, *consumers]
+
+        try:
+            # A failing callback stops the scan, instead of leaving the producer blocked on a full queue.
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if snapshot is not None:
+            # Only a scan whose files have all been handled by the callback can be trusted by the next one.
+            snapshot.finish(scope, fingerprint, visited)
+        return producer.result()
+
+    async def _produce(self,
+                       path: str,
+                       queue: asyncio.Queue,
+                       snapshot: Optional[ScanSnapshot],
+                       scope: Optional[str],
+                       usable: bool,
+                       visited: Set[str]) -> int:
+        with ThreadPoolExecutor(max_workers=self._scan_threads, thread_name_prefix='granule-scanner') as executor:
+            count = await self._produce_files(path, queue, executor, snapshot, scope, usable, visited)
+        for _ in range(self._callback_concurrency):
+            await queue.put(None)
+        return count
+
+    async def _produce_files(self,
+                             path: str,
+                             queue: asyncio.Queue,
+                             executor: ThreadPoolExecutor,
+                             snapshot: Optional[ScanSnapshot],
+                             scope: Optional[str],
+                             usable: bool,
+                             visited: Set[str]) -> int:
+        loop = asyncio.get_running_loop()
+
+        if os.path.isfile(path):
+            return await type(self)._put_all(queue, [(path, int(os.path.getmtime(path)))])
+        if not os.path.isdir(path):
+            files = await loop.run_in_executor(executor, type(self)._glob_files, path)
+            return await type(self)._put_all(queue, files)
+
+        count = 0
+        root_stat = os.stat(path)
+        visited_keys = {(root_stat.st_dev, root_stat.st_ino)}
+        visited.add(path)
+        pending = {}
+        # (path, parent, modified time in nanoseconds)
+        directories = [(path, None, root_stat.st_mtime_ns)]
+
+        while directories or pending:
+            while directories and len(pending) < self._scan_threads:
+                directory, parent, mtime_ns = directories.pop()
+                if usable and snapshot.directory_mtime(scope, directory) == mtime_ns:
+                    future = loop.run_in_executor(executor, type(self)._stat_directories,
+                                                  snapshot.subdirectories(scope, directory))
+                    pending[future] = (directory, parent, mtime_ns, False)
+                else:
+                    future = loop.run_in_executor(executor, type(self)._list_directory, directory)
+                    pending[future] = (directory, parent, mtime_ns, True)
+
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                directory, parent, mtime_ns, listed = pending.pop(future)
+                if listed:
+                    files, subdirectories = future.result()
+                    if snapshot is not None:
+                        files = type(self)._changed_files(snapshot, scope, directory, parent, mtime_ns, files, usable)
+                else:
+                    files, subdirectories = [], future.result()
+
+                for subdirectory, key, subdirectory_mtime_ns in subdirectories:
+                    if key not in visited_keys:
+                        visited_keys.add(key)
+                        visited.add(subdirectory)
+                        directories.append((subdirectory, directory, subdirectory_mtime_ns))
+                count += await type(self)._put_all(queue, [(file_path, mtime) for file_path, mtime, _ in files])
+
+        return count
+
+    @staticmethod
+    def _changed_files(snapshot: ScanSnapshot,
+                       scope: str,
+                       directory: str,
+                       parent: Optional[str],
+                       mtime_ns: int,
+                       files: List[Tuple[str, int, int]],
+                       usable: bool) -> List[Tuple[str, int, int]]:
+        """
+        Records a listed directory in the snapshot and returns its files that are not in the previous snapshot, or
+        whose modified time or size changed since.
+        """
+        previous = snapshot.files(scope, directory) if usable else {}
+        snapshot.record_directory(scope, directory, parent, mtime_ns,
+                                  [(os.path.basename(file_path), mtime, size) for file_path, mtime, size in files])
+        return [(file_path, mtime, size) for file_path, mtime, size in files
+                if previous.get(os.path.basename(file_path)) != (mtime, size)]
+
+    @staticmethod
+    async def _put_all(queue: asyncio.Queue, files: List[ScannedFile]) -> int:
+        for scanned_file in files:
+            await queue.put(scanned_file)
+        return len(files)
+
+    @staticmethod
+    async def _consume(queue: asyncio.Queue, callback: Callable[[List[ScannedFile]], Awaitable], batch_size: int):
+        while True:
+            scanned_file = await queue.get()
+            if scanned_file is None:
+                return
+
+            batch = [scanned_file]
+            while len(batch) < batch_size and not queue.empty():
+                scanned_file = queue.get_nowait()
+                if scanned_file is None:
+                    # Every consumer gets its own end marker, so this one is done after its last batch.
+                    await callback(batch)
+                    return
+                batch.append(scanned_file)
+            await callback(batch)
+
+    @staticmethod
+    def _list_directory(directory: str) -> Tuple[List[Tuple[str, int, int]], List[ScannedDirectory]]:
+        files = []
+        subdirectories = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    try:
+                        if entry.is_file():
+                            file_stat = entry.stat()
+                            files.append((entry.path, int(file_stat.st_mtime), file_stat.st_size))
+                        elif entry.is_dir():
+                            directory_stat = entry.stat()
+                            subdirectories.append((entry.path, (directory_stat.st_dev, directory_stat.st_ino),
+                                                   directory_stat.st_mtime_ns))
+                    except OSError as e:
+                        # The entry was removed or is a broken link.
+                        logger.debug(f'Skipping {entry.path}: {e}')
+        except OSError as e:
+            logger.warning(f'Could not list directory {directory}: {e}')
+        return files, subdirectories
+
+    @staticmethod
+    def _glob_files(pattern: str) -> List[ScannedFile]:
+        files = []
+        for path in glob(pattern, recursive=True):
+            try:
+                file_stat = os.stat(path)
+            except OSError:
+                continue
+            if stat.S_ISREG(file_stat.st_mode):
+                files.append((path, int(file_stat.st_mtime)))
+        return files
+
+    @staticmethod
+    def _stat_directories(directories: List[str]) -> List[ScannedDirectory]:
+        stats = []
+        for directory in directories:
+            try:
+                directory_stat = os.stat(directory)
+            except OSError:
+                # Removed since the snapshot was taken.
+                continue
+            if stat.S_ISDIR(directory_stat.st_mode):
+                stats.append((directory, (directory_stat.st_dev, directory_stat.st_ino), directory_stat.st_mtime_ns))
+        return stats
@@ -0,0 +1,338 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from watchdog.events import FileCreatedEvent, FileModifiedEvent
+
+logger = logging.getLogger(__name__)
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | IN_MOVE_SELF
+              | IN_ONLYDIR | IN_EXCL_UNLINK)
+
+EVENT_HEADER = struct.Struct('iIII')
+EVENT_BUFFER_SIZE = 64 * 1024
+
+# Files that are created or modified but not closed are reported once no event came for them for this long.
+DEFAULT_SETTLE_SECONDS = 5.0
+
+# After a queue overflow, files modified since the last events read, minus this margin, are reported again.
+OVERFLOW_MARGIN_SECONDS = 2.0
+
+# Filesystems on which changes made by other hosts do not raise inotify events.
+NETWORK_FILESYSTEMS = {'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'ncpfs', 'afs', 'lustre', 'gpfs', 'glusterfs', 'ceph',
+                       '9p', 'beegfs'}
+
+
+def _load_libc():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        for function in ('inotify_init1', 'inotify_add_watch', 'inotify_rm_watch'):
+            getattr(libc, function)
+    except (OSError, AttributeError):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+_libc = _load_libc()
+
+
+class InotifyWatch(object):
+    def __init__(self, path: str, event_handler) -> None:
+        self.path = path
+        self.event_handler = event_handler
+
+
+class InotifyObserver:
+    """
+    Observes local directories with Linux inotify, so that new and modified granules are reported as the kernel
+    raises events instead of by re-reading the whole tree on every poll like watchdog's PollingObserver.
+
+    - Every directory under a scheduled path gets its own watch. Directories created or moved into the tree are
+      watched as they appear, and the files they already contain are reported.
+    - A file is reported once, when it is closed after writing or moved into place. Files that are written to but not
+      closed are reported after settle_seconds without events.
+    - When the kernel event queue overflows, events are lost: the scheduled trees are scanned again and the files
+      modified since the last events read are reported.
+
+    Handlers receive watchdog FileCreatedEvent and FileModifiedEvent objects, from the observer thread.
+
+    inotify only sees changes made through the local kernel: use the polling observer for NFS and other network
+    filesystems.
+    """
+
+    def __init__(self, settle_seconds: float = DEFAULT_SETTLE_SECONDS):
+        if _libc is None:
+            raise OSError(errno.ENOSYS, 'inotify is not available on this platform')
+
+        self._settle_seconds = settle_seconds
+        self._fd = _libc.inotify_init1(IN_CLOEXEC | IN_NONBLOCK)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+        self._lock = threading.RLock()
+        self._watches: Set[InotifyWatch] = set()
+        self._path_for_wd: Dict[int, str] = {}
+        self._wd_for_path: Dict[str, int] = {}
+        # path -> (deadline, created)
+        self._pending: Dict[str, Tuple[float, bool]] = {}
+        self._last_read_time = time.time()
+
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def available() -> bool:
+        return _libc is not None
+
+    @staticmethod
+    def supports(path: str) -> bool:
+        """
+        True if inotify is available and the path is on a known, local filesystem. FUSE filesystems (sshfs, s3fs...)
+        are treated as network filesystems.
+        """
+        filesystem = _filesystem_type(path) if _libc is not None else None
+        return filesystem is not None and filesystem not in NETWORK_FILESYSTEMS and not filesystem.startswith('fuse')
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='inotify-observer', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        os.close(self._fd)
+
+    def schedule(self, event_handler, path: str, recursive: bool = True) -> InotifyWatch:
+        if not os.path.isdir(path):
+            raise FileNotFoundError(errno.ENOENT, 'No such directory', path)
+
+        with self._lock:
+            self._add_tree(path)
+            watch = InotifyWatch(path=os.path.abspath(path), event_handler=event_handler)
+            self._watches.add(watch)
+        return watch
+
+    def unschedule(self, watch: InotifyWatch):
+        with self._lock:
+            self._watches.discard(watch)
+            roots = {other.path for other in self._watches}
+            for path in [path for path in self._wd_for_path if _is_under(path, watch.path)]:
+                if not any(_is_under(path, root) for root in roots):
+                    self._remove_watch(path)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            timeout = 1.0
+            with self._lock:
+                if self._pending:
+                    timeout = max(0.0, min(timeout, min(deadline for deadline, _ in self._pending.values()) - time.time()))
+            try:
+                readable, _, _ = select.select([self._fd], [], [], timeout)
+            except (OSError, ValueError):
+                return
+
+            try:
+                if readable:
+                    self._read_events()
+                self._flush_settled()
+            except Exception as e:
+                logger.exception(f'Error while handling inotify events: {e}')
+
+    def _read_events(self):
+        read_time = time.time()
+        try:
+            buffer = os.read(self._fd, EVENT_BUFFER_SIZE)
+        except BlockingIOError:
+            return
+
+        with self._lock:
+            offset = 0
+            while offset + EVENT_HEADER.size <= len(buffer):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+                name = buffer[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0')
+                offset += EVENT_HEADER.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    self._rescan_after_overflow()
+                    continue
+                directory = self._path_for_wd.get(wd)
+                if directory is None:
+                    continue
+                self._handle_event(wd, mask, os.path.join(directory, os.fsdecode(name)) if name else directory)
+            self._last_read_time = read_time
+
+    def _handle_event(self, wd: int, mask: int, path: str):
+        if mask & IN_IGNORED:
+            # The directory was removed.
+            directory = self._path_for_wd.pop(wd)
+            if self._wd_for_path.get(directory) == wd:
+                del self._wd_for_path[directory]
+        elif mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                for file_path in self._add_tree(path):
+                    self._dispatch(file_path, created=True)
+            elif mask & IN_MOVED_FROM:
+                # The watches would keep following the directory wherever it was moved to.
+                for watched in [watched for watched in self._wd_for_path if _is_under(watched, path)]:
+                    self._remove_watch(watched)
+        elif mask & IN_MOVED_TO:
+            self._pending.pop(path, None)
+            self._dispatch(path, created=True)
+        elif mask & IN_CLOSE_WRITE:
+            _, created = self._pending.pop(path, (None, False))
+            self._dispatch(path, created=created)
+        elif mask & (IN_CREATE | IN_MODIFY):
+            _, created = self._pending.get(path, (None, bool(mask & IN_CREATE)))
+            self._pending[path] = (time.time() + self._settle_seconds, created)
+
+    def _flush_settled(self):
+        now = time.time()
+        with self._lock:
+            settled = [(path, created) for path, (deadline, created) in self._pending.items() if deadline <= now]
+            for path, created in settled:
+                del self._pending[path]
+                self._dispatch(path, created=created)
+
+    def _rescan_after_overflow(self):
+        since = self._last_read_time - OVERFLOW_MARGIN_SECONDS
+        logger.warning('The inotify event queue overflowed; scanning the watched directories for files modified '
+                       'since the last events')
+        for root in {watch.path for watch in self._watches}:
+            for file_path in self._add_tree(root, modified_since=since):
+                self._dispatch(file_path, created=False)
+
+    def _add_tree(self, root: str, modified_since: Optional[float] = None) -> List[str]:
+        """
+        Watches every directory under root that is not watched yet, and returns the files found in the directories
+        that were not watched, plus the files modified since the given time if any.
+        """
+        files = []
+        directories = [root]
+        # (st_dev, st_ino) of the directories walked, so that symbolic links looping back up the tree are not followed
+        visited_keys = set()
+        while directories:
+            directory = directories.pop()
+            try:
+                directory_stat = os.stat(directory)
+            except OSError:
+                continue
+            key = (directory_stat.st_dev, directory_stat.st_ino)
+            if key in visited_keys:
+                continue
+            visited_keys.add(key)
+
+            is_new = directory not in self._wd_for_path
+            if is_new:
+                try:
+                    self._add_watch(directory)
+                except FileNotFoundError:
+                    continue
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            directories.append(entry.path)
+                        elif entry.is_file():
+                            if is_new or (modified_since is not None and entry.stat().st_mtime >= modified_since):
+                                files.append(entry.path)
+            except OSError as e:
+                logger.warning(f'Could not list directory {directory}: {e}')
+        return files
+
+    def _add_watch(self, path: str):
+        wd = _libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            if error == errno.ENOSPC:
+                raise OSError(error, 'The inotify watch limit was reached; raise fs.inotify.max_user_watches', path)
+            if error in (errno.ENOENT, errno.ENOTDIR):
+                raise FileNotFoundError(error, os.strerror(error), path)
+            raise OSError(error, os.strerror(error), path)
+        self._path_for_wd[wd] = path
+        self._wd_for_path[path] = wd
+
+    def _remove_watch(self, path: str):
+        wd = self._wd_for_path.pop(path, None)
+        if wd is not None:
+            self._path_for_wd.pop(wd, None)
+            _libc.inotify_rm_watch(self._fd, wd)
+
+    def _dispatch(self, path: str, created: bool):
+        event = FileCreatedEvent(path) if created else FileModifiedEvent(path)
+        for watch in list(self._watches):
+            if _is_under(path, watch.path):
+                try:
+                    if created:
+                        watch.event_handler.on_created(event)
+                    else:
+                        watch.event_handler.on_modified(event)
+                except Exception as e:
+                    logger.exception(f'Error while handling {event}: {e}')
+
+
+def _is_under(path: str, root: str) -> bool:
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+def _filesystem_type(path: str) -> Optional[str]:
+    """
+    Returns the type of the filesystem mounted closest to the path, from /proc/mounts.
+    """
+    try:
+        with open('/proc/mounts') as mounts:
+            entries = [line.split() for line in mounts]
+    except OSError:
+        return None
+
+    path = os.path.realpath(path)
+    best = None
+    for entry in entries:
+        if len(entry) < 3:
+            continue
+        mount_point = entry[1].replace('\\040', ' ')
+        if _is_under(path, mount_point) and (best is None or len(mount_point) > len(best[0])):
+            best = (mount_point, entry[2])
+    return best[1] if best is not None else None
@@ -0,0 +1,110 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Iterator, List, Optional, Tuple
+
+
+class S3KeyCache:
+    """
+    The modified times of the objects under one S3 prefix, kept compact enough for buckets with millions of keys.
+
+    Keys are stored without the prefix, in a sorted list (the order in which S3 lists them) next to an array of
+    modified times in epoch seconds, instead of a dict of full s3:// URLs to datetime objects. Lookups are binary
+    searches. Keys are appended in O(1) while a listing is read in order, and inserted in O(n) otherwise, which
+    incremental listings and notifications only do for the few keys that changed.
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self._names: List[str] = []
+        self._times = array('q')
+        self._names_size = 0
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, key: str) -> bool:
+        return self._find(key) is not None
+
+    def get(self, key: str) -> Optional[int]:
+        index = self._find(key)
+        return self._times[index] if index is not None else None
+
+    def set(self, key: str, modified_time: int):
+        name = self._name(key)
+        index = bisect_left(self._names, name)
+        if index < len(self._names) and self._names[index] == name:
+            self._times[index] = modified_time
+        else:
+            self._names.insert(index, name)
+            self._times.insert(index, modified_time)
+            self._names_size += sys.getsizeof(name)
+
+    def append(self, key: str, modified_time: int):
+        """
+        Adds a key that sorts after all the keys in the cache, as when reading a listing in order.
+        """
+        name = self._name(key)
+        if self._names and name <= self._names[-1]:
+            self.set(key, modified_time)
+            return
+        self._names.append(name)
+        self._times.append(modified_time)
+        self._names_size += sys.getsizeof(name)
+
+    def update(self, other: 'S3KeyCache'):
+        """
+        Adds or updates the keys of another cache of the same prefix.
+        """
+        for key, modified_time in other.items():
+            self.append(key, modified_time)
+
+    def pop(self, key: str) -> Optional[int]:
+        index = self._find(key)
+        if index is None:
+            return None
+        modified_time = self._times[index]
+        self._names_size -= sys.getsizeof(self._names.pop(index))
+        del self._times[index]
+        return modified_time
+
+    def last_key(self) -> Optional[str]:
+        return self.prefix + self._names[-1] if self._names else None
+
+    def items(self) -> Iterator[Tuple[str, int]]:
+        for name, modified_time in zip(self._names, self._times):
+            yield self.prefix + name, modified_time
+
+    def nbytes(self) -> int:
+        """
+        Approximate memory used by the cache, in bytes.
+        """
+        return (sys.getsizeof(self._names) + self._names_size
+                + self._times.buffer_info()[1] * self._times.itemsize)
+
+    def _name(self, key: str) -> str:
+        if not key.startswith(self.prefix):
+            raise KeyError(f'{key} is not under the prefix {self.prefix}')
+        return key[len(self.prefix):]
+
+    def _find(self, key: str) -> Optional[int]:
+        if not key.startswith(self.prefix):
+            return None
+        name = key[len(self.prefix):]
+        index = bisect_left(self._names, name)
+        return index if index < len(self._names) and self._names[index] == name else None
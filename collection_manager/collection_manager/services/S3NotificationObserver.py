@@ -0,0 +1,167 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import datetime
+import json
+import logging
+from typing import Dict, Optional
+from urllib.parse import unquote_plus, urlparse
+
+import aioboto3
+from collection_manager.services.S3Observer import (S3FileCreatedEvent, S3FileModifiedEvent, S3Observer,
+                                                    S3Watch)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RECONCILIATION_INTERVAL = 3600
+
+# Seconds to wait before reading an event file again once its end is reached, or before retrying after an error.
+FEED_RETRY_SECONDS = 1
+
+
+class S3NotificationObserver(S3Observer):
+    """
+    Observes S3 prefixes through the object notifications that S3 sends to a queue, instead of listing the bucket
+    on every poll.
+
+    The queue is either an SQS queue URL, receiving S3 event notifications directly or through SNS, or the path of a
+    local file with one notification per line, which stands in for the queue in tests and on systems that relay the
+    notifications some other way. ObjectCreated notifications are converted to S3FileCreatedEvent or
+    S3FileModifiedEvent for the watch whose prefix holds the object.
+
+    Notifications can be lost (for example while the queue is misconfigured, or when they expire), so the prefixes
+    are still listed every reconciliation_interval seconds, like S3Observer polls them; objects already reported
+    by a notification are not reported again by the listing.
+    """
+
+    def __init__(self, bucket, queue: str, initial_scan=False,
+                 reconciliation_interval: float = DEFAULT_RECONCILIATION_INTERVAL) -> None:
+        super().__init__(bucket, initial_scan=initial_scan, poll_interval=reconciliation_interval)
+        self._queue = queue
+        # Objects reported by a notification, with the event time in epoch seconds, until a listing reads their
+        # modified time.
+        self._notified: Dict[str, int] = {}
+        self._feed_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._queue.startswith('https://') or self._queue.startswith('http://'):
+            self._feed_task = asyncio.create_task(self._consume_sqs())
+        else:
+            self._feed_task = asyncio.create_task(self._consume_file(urlparse(self._queue).path))
+        await super().start()
+
+    async def _consume_sqs(self):
+        while True:
+            try:
+                async with aioboto3.client('sqs') as sqs:
+                    while True:
+                        response = await sqs.receive_message(QueueUrl=self._queue,
+                                                             MaxNumberOfMessages=10,
+                                                             WaitTimeSeconds=20)
+                        messages = response.get('Messages', [])
+                        for message in messages:
+                            await self._handle_notification(message['Body'])
+                        if messages:
+                            await sqs.delete_message_batch(QueueUrl=self._queue,
+                                                           Entries=[{'Id': str(i), 'ReceiptHandle': m['ReceiptHandle']}
+                                                                    for i, m in enumerate(messages)])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f'Could not receive S3 notifications from {self._queue}: {e}')
+                await asyncio.sleep(FEED_RETRY_SECONDS)
+
+    async def _consume_file(self, path: str):
+        position = 0
+        while True:
+            try:
+                with open(path, 'r') as feed:
+                    feed.seek(position)
+                    while True:
+                        line = feed.readline()
+                        if not line.endswith('\n'):
+                            # Nothing more, or a line that is still being written.
+                            break
+                        position = feed.tell()
+                        if line.strip():
+                            await self._handle_notification(line)
+            except FileNotFoundError:
+                pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f'Could not read S3 notifications from {path}: {e}')
+            await asyncio.sleep(FEED_RETRY_SECONDS)
+
+    async def _handle_notification(self, body: str):
+        try:
+            notification = json.loads(body)
+            if 'Message' in notification and notification.get('Type') == 'Notification':
+                # Delivered through SNS.
+                notification = json.loads(notification['Message'])
+        except (ValueError, TypeError) as e:
+            logger.warning(f'Ignoring a malformed S3 notification: {e}')
+            return
+
+        for record in notification.get('Records', []):
+            try:
+                event_name = record['eventName']
+                bucket = record['s3']['bucket']['name']
+                key = unquote_plus(record['s3']['object']['key'])
+                event_time = datetime.datetime.fromisoformat(record['eventTime'].replace('Z', '+00:00'))
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f'Ignoring a malformed S3 notification record: {e}')
+                continue
+            if bucket != self._bucket:
+                continue
+
+            file = f"s3://{self._bucket}/{key}"
+            modified_time = int(event_time.timestamp())
+            if event_name.startswith('ObjectRemoved'):
+                for cache in self._caches.values():
+                    cache.pop(key)
+                self._notified.pop(file, None)
+            elif event_name.startswith('ObjectCreated'):
+                watch = self._watch_for_key(key)
+                if watch is None:
+                    continue
+                # Prefixes that were never listed get their cache from the next listing.
+                cache = self._caches.get(S3Observer._get_object_key(watch.path))
+                file_is_new = cache is None or key not in cache
+                if cache is not None:
+                    cache.set(key, modified_time)
+                self._notified[file] = modified_time
+                if file_is_new:
+                    watch.event_handler.on_created(S3FileCreatedEvent(src_path=file, modified_time=event_time))
+                else:
+                    watch.event_handler.on_modified(S3FileModifiedEvent(src_path=file, modified_time=event_time))
+            await asyncio.sleep(0)
+
+    def _has_changed(self, file: str, previous_time: Optional[int], modified_time: int) -> bool:
+        # The event time of a notification is close to, but not always equal to, the modified time that listings
+        # report for the object.
+        notified_time = self._notified.pop(file, None)
+        if notified_time is not None and modified_time <= notified_time:
+            return False
+        return super()._has_changed(file, previous_time, modified_time)
+
+    def _watch_for_key(self, key: str) -> Optional[S3Watch]:
+        best = None
+        for watch in self._watches.copy():
+            prefix = S3Observer._get_object_key(watch.path)
+            if key.startswith(prefix) and (best is None or len(prefix) > len(S3Observer._get_object_key(best.path))):
+                best = watch
+        return best
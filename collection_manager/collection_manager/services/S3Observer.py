@@ -19,13 +19,16 @@ import datetime
 import os
 import time
 from dataclasses import dataclass
-from typing import Set, Dict, Optional, Callable, Awaitable
+from typing import Set, Dict, List, Optional, Callable, Awaitable, Tuple
 import logging
 
 import aioboto3
+from collection_manager.services.S3KeyCache import S3KeyCache
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_LISTING_CONCURRENCY = 8
+
 
 @dataclass
 class S3Event:
@@ -48,18 +51,38 @@ class S3Watch(object):
 
 
 class S3Observer:
-
-    def __init__(self, bucket, initial_scan=False) -> None:
+    """
+    Polls S3 prefixes for new and modified objects.
+
+    By default every poll lists all the objects under every watched prefix. With full_listing_interval set, polls
+    are incremental in between full listings: S3 lists keys in lexicographic order, so each prefix is listed with
+    StartAfter set to its latest partition, the "directory" of the greatest key seen so far. For date-partitioned
+    layouts, new granules land in the latest partition or in new ones that sort after it, so only those are listed.
+    Objects added to or rewritten in older partitions are found by the next full listing.
+
+    The prefixes are listed concurrently, up to listing_concurrency at a time, with a single S3 client per poll. The
+    objects seen under each prefix are kept in an S3KeyCache.
+    """
+
+    def __init__(self, bucket, initial_scan=False, poll_interval: float = 30,
+                 full_listing_interval: Optional[float] = None,
+                 listing_concurrency: int = DEFAULT_LISTING_CONCURRENCY) -> None:
         self._bucket = bucket
-        self._cache: Dict[str, datetime.datetime] = {}
+        # Object key prefix -> cache of the objects listed under it
+        self._caches: Dict[str, S3KeyCache] = {}
         self._initial_scan = initial_scan
         self._watches: Set[S3Watch] = set()
+        self._poll_interval = poll_interval
+        self._full_listing_interval = full_listing_interval
+        self._listing_concurrency = max(1, int(listing_concurrency))
+
+        self._last_full_listing: Optional[float] = None
 
         self._has_polled = False
 
     async def start(self):
         await self._run_periodically(loop=None,
-                                     wait_time=30,
+                                     wait_time=self._poll_interval,
                                      func=self._poll)
 
     def unschedule(self, watch: S3Watch):
@@ -90,66 +113,143 @@ class S3Observer:
         loop.call_later(wait_time, loop.create_task, cls._run_periodically(loop, wait_time, func, *args, **kwargs))
 
     async def _poll(self):
-        new_cache = {}
-        watch_index = {}
+        full_listing = self._full_listing_due()
 
         # We need to iterate on a copy of self._watches rather than on the original set itself
         # because it is very possible that the original set could get updated while we are in the
         # middle of scanning S3, which will cause an exception.
-        watches_copy = self._watches.copy()
-        for watch in watches_copy:
-            new_cache_for_watch = await self._get_s3_files(watch.path)
-            new_index = {file: watch for file in new_cache_for_watch}
-
-            new_cache = {**new_cache, **new_cache_for_watch}
-            watch_index = {**watch_index, **new_index}
-        difference = set(new_cache.items()) - set(self._cache.items())
-
-        logger.info(f'S3 Poll completed; creating events for {len(difference)} found files')
+        watches_by_prefix = {S3Observer._get_object_key(watch.path): watch for watch in self._watches.copy()}
+        semaphore = asyncio.Semaphore(self._listing_concurrency)
+        async with self._client() as s3:
+            results = await asyncio.gather(*(self._list_prefix(s3, semaphore, prefix, full_listing)
+                                             for prefix in watches_by_prefix), return_exceptions=True)
+
+        # A prefix whose listing failed keeps its cache, and is listed again by the next poll; the other prefixes
+        # are not held back by it.
+        listings = []
+        for prefix, result in zip(watches_by_prefix, results):
+            if isinstance(result, Exception):
+                logger.error(f'Could not list objects for bucket {self._bucket} under path {prefix}: {result}')
+            else:
+                listings.append(result)
+        if full_listing and len(listings) < len(results):
+            self._last_full_listing = None
+
+        # The caches are only updated once the listings have completed, so that the objects of a listing that
+        # fails are listed and reported again by the next poll.
+        if full_listing:
+            caches = {prefix: cache for prefix, cache in self._caches.items() if prefix in watches_by_prefix}
+        else:
+            caches = self._caches
+        for listing, _ in listings:
+            previous = self._caches.get(listing.prefix)
+            if full_listing or previous is None:
+                # Full listings replace the caches, which drops the objects that were deleted and the prefixes that
+                # are no longer watched.
+                caches[listing.prefix] = listing
+            else:
+                previous.update(listing)
+            cache = caches[listing.prefix]
+            logger.info(f'{len(cache)} objects under {listing.prefix} cached in {cache.nbytes() / 2 ** 20:.1f} MiB')
+        self._caches = caches
+        n_changes = sum(len(changes) for _, changes in listings)
+
+        logger.info(f'S3 Poll completed ({"full" if full_listing else "incremental"} listing); creating events for '
+                    f'{n_changes} found files')
         logger.debug(f'(has_polled = {self._has_polled} || init_scan = {self._initial_scan}) = {self._has_polled or self._initial_scan}')
 
         if self._has_polled or self._initial_scan:
-            for i, (file, modified_date) in enumerate(difference):
-                if i % 100 == 0:
-                    logger.debug(f'Iterated over {i} items in diff')
-
-                watch = watch_index[file]
-                file_is_new = file not in self._cache
+            i = 0
+            for listing, changes in listings:
+                watch = watches_by_prefix[listing.prefix]
+                for file, modified_date, file_is_new in changes:
+                    if i % 100 == 0:
+                        logger.debug(f'Iterated over {i} items in diff')
+                    i += 1
 
-                if file_is_new:
-                    watch.event_handler.on_created(S3FileCreatedEvent(src_path=file, modified_time=modified_date))
-                else:
-                    watch.event_handler.on_modified(S3FileModifiedEvent(src_path=file, modified_time=modified_date))
+                    if file_is_new:
+                        watch.event_handler.on_created(S3FileCreatedEvent(src_path=file, modified_time=modified_date))
+                    else:
+                        watch.event_handler.on_modified(S3FileModifiedEvent(src_path=file, modified_time=modified_date))
 
-                await asyncio.sleep(0)
+                    await asyncio.sleep(0)
 
         logger.info('All S3 events for this poll have been created')
 
-        self._cache = new_cache
         self._has_polled = True
 
-    async def _get_s3_files(self, path: str):
-        new_cache = {}
-
-        start = time.perf_counter()
-        async with aioboto3.resource("s3") as s3:
-            bucket = await s3.Bucket(self._bucket)
-
-            n_keys = 0
-
-            object_key = S3Observer._get_object_key(path)
-            logger.debug(f'Listing objects for bucket {self._bucket} under path {object_key}')
-            async for file in bucket.objects.filter(Prefix=object_key):
-                n_keys += 1
-                new_cache[f"s3://{file.bucket_name}/{file.key}"] = await file.last_modified
-
-        end = time.perf_counter()
-        duration = end - start
+    async def _list_prefix(self,
+                           s3,
+                           semaphore: asyncio.Semaphore,
+                           object_key: str,
+                           full_listing: bool) -> Tuple[S3KeyCache, List[Tuple[str, datetime.datetime, bool]]]:
+        """
+        Lists the objects under a prefix and returns them, with the (file, modified time, is new) of the objects that
+        are new or were modified since the previous listing. The cache of the prefix is left as it is.
+        """
+        previous = self._caches.get(object_key)
+        listing = S3KeyCache(object_key)
+        start_after = None if full_listing else self._start_after(object_key)
+        changes = []
+
+        async with semaphore:
+            start = time.perf_counter()
+            logger.debug(f'Listing objects for bucket {self._bucket} under path {object_key}'
+                         + (f' after {start_after}' if start_after else ''))
+
+            async for key, last_modified in self._list_objects(s3, object_key, start_after):
+                modified_time = int(last_modified.timestamp())
+                previous_time = previous.get(key) if previous is not None else None
+                file = f"s3://{self._bucket}/{key}"
+                if self._has_changed(file, previous_time, modified_time):
+                    changes.append((file, last_modified, previous_time is None))
+                listing.append(key, modified_time)
+
+            duration = time.perf_counter() - start
+
+        logger.info(f'Finished listing objects for bucket {self._bucket} under path {object_key}: Found '
+                    f'{len(listing)} in {duration} seconds')
+        return listing, changes
+
+    def _has_changed(self, file: str, previous_time: Optional[int], modified_time: int) -> bool:
+        return previous_time != modified_time
+
+    def _full_listing_due(self) -> bool:
+        now = time.monotonic()
+        if (self._full_listing_interval is None or self._last_full_listing is None
+                or now - self._last_full_listing >= self._full_listing_interval):
+            self._last_full_listing = now
+            return True
+        return False
+
+    def _start_after(self, object_key: str) -> Optional[str]:
+        """
+        Returns the key after which an incremental listing of the prefix starts: the latest partition under the
+        prefix, or the greatest key if it is not in a partition. None if the prefix was never listed.
+        """
+        cache = self._caches.get(object_key)
+        watermark = cache.last_key() if cache is not None else None
+        if watermark is None:
+            return None
+        partition = watermark[:watermark.rfind('/') + 1]
+        return partition if len(partition) > len(object_key.rstrip('/') + '/') else watermark
 
-        logger.info(f'Finished listing objects for bucket {self._bucket} under path {object_key}: Found {n_keys} in '
-                     f'{duration} seconds')
+    def _client(self):
+        return aioboto3.client("s3")
 
-        return new_cache
+    async def _list_objects(self, s3, prefix: str, start_after: Optional[str] = None):
+        """
+        Yields the (key, last modified time) of the objects under the prefix, in key order, starting after the
+        given key if any.
+        """
+        parameters = {'Bucket': self._bucket, 'Prefix': prefix}
+        if start_after:
+            parameters['StartAfter'] = start_after
+
+        paginator = s3.get_paginator('list_objects_v2')
+        async for page in paginator.paginate(**parameters):
+            for s3_object in page.get('Contents', []):
+                yield s3_object['Key'], s3_object['LastModified']
 
     def _get_object_key(full_path: str):
         key = urlparse(full_path).path.strip("/")
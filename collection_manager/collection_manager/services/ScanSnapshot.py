@@ -0,0 +1,146 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (name, modified time in seconds, size in bytes)
+FileRecord = Tuple[str, int, int]
+
+# Directories recorded between two commits while a scan is running.
+COMMIT_INTERVAL = 1000
+
+
+class ScanSnapshot:
+    """
+    The state of the collection directories at their last complete scan, kept in a local SQLite database so that it
+    survives restarts.
+
+    For every scope (a collection), the snapshot holds the modified time of each directory and a (name, mtime, size)
+    index of the files in it, both sorted by path. A directory whose modified time has not changed has had no entry
+    added, removed or renamed, so the scanner can skip listing it and take its subdirectories from the snapshot.
+
+    Files rewritten in place do not change the modified time of their directory, so changes of that kind made while
+    the collection manager was down are only found by the full scan that follows a change of the collection.
+    """
+
+    def __init__(self, database_path: str):
+        Path(os.path.dirname(os.path.abspath(database_path))).mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(database_path)
+        self._connection.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS scopes (
+                scope TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS directories (
+                scope TEXT NOT NULL,
+                path TEXT NOT NULL,
+                parent TEXT,
+                mtime_ns INTEGER NOT NULL,
+                PRIMARY KEY (scope, path)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS directories_by_parent ON directories (scope, parent);
+            CREATE TABLE IF NOT EXISTS files (
+                scope TEXT NOT NULL,
+                directory TEXT NOT NULL,
+                name TEXT NOT NULL,
+                mtime INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                PRIMARY KEY (scope, directory, name)
+            ) WITHOUT ROWID;
+        """)
+        self._pending_directories = 0
+
+    def close(self):
+        self._connection.close()
+
+    def begin(self, scope: str, fingerprint: str) -> bool:
+        """
+        Starts a scan of a scope. Returns True if the snapshot of the scope can be used, which requires it to have been
+        completed with the same fingerprint (for example the same configuration of the collection); otherwise it is
+        discarded. The scope stays marked incomplete until finish() is called, so a scan that is interrupted is
+        followed by a full scan.
+        """
+        row = self._connection.execute('SELECT fingerprint FROM scopes WHERE scope = ?', (scope,)).fetchone()
+        usable = row is not None and row[0] == fingerprint
+
+        with self._connection:
+            if usable:
+                self._connection.execute('DELETE FROM scopes WHERE scope = ?', (scope,))
+            else:
+                if row is not None:
+                    logger.info(f'Discarding the scan snapshot of {scope}, which was taken with another configuration')
+                self._delete_scope(scope)
+        self._pending_directories = 0
+        return usable
+
+    def directory_mtime(self, scope: str, path: str) -> Optional[int]:
+        row = self._connection.execute('SELECT mtime_ns FROM directories WHERE scope = ? AND path = ?',
+                                       (scope, path)).fetchone()
+        return row[0] if row is not None else None
+
+    def subdirectories(self, scope: str, path: str) -> List[str]:
+        rows = self._connection.execute('SELECT path FROM directories WHERE scope = ? AND parent = ? ORDER BY path',
+                                        (scope, path))
+        return [row[0] for row in rows]
+
+    def files(self, scope: str, directory: str) -> Dict[str, Tuple[int, int]]:
+        rows = self._connection.execute('SELECT name, mtime, size FROM files WHERE scope = ? AND directory = ?',
+                                        (scope, directory))
+        return {name: (mtime, size) for name, mtime, size in rows}
+
+    def record_directory(self, scope: str, path: str, parent: Optional[str], mtime_ns: int, files: List[FileRecord]):
+        """
+        Records a directory that was listed during the scan, replacing its previous file index.
+        """
+        self._connection.execute('INSERT OR REPLACE INTO directories (scope, path, parent, mtime_ns) VALUES (?, ?, ?, ?)',
+                                 (scope, path, parent, mtime_ns))
+        self._connection.execute('DELETE FROM files WHERE scope = ? AND directory = ?', (scope, path))
+        self._connection.executemany('INSERT INTO files (scope, directory, name, mtime, size) VALUES (?, ?, ?, ?, ?)',
+                                     ((scope, path, name, mtime, size) for name, mtime, size in files))
+
+        self._pending_directories += 1
+        if self._pending_directories >= COMMIT_INTERVAL:
+            self._connection.commit()
+            self._pending_directories = 0
+
+    def finish(self, scope: str, fingerprint: str, visited: Iterable[str]):
+        """
+        Completes the scan of a scope: the directories that the scan did not find are removed, and the snapshot is
+        marked usable by the next scan with the same fingerprint.
+        """
+        with self._connection:
+            self._connection.execute('CREATE TEMP TABLE IF NOT EXISTS visited (path TEXT PRIMARY KEY)')
+            self._connection.execute('DELETE FROM visited')
+            self._connection.executemany('INSERT OR IGNORE INTO visited (path) VALUES (?)', ((path,) for path in visited))
+            self._connection.execute('DELETE FROM files WHERE scope = ? AND directory NOT IN (SELECT path FROM visited)',
+                                     (scope,))
+            self._connection.execute('DELETE FROM directories WHERE scope = ? AND path NOT IN (SELECT path FROM visited)',
+                                     (scope,))
+            self._connection.execute('DELETE FROM visited')
+            self._connection.execute('INSERT OR REPLACE INTO scopes (scope, fingerprint) VALUES (?, ?)',
+                                     (scope, fingerprint))
+        self._pending_directories = 0
+
+    def _delete_scope(self, scope: str):
+        for table in ('scopes', 'directories', 'files'):
+            self._connection.execute(f'DELETE FROM {table} WHERE scope = ?', (scope,))
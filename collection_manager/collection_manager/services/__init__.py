@@ -17,3 +17,4 @@ from .CollectionProcessor import CollectionProcessor
 from .CollectionWatcher import CollectionWatcher
 from .MessagePublisher import MessagePublisher
 from .S3Observer import S3Observer
+from .S3NotificationObserver import S3NotificationObserver
@@ -13,6 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import hashlib
 from urllib.parse import urlparse
 import logging
@@ -20,7 +21,7 @@ import os
 from abc import ABC, abstractmethod
 from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 from botocore.compat import filter_ssl_warnings
 
@@ -62,7 +63,7 @@ class IngestionHistory(ABC):
         :return: None
         """
         file_name = IngestionHistory._get_standardized_path(file_path)
-        signature = self._signature_fun(file_path) if self._signature_fun else str(modified_timestamp)
+        signature = await self._compute_signature(file_path, modified_timestamp)
         await self._push_record(file_name, signature)
 
         if not self._latest_ingested_file_update:
@@ -91,14 +92,59 @@ class IngestionHistory(ABC):
                         should fall in order to be "desired".
         :return: A GranuleStatus enum.
         """
-        signature = self._signature_fun(file_path) if self._signature_fun else str(modified_timestamp)
-
         if self._in_time_range(modified_timestamp, start_date=self._latest_ingested_mtime()):
             return GranuleStatus.DESIRED_FORWARD_PROCESSING
-        elif self._in_time_range(modified_timestamp, date_from, date_to) and not await self._already_ingested(file_path, signature):
-            return GranuleStatus.DESIRED_HISTORICAL
-        else:
-            return GranuleStatus.UNDESIRED
+        elif self._in_time_range(modified_timestamp, date_from, date_to):
+            # The signature is only computed when it is needed, since it may mean reading the whole granule.
+            signature = await self._compute_signature(file_path, modified_timestamp)
+            if not await self._already_ingested(file_path, signature):
+                return GranuleStatus.DESIRED_HISTORICAL
+        return GranuleStatus.UNDESIRED
+
+    async def get_granule_statuses(self,
+                                   granules: List[Tuple[str, int]],
+                                   date_from: datetime = None,
+                                   date_to: datetime = None) -> List[GranuleStatus]:
+        """
+        Get the history status of several granules at once, as get_granule_status would for each of them. The
+        signatures of the granules that are not forward-processing are looked up together, which backends such as
+        Solr do in a few requests instead of one per granule.
+
+        :param granules: (file path, modified timestamp) of each granule
+        :return: the GranuleStatus of each granule, in the same order
+        """
+        statuses: List[Optional[GranuleStatus]] = []
+        # indexes in granules of the granules to look up
+        lookups: List[int] = []
+        latest_ingested_mtime = self._latest_ingested_mtime()
+
+        for i, (file_path, modified_timestamp) in enumerate(granules):
+            if self._in_time_range(modified_timestamp, start_date=latest_ingested_mtime):
+                statuses.append(GranuleStatus.DESIRED_FORWARD_PROCESSING)
+            elif self._in_time_range(modified_timestamp, date_from, date_to):
+                lookups.append(i)
+                statuses.append(None)
+            else:
+                statuses.append(GranuleStatus.UNDESIRED)
+
+        if lookups:
+            file_names = [IngestionHistory._get_standardized_path(granules[i][0]) for i in lookups]
+            # The granules are hashed in parallel.
+            signatures = await asyncio.gather(*(self._compute_signature(*granules[i]) for i in lookups))
+            ingested_signatures = await self._get_signatures(file_names)
+            for i, file_name, signature in zip(lookups, file_names, signatures):
+                ingested = signature == ingested_signatures.get(file_name)
+                statuses[i] = GranuleStatus.UNDESIRED if ingested else GranuleStatus.DESIRED_HISTORICAL
+        return statuses
+
+    async def _compute_signature(self, file_path: str, modified_timestamp: int) -> str:
+        """
+        Return the signature of a file. Signature functions hash the contents of the file, so they are run on the
+        default executor rather than on the event loop.
+        """
+        if not self._signature_fun:
+            return str(modified_timestamp)
+        return await asyncio.get_running_loop().run_in_executor(None, self._signature_fun, file_path)
 
     def _get_standardized_path(file_path: str):
         file_path = file_path.strip()
@@ -128,6 +174,13 @@ class IngestionHistory(ABC):
         file_name = IngestionHistory._get_standardized_path(file_path)
         return signature == await self._get_signature(file_name)
 
+    async def flush(self):
+        """
+        Persist the records that push() buffered. Called before the collection manager exits; backends that buffer
+        pushes should override this.
+        """
+        pass
+
     @abstractmethod
     async def _save_latest_timestamp(self):
         pass
@@ -140,6 +193,13 @@ class IngestionHistory(ABC):
     async def _get_signature(self, file_name):
         pass
 
+    async def _get_signatures(self, file_names: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Return the recorded signature of each of the given file names, or None for those that are not recorded.
+        Backends that can look up several records at once should override this.
+        """
+        return {file_name: await self._get_signature(file_name) for file_name in file_names}
+
     @staticmethod
     def _in_time_range(timestamp: int, start_date: datetime = None, end_date: datetime = None):
         """
@@ -0,0 +1,100 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_ALGORITHMS = ('md5', 'blake2b', 'xxhash')
+
+# Granules are read in blocks of this size, into a buffer reused from one block to the next.
+READ_SIZE = 1 << 20
+
+# Number of (device, inode, size, modified time) -> signature entries kept.
+DEFAULT_CACHE_SIZE = 100000
+
+
+class SignatureCalculator:
+    """
+    A signature function for IngestionHistory that hashes the contents of a granule, at most once per change of the
+    file: signatures are cached by the (device, inode, size, modified time in ns) of the file, so the lookup and the
+    push of a granule, or a rescan of an unchanged collection, read it only once.
+
+    All the algorithms produce 32 hexadecimal digits. md5 gives the same signatures as md5sum_from_filepath; blake2b
+    and xxhash (xxh3_128, from the optional xxhash package) are faster, but switching an existing ingestion history
+    to one of them makes all its granules look changed.
+
+    Calls are thread-safe; IngestionHistory runs them on the default executor, and hashlib releases the GIL while
+    hashing, so several granules are hashed in parallel.
+    """
+
+    def __init__(self, algorithm: str = 'md5', cache_size: int = DEFAULT_CACHE_SIZE):
+        if algorithm not in SIGNATURE_ALGORITHMS:
+            raise ValueError(f"Unknown signature algorithm '{algorithm}'; expected one of {SIGNATURE_ALGORITHMS}")
+        if algorithm == 'xxhash' and xxhash is None:
+            raise ValueError("The xxhash signature algorithm requires the xxhash package")
+
+        self._algorithm = algorithm
+        self._cache_size = cache_size
+        self._cache: 'OrderedDict[Tuple[int, int, int, int], str]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, file_path: str) -> str:
+        file_path = file_path.strip()
+        with open(file_path, 'rb') as granule:
+            file_stat = os.fstat(granule.fileno())
+            key = (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+            with self._lock:
+                signature = self._cache.get(key)
+                if signature is not None:
+                    self._cache.move_to_end(key)
+                    return signature
+
+            signature = self._hash(granule)
+
+        with self._lock:
+            self._cache[key] = signature
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return signature
+
+    def _hash(self, granule) -> str:
+        if self._algorithm == 'md5':
+            hasher = hashlib.md5()
+        elif self._algorithm == 'blake2b':
+            hasher = hashlib.blake2b(digest_size=16)
+        else:
+            hasher = xxhash.xxh3_128()
+
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(granule.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        buffer = bytearray(READ_SIZE)
+        view = memoryview(buffer)
+        while True:
+            size = granule.readinto(buffer)
+            if not size:
+                break
+            hasher.update(view[:size])
+        return hasher.hexdigest()
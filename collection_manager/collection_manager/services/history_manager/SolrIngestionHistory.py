@@ -13,31 +13,73 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import hashlib
 import logging
+import time
 from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+
 import pysolr
 import requests
+from collection_manager.services.history_manager.BloomFilter import BloomFilter
 from collection_manager.services.history_manager.IngestionHistory import (IngestionHistory, IngestionHistoryBuilder)
 from common.async_utils.AsyncUtils import run_in_executor
 
 logging.getLogger("pysolr").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
+# Number of granules looked up per {!terms} query.
+TERMS_BATCH_SIZE = 500
+
+# Pushed records are sent to Solr in a single update once this many are buffered, or at most this many seconds after
+# the first of them.
+PUSH_BATCH_SIZE = 500
+PUSH_FLUSH_SECONDS = 1.0
+
+# Solr commits the pushed records within this many milliseconds, instead of a hard commit per record.
+COMMIT_WITHIN_MS = 5000
+
+# Granules read per cursorMark page when loading the history of a dataset.
+EXPORT_PAGE_SIZE = 10000
+
+# Ways of answering lookups locally from the history loaded at startup:
+# - 'map': every granule and its signature, so that lookups never query Solr;
+# - 'bloom': a Bloom filter of the granule names, so that only lookups of granules that may have been ingested do;
+# - 'none': every lookup queries Solr.
+HISTORY_CACHE_MODES = ('none', 'map', 'bloom')
+BLOOM_FILTER_ERROR_RATE = 0.01
+
 
 def doc_key(dataset_id, file_name):
     return hashlib.sha1(f'{dataset_id}{file_name}'.encode('utf-8')).hexdigest()
 
 
+def _pack_signature(signature: str) -> Union[bytes, str]:
+    # md5 hex digests, the default signatures, take 16 bytes instead of 32 characters.
+    if len(signature) == 32 and signature == signature.lower():
+        try:
+            return bytes.fromhex(signature)
+        except ValueError:
+            pass
+    return signature
+
+
+def _unpack_signature(packed: Union[bytes, str, None]) -> Optional[str]:
+    return packed.hex() if isinstance(packed, bytes) else packed
+
+
 class SolrIngestionHistoryBuilder(IngestionHistoryBuilder):
-    def __init__(self, solr_url: str, signature_fun=None):
+    def __init__(self, solr_url: str, signature_fun=None, history_cache: str = 'none'):
         self._solr_url = solr_url
         self._signature_fun = signature_fun
+        self._history_cache = history_cache
 
     def build(self, dataset_id: str):
         return SolrIngestionHistory(solr_url=self._solr_url,
                                     dataset_id=dataset_id,
-                                    signature_fun=self._signature_fun)
+                                    signature_fun=self._signature_fun,
+                                    history_cache=self._history_cache)
 
 
 class SolrIngestionHistory(IngestionHistory):
@@ -45,7 +87,14 @@ class SolrIngestionHistory(IngestionHistory):
     _dataset_collection_name = "nexusdatasets"
     _req_session = None
 
-    def __init__(self, solr_url: str, dataset_id: str, signature_fun=None):
+    def __init__(self, solr_url: str, dataset_id: str, signature_fun=None, history_cache: str = 'none'):
+        """
+        :param history_cache: one of HISTORY_CACHE_MODES. The collection manager is the only writer of the history
+                              of its datasets, so the history can be loaded once, before the first lookup, and kept
+                              up to date by the pushes.
+        """
+        if history_cache not in HISTORY_CACHE_MODES:
+            raise ValueError(f"Unknown history cache '{history_cache}'; expected one of {HISTORY_CACHE_MODES}")
         try:
             self._url_prefix = f"{solr_url.strip('/')}/solr"
             self._create_collection_if_needed()
@@ -54,33 +103,119 @@ class SolrIngestionHistory(IngestionHistory):
             self._dataset_id = dataset_id
             self._signature_fun = signature_fun
             self._latest_ingested_file_update = self._get_latest_file_update()
+
+            # file name -> granule document, not sent to Solr yet
+            self._pending_docs: Dict[str, dict] = {}
+            self._latest_update_pending = False
+            self._flush_handle: Optional[asyncio.TimerHandle] = None
+            self._flush_task: Optional[asyncio.Task] = None
+            # file name -> signature, sent to Solr but possibly not committed yet
+            self._uncommitted_signatures: Dict[str, str] = {}
+            # file name -> futures of the _get_signature calls waiting for the next lookup
+            self._pending_lookups: Dict[str, List[asyncio.Future]] = {}
+            self._lookup_task: Optional[asyncio.Task] = None
+
+            self._history_cache = history_cache
+            self._warm_up_task: Optional[asyncio.Task] = None
+            # file name -> packed signature, with the 'map' cache
+            self._signature_map: Optional[Dict[str, Union[bytes, str]]] = None
+            self._bloom_filter: Optional[BloomFilter] = None
+            # file name -> signature, pushed while the history was being loaded
+            self._pushed_during_warm_up: Dict[str, str] = {}
         except requests.exceptions.RequestException:
             raise DatasetIngestionHistorySolrException(f"solr instance unreachable {solr_url}")
 
     def __del__(self):
-        self._req_session.close()
+        if self._req_session:
+            self._req_session.close()
 
-    @run_in_executor
-    def _push_record(self, file_name, signature):
-        hash_id = doc_key(self._dataset_id, file_name)
-        self._solr_granules.delete(q=f"id:{hash_id}")
-        self._solr_granules.add([{
-            'id': hash_id,
+    async def _push_record(self, file_name, signature):
+        self._pending_docs[file_name] = {
+            'id': doc_key(self._dataset_id, file_name),
             'dataset_s': self._dataset_id,
             'granule_s': file_name,
-            'granule_signature_s': signature}])
-        self._solr_granules.commit()
-        return None
+            'granule_signature_s': signature}
+        self._write_through(file_name, signature)
+        if len(self._pending_docs) >= PUSH_BATCH_SIZE:
+            await self._send_pending()
+        else:
+            self._schedule_flush()
 
-    @run_in_executor
-    def _save_latest_timestamp(self):
+    async def _save_latest_timestamp(self):
         if self._solr_datasets:
-            self._solr_datasets.delete(q=f"id:{self._dataset_id}")
+            # Only the latest value is sent, with the next flush.
+            self._latest_update_pending = True
+            self._schedule_flush()
+
+    async def flush(self):
+        """
+        Send the buffered records and the latest timestamp to Solr, after the flush started by the timer if one is
+        running, so that the records it could not send are sent again.
+        """
+        if self._flush_task is not None:
+            await self._flush_task
+        await self._send_pending()
+
+    async def _send_pending(self):
+        """
+        Send the buffered records and the latest timestamp to Solr, in one update of each collection committed
+        within COMMIT_WITHIN_MS. Records that cannot be sent are kept for the next flush.
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        docs = self._pending_docs
+        latest_update = self._latest_ingested_file_update if self._latest_update_pending else None
+        self._pending_docs = {}
+        self._latest_update_pending = False
+        if not docs and latest_update is None:
+            return
+
+        signatures = {file_name: doc['granule_signature_s'] for file_name, doc in docs.items()}
+        self._uncommitted_signatures.update(signatures)
+        try:
+            await self._send_updates(list(docs.values()), latest_update)
+        except Exception as e:
+            logger.error(f"Could not push {len(docs)} granules of {self._dataset_id} to solr, will retry: {e}")
+            for file_name, doc in docs.items():
+                self._pending_docs.setdefault(file_name, doc)
+            self._latest_update_pending = self._latest_update_pending or latest_update is not None
+            self._schedule_flush()
+            return
+
+        # Once Solr has committed the records, lookups find them there.
+        asyncio.get_running_loop().call_later(2 * COMMIT_WITHIN_MS / 1000, self._forget_uncommitted, signatures)
+
+    def _schedule_flush(self):
+        if self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(PUSH_FLUSH_SECONDS, self._start_flush)
+
+    def _start_flush(self):
+        self._flush_handle = None
+        self._flush_task = asyncio.get_running_loop().create_task(self._send_pending())
+        self._flush_task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task):
+        if self._flush_task is task:
+            self._flush_task = None
+
+    def _forget_uncommitted(self, signatures: Dict[str, str]):
+        for file_name, signature in signatures.items():
+            if self._uncommitted_signatures.get(file_name) == signature:
+                del self._uncommitted_signatures[file_name]
+
+    @run_in_executor
+    def _send_updates(self, docs: List[dict], latest_update: Optional[int]):
+        if docs:
+            # Documents with the id of an existing one replace it.
+            self._solr_granules.add(docs, commit=False, commitWithin=COMMIT_WITHIN_MS)
+        if latest_update is not None:
             self._solr_datasets.add([{
                 'id': self._dataset_id,
                 'dataset_s': self._dataset_id,
-                'latest_update_l': self._latest_ingested_file_update}])
-            self._solr_datasets.commit()
+                'latest_update_l': latest_update}], commit=False, commitWithin=COMMIT_WITHIN_MS)
 
     @run_in_executor
     def _push_dataset(self, dataset_id, type, config):
@@ -103,14 +238,166 @@ class SolrIngestionHistory(IngestionHistory):
         else:
             return None
 
+    async def _get_signature(self, file_name):
+        known, signature = self._buffered_signature(file_name)
+        if known:
+            return signature
+
+        # Lookups made while another one is running, such as those of the concurrent callbacks of a scan, are
+        # sent to Solr together.
+        future = asyncio.get_running_loop().create_future()
+        self._pending_lookups.setdefault(file_name, []).append(future)
+        if self._lookup_task is None:
+            self._lookup_task = asyncio.create_task(self._run_lookups())
+        return await future
+
+    async def _run_lookups(self):
+        try:
+            # Let the callers that are ready to run join the first lookup.
+            await asyncio.sleep(0)
+            while self._pending_lookups:
+                lookups = self._pending_lookups
+                self._pending_lookups = {}
+                try:
+                    signatures = await self._get_signatures(list(lookups))
+                except Exception as e:
+                    for futures in lookups.values():
+                        for future in futures:
+                            if not future.done():
+                                future.set_exception(e)
+                    continue
+                for file_name, futures in lookups.items():
+                    for future in futures:
+                        if not future.done():
+                            future.set_result(signatures.get(file_name))
+        finally:
+            self._lookup_task = None
+
+    async def _get_signatures(self, file_names: List[str]) -> Dict[str, Optional[str]]:
+        signatures = {}
+        missing = []
+        for file_name in file_names:
+            known, signature = self._buffered_signature(file_name)
+            if known:
+                signatures[file_name] = signature
+            else:
+                missing.append(file_name)
+        if missing and self._history_cache != 'none':
+            missing = await self._get_cached_signatures(missing, signatures)
+        if missing:
+            signatures.update(await self._search_signatures(missing))
+        return signatures
+
+    async def _get_cached_signatures(self, file_names: List[str], signatures: Dict[str, Optional[str]]) -> List[str]:
+        """
+        Adds the signatures that the cache can answer for to signatures, and returns the file names that it cannot
+        answer for.
+        """
+        if self._warm_up_task is None:
+            self._warm_up_task = asyncio.create_task(self._warm_up())
+        await self._warm_up_task
+
+        if self._signature_map is not None:
+            for file_name in file_names:
+                signatures[file_name] = _unpack_signature(self._signature_map.get(file_name))
+            return []
+        if self._bloom_filter is not None:
+            maybe_ingested = []
+            for file_name in file_names:
+                if file_name in self._bloom_filter:
+                    maybe_ingested.append(file_name)
+                else:
+                    signatures[file_name] = None
+            return maybe_ingested
+        # The history could not be loaded.
+        return file_names
+
+    async def _warm_up(self):
+        start = time.perf_counter()
+        try:
+            if self._history_cache == 'map':
+                signature_map = await self._load_signature_map()
+                signature_map.update({file_name: _pack_signature(signature)
+                                      for file_name, signature in self._pushed_during_warm_up.items()})
+                self._signature_map = signature_map
+                size = f"{len(signature_map)} granules"
+            else:
+                bloom_filter = await self._load_bloom_filter()
+                for file_name in self._pushed_during_warm_up:
+                    bloom_filter.add(file_name)
+                self._bloom_filter = bloom_filter
+                size = f"{len(bloom_filter)} granules in a {bloom_filter.nbytes() / 2 ** 20:.1f} MiB Bloom filter"
+            logger.info(f"Loaded the ingestion history of {self._dataset_id} ({size}) in "
+                        f"{time.perf_counter() - start} seconds")
+        except Exception as e:
+            logger.error(f"Could not load the ingestion history of {self._dataset_id}; looking up granules in solr "
+                         f"instead: {e}")
+        finally:
+            self._pushed_during_warm_up = {}
+
+    def _write_through(self, file_name: str, signature: str):
+        if self._signature_map is not None:
+            self._signature_map[file_name] = _pack_signature(str(signature))
+        elif self._bloom_filter is not None:
+            self._bloom_filter.add(file_name)
+        elif self._warm_up_task is not None and not self._warm_up_task.done():
+            self._pushed_during_warm_up[file_name] = str(signature)
+
+    def _export_granules(self, fields: str):
+        """
+        Yields the granule documents of the dataset, with the given fields, paging through them with cursorMark.
+        Returns the number of documents first.
+        """
+        cursor = '*'
+        while True:
+            results = self._solr_granules.search(q='*:*',
+                                                 fq=f'{{!term f=dataset_s}}{self._dataset_id}',
+                                                 fl=fields,
+                                                 sort='id asc',
+                                                 rows=EXPORT_PAGE_SIZE,
+                                                 cursorMark=cursor)
+            if cursor == '*':
+                yield results.hits
+            yield from results.docs
+            if not results.nextCursorMark or results.nextCursorMark == cursor:
+                return
+            cursor = results.nextCursorMark
+
     @run_in_executor
-    def _get_signature(self, file_name):
-        hash_id = doc_key(self._dataset_id, file_name)
-        results = self._solr_granules.search(q=f"id:{hash_id}")
-        if results:
-            return results.docs[0]['granule_signature_s']
-        else:
-            return None
+    def _load_signature_map(self) -> Dict[str, Union[bytes, str]]:
+        docs = self._export_granules('id,granule_s,granule_signature_s')
+        next(docs)
+        return {doc['granule_s']: _pack_signature(doc['granule_signature_s']) for doc in docs}
+
+    @run_in_executor
+    def _load_bloom_filter(self) -> BloomFilter:
+        docs = self._export_granules('id,granule_s')
+        # Room for the granules that will be ingested while the collection manager runs.
+        bloom_filter = BloomFilter(capacity=2 * next(docs) + 100000, error_rate=BLOOM_FILTER_ERROR_RATE)
+        for doc in docs:
+            bloom_filter.add(doc['granule_s'])
+        return bloom_filter
+
+    def _buffered_signature(self, file_name: str) -> Tuple[bool, Optional[str]]:
+        if file_name in self._pending_docs:
+            return True, self._pending_docs[file_name]['granule_signature_s']
+        if file_name in self._uncommitted_signatures:
+            return True, self._uncommitted_signatures[file_name]
+        return False, None
+
+    @run_in_executor
+    def _search_signatures(self, file_names: List[str]) -> Dict[str, Optional[str]]:
+        signatures = dict.fromkeys(file_names)
+        for start in range(0, len(file_names), TERMS_BATCH_SIZE):
+            file_names_by_id = {doc_key(self._dataset_id, file_name): file_name
+                                for file_name in file_names[start:start + TERMS_BATCH_SIZE]}
+            results = self._solr_granules.search(q='*:*',
+                                                 fq=f"{{!terms f=id}}{','.join(file_names_by_id)}",
+                                                 fl='id,granule_signature_s',
+                                                 rows=len(file_names_by_id))
+            for doc in results.docs:
+                signatures[file_names_by_id[doc['id']]] = doc['granule_signature_s']
+        return signatures
 
     def _create_collection_if_needed(self):
         try:
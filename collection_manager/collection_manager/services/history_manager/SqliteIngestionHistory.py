@@ -0,0 +1,175 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import logging
+import os
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+from collection_manager.services.history_manager.IngestionHistory import IngestionHistory
+from collection_manager.services.history_manager.IngestionHistory import IngestionHistoryBuilder
+
+logger = logging.getLogger(__name__)
+
+# Pushed records are committed in a single transaction once this many are pending, or at most this many seconds
+# after the first of them.
+COMMIT_BATCH_SIZE = 1000
+COMMIT_INTERVAL_SECONDS = 1.0
+
+
+class SqliteIngestionHistoryBuilder(IngestionHistoryBuilder):
+    def __init__(self, history_path: str, signature_fun=None):
+        self._history_path = history_path
+        self._signature_fun = signature_fun
+
+    def build(self, dataset_id: str):
+        return SqliteIngestionHistory(history_path=self._history_path,
+                                      dataset_id=dataset_id,
+                                      signature_fun=self._signature_fun)
+
+
+class SqliteIngestionHistory(IngestionHistory):
+    """
+    Ingestion history kept in a SQLite database per dataset, <history_path>/<dataset_id>.sqlite.
+
+    Unlike FileIngestionHistory, the history is not loaded in memory: signatures are looked up in the indexed table
+    on disk, pushes are written in batched transactions, and the file is never rewritten. The database is in WAL
+    mode, so a process killed in the middle of a push loses at most the records of the last COMMIT_INTERVAL_SECONDS.
+
+    The first time a dataset's database is opened, the records and latest timestamp of its FileIngestionHistory
+    (<dataset_id>.csv and <dataset_id>.ts) are imported if they exist. Those files are left as they were.
+    """
+    _connection: Optional[sqlite3.Connection] = None
+
+    def __init__(self, history_path: str, dataset_id: str, signature_fun=None):
+        """
+        Constructor
+        :param history_path: directory of the history databases
+        :param dataset_id:
+        :param signature_fun: function which creates the signature of the cache,
+                              a file path string as argument and returns a string (md5sum, time stamp)
+        """
+        self._dataset_id = dataset_id
+        self._signature_fun = signature_fun
+        self._pending_records = 0
+        self._commit_handle: Optional[asyncio.TimerHandle] = None
+
+        Path(history_path).mkdir(parents=True, exist_ok=True)
+        self._database_path = os.path.join(history_path, f'{dataset_id}.sqlite')
+        self._connection = sqlite3.connect(self._database_path)
+        self._connection.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS granules (
+                file_name TEXT PRIMARY KEY,
+                signature TEXT NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS metadata (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            ) WITHOUT ROWID;
+        """)
+
+        if self._get_metadata('created') is None:
+            self._import_file_history(history_path)
+
+        latest = self._get_metadata('latest_ingested_file_update')
+        if latest is not None:
+            self._latest_ingested_file_update = float(latest)
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        if self._connection is not None:
+            self._commit()
+            self._connection.close()
+            self._connection = None
+
+    async def flush(self):
+        self._commit()
+
+    def reset_cache(self):
+        with self._connection:
+            self._connection.execute('DELETE FROM granules')
+            self._connection.execute("DELETE FROM metadata WHERE key = 'latest_ingested_file_update'")
+        self._pending_records = 0
+        logger.info(f"history cache {self._database_path} cleared")
+
+    async def _save_latest_timestamp(self):
+        if self._latest_ingested_file_update:
+            # Written in the same transaction as the record that was pushed.
+            self._connection.execute("INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)",
+                                     ('latest_ingested_file_update', str(self._latest_ingested_file_update)))
+            self._mark_pending(0)
+
+    async def _push_record(self, file_name, signature):
+        self._connection.execute('INSERT OR REPLACE INTO granules (file_name, signature) VALUES (?, ?)',
+                                 (file_name, str(signature)))
+        self._mark_pending(1)
+
+    def _mark_pending(self, records: int):
+        """
+        Commit the open transaction now if the batch is full, or schedule its commit. Every write goes through here,
+        so that no write is left in a transaction without a commit scheduled.
+        """
+        self._pending_records += records
+        if self._pending_records >= COMMIT_BATCH_SIZE:
+            self._commit()
+        elif self._commit_handle is None:
+            self._commit_handle = asyncio.get_running_loop().call_later(COMMIT_INTERVAL_SECONDS, self._commit)
+
+    async def _get_signature(self, file_name):
+        row = self._connection.execute('SELECT signature FROM granules WHERE file_name = ?', (file_name,)).fetchone()
+        return row[0] if row is not None else None
+
+    def _commit(self):
+        if self._commit_handle is not None:
+            self._commit_handle.cancel()
+            self._commit_handle = None
+        if self._connection is not None:
+            self._connection.commit()
+        self._pending_records = 0
+
+    def _get_metadata(self, key: str) -> Optional[str]:
+        row = self._connection.execute('SELECT value FROM metadata WHERE key = ?', (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def _import_file_history(self, history_path: str):
+        csv_path = os.path.join(history_path, f'{self._dataset_id}.csv')
+        ts_path = os.path.join(history_path, f'{self._dataset_id}.ts')
+
+        with self._connection:
+            try:
+                with open(csv_path, 'r') as f_history:
+                    changes = self._connection.total_changes
+                    # Later lines win, as when FileIngestionHistory loads the file.
+                    self._connection.executemany('INSERT OR REPLACE INTO granules (file_name, signature) VALUES (?, ?)',
+                                                 (line.strip().split(',') for line in f_history))
+                logger.info(f"Imported {self._connection.total_changes - changes} records of {csv_path} into "
+                            f"{self._database_path}")
+            except FileNotFoundError:
+                pass
+
+            try:
+                with open(ts_path, 'r') as f_ts:
+                    self._connection.execute("INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)",
+                                             ('latest_ingested_file_update', str(float(f_ts.readline()))))
+            except FileNotFoundError:
+                pass
+
+            self._connection.execute("INSERT INTO metadata (key, value) VALUES ('created', datetime('now'))")
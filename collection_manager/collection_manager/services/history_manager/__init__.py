@@ -16,4 +16,6 @@
 from .FileIngestionHistory import FileIngestionHistory, FileIngestionHistoryBuilder
 from .IngestionHistory import GranuleStatus
 from .IngestionHistory import IngestionHistory, md5sum_from_filepath
+from .SignatureCalculator import SignatureCalculator
 from .SolrIngestionHistory import SolrIngestionHistory, SolrIngestionHistoryBuilder
+from .SqliteIngestionHistory import SqliteIngestionHistory, SqliteIngestionHistoryBuilder
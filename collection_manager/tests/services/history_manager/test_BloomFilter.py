@@ -0,0 +1,41 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from collection_manager.services.history_manager.BloomFilter import BloomFilter
+
+
+class TestBloomFilter(unittest.TestCase):
+
+    def test_added_keys_are_found(self):
+        bloom_filter = BloomFilter(capacity=1000)
+        for i in range(1000):
+            bloom_filter.add(f'granule_{i}.nc')
+
+        self.assertEqual(1000, len(bloom_filter))
+        self.assertTrue(all(f'granule_{i}.nc' in bloom_filter for i in range(1000)))
+
+    def test_error_rate(self):
+        bloom_filter = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom_filter.add(f'granule_{i}.nc')
+
+        false_positives = sum(f'other_{i}.nc' in bloom_filter for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+if __name__ == '__main__':
+    unittest.main()
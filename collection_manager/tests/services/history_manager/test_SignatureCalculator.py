@@ -0,0 +1,83 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from collection_manager.services.history_manager import (GranuleStatus, SignatureCalculator,
+                                                         SqliteIngestionHistory, md5sum_from_filepath)
+from collection_manager.services.history_manager.SignatureCalculator import xxhash
+from common.async_test_utils.AsyncTestUtils import async_test
+
+
+class TestSignatureCalculator(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.granule = os.path.join(self.directory.name, 'granule.nc')
+        with open(self.granule, 'wb') as f:
+            f.write(os.urandom(3 * 1024 * 1024 + 17))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_md5_is_compatible(self):
+        self.assertEqual(md5sum_from_filepath(self.granule), SignatureCalculator('md5')(self.granule))
+
+    def test_algorithms(self):
+        signatures = {SignatureCalculator(algorithm)(self.granule) for algorithm in ('md5', 'blake2b')}
+        self.assertEqual(2, len(signatures))
+        self.assertTrue(all(len(signature) == 32 for signature in signatures))
+
+        with self.assertRaises(ValueError):
+            SignatureCalculator('crc32')
+
+    @unittest.skipIf(xxhash is None, 'xxhash is not installed')
+    def test_xxhash(self):
+        self.assertEqual(32, len(SignatureCalculator('xxhash')(self.granule)))
+
+    def test_files_are_hashed_once_per_change(self):
+        calculator = SignatureCalculator('blake2b')
+        with mock.patch.object(calculator, '_hash', wraps=calculator._hash) as hash_function:
+            first = calculator(self.granule)
+            self.assertEqual(first, calculator(self.granule))
+            self.assertEqual(1, hash_function.call_count)
+
+            with open(self.granule, 'ab') as f:
+                f.write(b'x')
+            self.assertNotEqual(first, calculator(self.granule))
+            self.assertEqual(2, hash_function.call_count)
+
+    @async_test
+    async def test_signature_is_only_computed_when_needed(self):
+        signature_fun = mock.Mock(side_effect=SignatureCalculator())
+        ingestion_history = SqliteIngestionHistory(self.directory.name, 'dataset', signature_fun)
+        await ingestion_history.push(self.granule, 1000)
+        signature_fun.reset_mock()
+
+        status = await ingestion_history.get_granule_status(self.granule, 2000)
+        self.assertIs(GranuleStatus.DESIRED_FORWARD_PROCESSING, status)
+        signature_fun.assert_not_called()
+
+        status = await ingestion_history.get_granule_status(self.granule, 500)
+        self.assertIs(GranuleStatus.UNDESIRED, status)
+        signature_fun.assert_called_once_with(self.granule)
+        ingestion_history.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
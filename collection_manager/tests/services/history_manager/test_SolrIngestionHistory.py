@@ -13,8 +13,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import unittest
-from collection_manager.services.history_manager import SolrIngestionHistory
+from unittest import mock
+
+from collection_manager.services.history_manager import GranuleStatus, SolrIngestionHistory
+from collection_manager.services.history_manager.SolrIngestionHistory import doc_key
+from common.async_test_utils.AsyncTestUtils import async_test
 
 SOLR_URL = "http://localhost:8984/solr"
 DATASET_ID = "zobi_la_mouche"
@@ -55,5 +60,161 @@ class TestSolrIngestionHistory(unittest.TestCase):
         self.assertEqual(result, None)
 
 
+class FakeSolr:
+    """
+    Stands in for a pysolr.Solr client of the granules collection, answering {!terms f=id} queries.
+    """
+
+    def __init__(self, docs=None):
+        self.docs = {doc['id']: doc for doc in docs or []}
+        self.searches = []
+        self.updates = []
+
+    def search(self, q, fq=None, fl=None, rows=None, sort=None, cursorMark=None):
+        self.searches.append(fq)
+        if cursorMark is not None:
+            # Pages of the export of a dataset
+            docs = sorted(self.docs.values(), key=lambda doc: doc['id'])
+            start = 0 if cursorMark == '*' else int(cursorMark)
+            next_cursor = str(min(start + rows, len(docs))) if start < len(docs) else cursorMark
+            return mock.Mock(docs=docs[start:start + rows], hits=len(docs), nextCursorMark=next_cursor)
+        ids = fq[len('{!terms f=id}'):].split(',')
+        return mock.Mock(docs=[self.docs[doc_id] for doc_id in ids if doc_id in self.docs])
+
+    def add(self, docs, commit=None, commitWithin=None):
+        self.updates.append((docs, commit, commitWithin))
+
+
+class TestSolrIngestionHistoryBatching(unittest.TestCase):
+
+    def make_history(self, granule_docs=None, history_cache='none'):
+        with mock.patch.object(SolrIngestionHistory, '_create_collection_if_needed'), \
+                mock.patch('pysolr.Solr') as solr:
+            solr.return_value.search.return_value = []
+            ingestion_history = SolrIngestionHistory(SOLR_URL, DATASET_ID, history_cache=history_cache)
+        ingestion_history._req_session = mock.Mock()
+        ingestion_history._solr_granules = FakeSolr(granule_docs)
+        ingestion_history._solr_datasets = FakeSolr()
+        return ingestion_history
+
+    @async_test
+    async def test_concurrent_lookups_are_batched(self):
+        docs = [{'id': doc_key(DATASET_ID, f'{i}.nc'), 'granule_signature_s': str(i)} for i in range(0, 10, 2)]
+        ingestion_history = self.make_history(docs)
+
+        signatures = await asyncio.gather(*(ingestion_history._get_signature(f'{i}.nc') for i in range(10)))
+
+        self.assertEqual(['0', None, '2', None, '4', None, '6', None, '8', None], signatures)
+        self.assertEqual(1, len(ingestion_history._solr_granules.searches))
+
+    @async_test
+    async def test_get_granule_statuses(self):
+        docs = [{'id': doc_key(DATASET_ID, 'old.nc'), 'granule_signature_s': '100'}]
+        ingestion_history = self.make_history(docs)
+        ingestion_history._latest_ingested_file_update = 1000
+
+        statuses = await ingestion_history.get_granule_statuses([('/data/old.nc', 100),
+                                                                 ('/data/missed.nc', 200),
+                                                                 ('/data/new.nc', 2000)])
+
+        self.assertEqual([GranuleStatus.UNDESIRED, GranuleStatus.DESIRED_HISTORICAL,
+                          GranuleStatus.DESIRED_FORWARD_PROCESSING], statuses)
+        self.assertEqual(1, len(ingestion_history._solr_granules.searches))
+
+    @async_test
+    async def test_pushes_are_buffered(self):
+        ingestion_history = self.make_history()
+
+        await ingestion_history.push('/data/a.nc', 100)
+        await ingestion_history.push('/data/b.nc', 300)
+        await ingestion_history.push('/data/c.nc', 200)
+        self.assertEqual([], ingestion_history._solr_granules.updates)
+        self.assertEqual('100', await ingestion_history._get_signature('a.nc'))
+
+        await ingestion_history.flush()
+
+        docs, commit, commit_within = ingestion_history._solr_granules.updates[0]
+        self.assertEqual(['a.nc', 'b.nc', 'c.nc'], [doc['granule_s'] for doc in docs])
+        self.assertFalse(commit)
+        self.assertIsNotNone(commit_within)
+        self.assertEqual(1, len(ingestion_history._solr_granules.updates))
+        self.assertEqual([[{'id': DATASET_ID, 'dataset_s': DATASET_ID, 'latest_update_l': 300}]],
+                         [docs for docs, _, _ in ingestion_history._solr_datasets.updates])
+        # Lookups are answered until Solr has committed the pushed records.
+        self.assertEqual('300', await ingestion_history._get_signature('b.nc'))
+        self.assertEqual([], ingestion_history._solr_granules.searches)
+
+    @async_test
+    async def test_flush_sends_records_left_by_timed_flush(self):
+        ingestion_history = self.make_history()
+        updates = ingestion_history._solr_granules.updates
+        send_updates = ingestion_history._send_updates
+        solr_unreachable = asyncio.Event()
+
+        async def fail_once(docs, latest_update):
+            if not updates:
+                updates.append(None)
+                await solr_unreachable.wait()
+                raise ConnectionError('solr unreachable')
+            await send_updates(docs, latest_update)
+
+        ingestion_history._send_updates = fail_once
+        with mock.patch('collection_manager.services.history_manager.SolrIngestionHistory.PUSH_FLUSH_SECONDS', 0):
+            await ingestion_history.push('/data/a.nc', 100)
+            while not updates:
+                await asyncio.sleep(0)
+            # The flush started by the timer is kept until it is done.
+            self.assertIsNotNone(ingestion_history._flush_task)
+
+            solr_unreachable.set()
+            await ingestion_history.flush()
+
+        self.assertEqual(['a.nc'], [doc['granule_s'] for doc in updates[1][0]])
+        self.assertEqual({}, ingestion_history._pending_docs)
+        self.assertFalse(ingestion_history._latest_update_pending)
+        self.assertIsNone(ingestion_history._flush_task)
+
+    @staticmethod
+    def granule_docs(count):
+        return [{'id': doc_key(DATASET_ID, f'{i}.nc'), 'granule_s': f'{i}.nc', 'granule_signature_s': f'{i:032x}'}
+                for i in range(count)]
+
+    @async_test
+    async def test_map_cache(self):
+        ingestion_history = self.make_history(self.granule_docs(25), history_cache='map')
+
+        with mock.patch('collection_manager.services.history_manager.SolrIngestionHistory.EXPORT_PAGE_SIZE', 10):
+            signatures = await ingestion_history._get_signatures(['3.nc', '24.nc', '25.nc'])
+
+        self.assertEqual({'3.nc': f'{3:032x}', '24.nc': f'{24:032x}', '25.nc': None}, signatures)
+        self.assertFalse(any(search.startswith('{!terms') for search in ingestion_history._solr_granules.searches))
+        self.assertEqual(bytes.fromhex(f'{3:032x}'), ingestion_history._signature_map['3.nc'])
+
+        await ingestion_history._push_record('25.nc', 'signature')
+        await ingestion_history.flush()
+        ingestion_history._uncommitted_signatures.clear()
+        self.assertEqual('signature', await ingestion_history._get_signature('25.nc'))
+
+    @async_test
+    async def test_bloom_filter_cache(self):
+        ingestion_history = self.make_history(self.granule_docs(100), history_cache='bloom')
+
+        signatures = await ingestion_history._get_signatures([f'{i}.nc' for i in range(50, 150)])
+
+        self.assertEqual({f'{i}.nc': f'{i:032x}' if i < 100 else None for i in range(50, 150)}, signatures)
+        looked_up = [search for search in ingestion_history._solr_granules.searches if search.startswith('{!terms')]
+        self.assertEqual(1, len(looked_up))
+        # Only the granules that may have been ingested are looked up in Solr.
+        self.assertLess(len(looked_up[0].split(',')), 60)
+
+    @async_test
+    async def test_cache_falls_back_to_solr(self):
+        ingestion_history = self.make_history(self.granule_docs(3), history_cache='map')
+        ingestion_history._load_signature_map = mock.Mock(side_effect=OSError('unreachable'))
+
+        self.assertEqual(f'{1:032x}', await ingestion_history._get_signature('1.nc'))
+        self.assertIsNone(ingestion_history._signature_map)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,108 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import pathlib
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from collection_manager.services.history_manager import (SqliteIngestionHistory,
+                                                         md5sum_from_filepath)
+
+from common.async_test_utils.AsyncTestUtils import async_test
+
+DATASET_ID = "zobi_la_mouche"
+
+
+class TestSqliteIngestionHistory(unittest.TestCase):
+
+    @async_test
+    async def test_get_md5sum(self):
+        with tempfile.TemporaryDirectory() as history_dir:
+            ingestion_history = SqliteIngestionHistory(history_dir, DATASET_ID, md5sum_from_filepath)
+            await ingestion_history._push_record("blue", "12weeukrhbwerqu7wier")
+            self.assertEqual("12weeukrhbwerqu7wier", await ingestion_history._get_signature("blue"))
+            self.assertIsNone(await ingestion_history._get_signature("green"))
+            ingestion_history.close()
+
+    @async_test
+    async def test_history_is_kept_across_instances(self):
+        with tempfile.TemporaryDirectory() as history_dir:
+            current_file_path = str(pathlib.Path(__file__))
+            ingestion_history = SqliteIngestionHistory(history_dir, DATASET_ID, md5sum_from_filepath)
+            await ingestion_history.push(current_file_path, 1600000000)
+            await ingestion_history.push(current_file_path, 1500000000)
+            ingestion_history.close()
+
+            ingestion_history = SqliteIngestionHistory(history_dir, DATASET_ID, md5sum_from_filepath)
+            self.assertTrue(await ingestion_history._already_ingested(current_file_path,
+                                                                      md5sum_from_filepath(current_file_path)))
+            self.assertEqual(1600000000, ingestion_history._latest_ingested_file_update)
+            ingestion_history.close()
+
+    @async_test
+    async def test_file_history_is_imported(self):
+        with tempfile.TemporaryDirectory() as history_dir:
+            with open(os.path.join(history_dir, f'{DATASET_ID}.csv'), 'w') as f:
+                f.write('blue,1\ngreen,2\nblue,3\n')
+            with open(os.path.join(history_dir, f'{DATASET_ID}.ts'), 'w') as f:
+                f.write('1600000000.0\n')
+
+            ingestion_history = SqliteIngestionHistory(history_dir, DATASET_ID)
+            self.assertEqual('3', await ingestion_history._get_signature('blue'))
+            self.assertEqual('2', await ingestion_history._get_signature('green'))
+            self.assertEqual(1600000000, ingestion_history._latest_ingested_file_update)
+            await ingestion_history._push_record('green', '4')
+            ingestion_history.close()
+
+            # The CSV file is only imported once.
+            ingestion_history = SqliteIngestionHistory(history_dir, DATASET_ID)
+            self.assertEqual('4', await ingestion_history._get_signature('green'))
+            ingestion_history.close()
+
+    @async_test
+    async def test_timestamp_is_committed_after_full_batch(self):
+        with tempfile.TemporaryDirectory() as history_dir:
+            current_file_path = str(pathlib.Path(__file__))
+            ingestion_history = SqliteIngestionHistory(history_dir, DATASET_ID)
+            with mock.patch('collection_manager.services.history_manager.SqliteIngestionHistory.COMMIT_BATCH_SIZE', 2):
+                await ingestion_history.push(current_file_path, 1500000000)
+                await ingestion_history.push(current_file_path, 1600000000)
+
+            # The batch was committed by the second record; the timestamp written after it has its commit scheduled.
+            self.assertIsNotNone(ingestion_history._commit_handle)
+            ingestion_history._commit()
+            self.assertFalse(ingestion_history._connection.in_transaction)
+
+            other = sqlite3.connect(os.path.join(history_dir, f'{DATASET_ID}.sqlite'))
+            row = other.execute("SELECT value FROM metadata WHERE key = 'latest_ingested_file_update'").fetchone()
+            self.assertEqual(1600000000, float(row[0]))
+            other.close()
+            ingestion_history.close()
+
+    @async_test
+    async def test_reset_cache(self):
+        with tempfile.TemporaryDirectory() as history_dir:
+            ingestion_history = SqliteIngestionHistory(history_dir, DATASET_ID)
+            await ingestion_history.push('s3://bucket/blue.nc', 1600000000)
+            ingestion_history.reset_cache()
+            self.assertIsNone(await ingestion_history._get_signature('blue.nc'))
+            ingestion_history.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
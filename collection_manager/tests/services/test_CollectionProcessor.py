@@ -192,6 +192,37 @@ class TestCollectionProcessor(unittest.TestCase):
         mock_publisher.publish_message.assert_not_called()
         mock_history.push.assert_not_called()
 
+    @async_test
+    @mock.patch('collection_manager.services.history_manager.FileIngestionHistory', new_callable=AsyncMock)
+    @mock.patch('collection_manager.services.history_manager.FileIngestionHistoryBuilder', autospec=True)
+    @mock.patch('collection_manager.services.MessagePublisher', new_callable=AsyncMock)
+    async def test_process_granules(self, mock_publisher, mock_history_builder, mock_history):
+        mock_history.get_granule_statuses.return_value = [GranuleStatus.DESIRED_HISTORICAL,
+                                                          GranuleStatus.UNDESIRED,
+                                                          GranuleStatus.DESIRED_FORWARD_PROCESSING]
+        mock_history_builder.build.return_value = mock_history
+
+        collection_processor = CollectionProcessor(mock_publisher, mock_history_builder)
+        collection = Collection(dataset_id="test_dataset",
+                                path="test_path",
+                                projection="Grid",
+                                slices=frozenset(),
+                                dimension_names=frozenset(),
+                                historical_priority=1,
+                                forward_processing_priority=2,
+                                date_from=None,
+                                date_to=None)
+
+        await collection_processor.process_granules([("old.nc", 100),
+                                                     ("ingested.nc", 200),
+                                                     ("test.foo", 250),
+                                                     ("new.h5", 300)], collection)
+
+        mock_history.get_granule_statuses.assert_called_once_with([("old.nc", 100), ("ingested.nc", 200),
+                                                                   ("new.h5", 300)], None, None)
+        self.assertEqual([1, 2], [call.kwargs['priority'] for call in mock_publisher.publish_message.call_args_list])
+        self.assertEqual([mock.call("old.nc", 100), mock.call("new.h5", 300)], mock_history.push.call_args_list)
+
     @async_test
     @mock.patch('collection_manager.services.history_manager.FileIngestionHistory', autospec=True)
     @mock.patch('collection_manager.services.history_manager.FileIngestionHistoryBuilder', autospec=True)
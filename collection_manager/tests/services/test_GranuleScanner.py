@@ -0,0 +1,145 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import unittest
+
+from collection_manager.services.GranuleScanner import GranuleScanner
+from collection_manager.services.ScanSnapshot import ScanSnapshot
+from common.async_test_utils.AsyncTestUtils import AsyncMock, async_test
+
+
+class TestGranuleScanner(unittest.TestCase):
+
+    def make_tree(self, root: str):
+        paths = []
+        for directory in ('', 'a', 'a/b', 'a/b/c', 'd'):
+            os.makedirs(os.path.join(root, directory), exist_ok=True)
+            for i in range(3):
+                path = os.path.join(root, directory, f'granule_{i}.nc')
+                with open(path, 'w') as f:
+                    f.write('x')
+                os.utime(path, (1600000000 + i, 1600000000 + i))
+                paths.append(path)
+
+        os.makedirs(os.path.join(root, '.hidden'))
+        with open(os.path.join(root, '.hidden', 'granule.nc'), 'w') as f:
+            f.write('x')
+        with open(os.path.join(root, '.granule.nc'), 'w') as f:
+            f.write('x')
+        os.symlink(root, os.path.join(root, 'd', 'loop'))
+        return paths
+
+    @async_test
+    async def test_scan_directory(self):
+        with tempfile.TemporaryDirectory() as root:
+            paths = self.make_tree(root)
+            callback = AsyncMock()
+
+            count = await GranuleScanner(scan_threads=2, callback_concurrency=3, queue_size=2).scan(root, callback)
+
+            self.assertEqual(len(paths), count)
+            scanned = sorted(call.args for call in callback.call_args_list)
+            self.assertEqual(sorted((path, 1600000000 + int(path[-4])) for path in paths), scanned)
+
+    @async_test
+    async def test_scan_file_and_pattern(self):
+        with tempfile.TemporaryDirectory() as root:
+            paths = self.make_tree(root)
+
+            callback = AsyncMock()
+            self.assertEqual(1, await GranuleScanner().scan(paths[0], callback))
+            callback.assert_called_once_with(paths[0], 1600000000)
+
+            callback = AsyncMock()
+            self.assertEqual(3, await GranuleScanner().scan(os.path.join(root, 'a', 'b', '*.nc'), callback))
+
+    @async_test
+    async def test_scan_batches(self):
+        with tempfile.TemporaryDirectory() as root:
+            paths = self.make_tree(root)
+            callback = AsyncMock()
+
+            count = await GranuleScanner(scan_threads=2, callback_concurrency=2).scan_batches(root, callback,
+                                                                                               batch_size=4)
+
+            self.assertEqual(len(paths), count)
+            batches = [call.args[0] for call in callback.call_args_list]
+            self.assertTrue(all(1 <= len(batch) <= 4 for batch in batches))
+            self.assertLess(len(batches), len(paths))
+            scanned = sorted(scanned_file for batch in batches for scanned_file in batch)
+            self.assertEqual(sorted((path, 1600000000 + int(path[-4])) for path in paths), scanned)
+
+    @async_test
+    async def test_failing_callback_stops_the_scan(self):
+        with tempfile.TemporaryDirectory() as root:
+            self.make_tree(root)
+            callback = AsyncMock(side_effect=ValueError('test'))
+
+            with self.assertRaises(ValueError):
+                await GranuleScanner(callback_concurrency=2, queue_size=1).scan(root, callback)
+            self.assertLessEqual(callback.call_count, 2)
+
+    @async_test
+    async def test_incremental_scan(self):
+        with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as snapshot_dir:
+            granules = os.path.join(root, 'granules')
+            paths = self.make_tree(granules)
+            snapshot_path = os.path.join(snapshot_dir, 'snapshot.db')
+
+            async def scan(fingerprint='v1'):
+                callback = AsyncMock()
+                scanner = GranuleScanner(scan_threads=2, snapshot=ScanSnapshot(snapshot_path))
+                count = await scanner.scan(granules, callback, scope='collection', fingerprint=fingerprint)
+                self.assertEqual(count, callback.call_count)
+                return sorted(call.args[0] for call in callback.call_args_list)
+
+            self.assertEqual(sorted(paths), await scan())
+            self.assertEqual([], await scan())
+
+            new_granule = os.path.join(granules, 'a', 'b', 'new.nc')
+            with open(new_granule, 'w') as f:
+                f.write('x')
+            # Rewritten in place in a directory that changed, with a new size.
+            with open(paths[6], 'w') as f:
+                f.write('xx')
+            self.assertEqual(sorted([new_granule, paths[6]]), await scan())
+            self.assertEqual([], await scan())
+
+            os.rename(os.path.join(granules, 'a', 'b', 'c'), os.path.join(granules, 'e'))
+            self.assertEqual(sorted(os.path.join(granules, 'e', f'granule_{i}.nc') for i in range(3)), await scan())
+
+            self.assertEqual(len(paths) + 1, len(await scan(fingerprint='v2')))
+
+    @async_test
+    async def test_interrupted_scan_is_followed_by_a_full_scan(self):
+        with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as snapshot_dir:
+            paths = self.make_tree(root)
+            snapshot = ScanSnapshot(os.path.join(snapshot_dir, 'snapshot.db'))
+            scanner = GranuleScanner(snapshot=snapshot)
+
+            await scanner.scan(root, AsyncMock(), scope='collection')
+            with open(os.path.join(root, 'd', 'new.nc'), 'w') as f:
+                f.write('x')
+            with self.assertRaises(ValueError):
+                await scanner.scan(root, AsyncMock(side_effect=ValueError('test')), scope='collection')
+
+            # The last scan did not finish, so none of its work can be trusted.
+            self.assertEqual(len(paths) + 1, await scanner.scan(root, AsyncMock(), scope='collection'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from collection_manager.services.InotifyObserver import InotifyObserver
+
+
+class _Handler:
+    def __init__(self):
+        self.events = []
+        self._condition = threading.Condition()
+
+    def on_created(self, event):
+        self._record('created', event)
+
+    def on_modified(self, event):
+        self._record('modified', event)
+
+    def _record(self, kind, event):
+        with self._condition:
+            self.events.append((kind, event.src_path))
+            self._condition.notify_all()
+
+    def wait_for(self, count, timeout=5.0):
+        with self._condition:
+            self._condition.wait_for(lambda: len(self.events) >= count, timeout)
+        return sorted(self.events)
+
+
+@unittest.skipUnless(InotifyObserver.available(), 'inotify is not available')
+class TestInotifyObserver(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        self.observer = InotifyObserver(settle_seconds=0.2)
+        self.handler = _Handler()
+        self.watch = self.observer.schedule(self.handler, self.root, recursive=True)
+        self.observer.start()
+
+    def tearDown(self):
+        self.observer.stop()
+        self.directory.cleanup()
+
+    def test_closed_file_is_reported_once(self):
+        path = os.path.join(self.root, 'granule.nc')
+        with open(path, 'w') as f:
+            f.write('a')
+            f.flush()
+            f.write('b')
+
+        self.assertEqual([('created', path)], self.handler.wait_for(1))
+        time.sleep(0.4)
+        self.assertEqual([('created', path)], self.handler.events)
+
+    def test_new_directories_are_watched(self):
+        nested = os.path.join(self.root, 'a', 'b')
+        os.makedirs(nested)
+        first = os.path.join(nested, 'first.nc')
+        with open(first, 'w') as f:
+            f.write('x')
+        self.handler.wait_for(1)
+
+        second = os.path.join(nested, 'second.nc')
+        with open(second, 'w') as f:
+            f.write('x')
+        events = self.handler.wait_for(2)
+        self.assertEqual({first, second}, {path for _, path in events})
+
+    def test_symlink_loop_is_watched_once(self):
+        with tempfile.TemporaryDirectory() as tree:
+            nested = os.path.join(tree, 'a', 'b')
+            os.makedirs(nested)
+            os.symlink(tree, os.path.join(nested, 'loop'))
+            observer = InotifyObserver()
+            try:
+                observer.schedule(self.handler, tree)
+                self.assertEqual({tree, os.path.join(tree, 'a'), nested}, set(observer._wd_for_path))
+            finally:
+                observer.stop()
+
+    def test_moved_file_and_open_file(self):
+        outside = tempfile.NamedTemporaryFile('w', delete=False, dir=os.path.dirname(self.root))
+        outside.write('x')
+        outside.close()
+        moved = os.path.join(self.root, 'moved.nc')
+        os.rename(outside.name, moved)
+
+        growing = os.path.join(self.root, 'growing.nc')
+        f = open(growing, 'w')
+        f.write('x')
+        f.flush()
+
+        try:
+            # The open file is reported once it has settled.
+            self.assertEqual([('created', growing), ('created', moved)], self.handler.wait_for(2))
+        finally:
+            f.close()
+
+    def test_overflow_rescans_modified_files(self):
+        old = os.path.join(self.root, 'old.nc')
+        with open(old, 'w') as f:
+            f.write('x')
+        os.utime(old, (time.time() - 3600, time.time() - 3600))
+        self.handler.wait_for(1)
+        self.handler.events.clear()
+
+        with self.observer._lock:
+            recent = os.path.join(self.root, 'recent.nc')
+            with open(recent, 'w') as f:
+                f.write('x')
+            self.observer._rescan_after_overflow()
+        self.assertIn(('modified', recent), self.handler.wait_for(1))
+        self.assertNotIn(('modified', old), self.handler.events)
+
+    def test_unschedule(self):
+        os.makedirs(os.path.join(self.root, 'a'))
+        self.observer.unschedule(self.watch)
+        self.assertEqual({}, self.observer._wd_for_path)
+
+        with open(os.path.join(self.root, 'granule.nc'), 'w') as f:
+            f.write('x')
+        time.sleep(0.4)
+        self.assertEqual([], self.handler.events)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from collection_manager.services.S3KeyCache import S3KeyCache
+
+
+class TestS3KeyCache(unittest.TestCase):
+
+    def test_append_set_and_pop(self):
+        cache = S3KeyCache('avhrr/')
+        cache.append('avhrr/2012/a.nc', 1)
+        cache.append('avhrr/2012/c.nc', 3)
+        cache.set('avhrr/2012/b.nc', 2)
+        cache.append('avhrr/2012/a.nc', 4)
+
+        self.assertEqual([('avhrr/2012/a.nc', 4), ('avhrr/2012/b.nc', 2), ('avhrr/2012/c.nc', 3)], list(cache.items()))
+        self.assertEqual('avhrr/2012/c.nc', cache.last_key())
+        self.assertEqual(2, cache.get('avhrr/2012/b.nc'))
+        self.assertIsNone(cache.get('avhrr/2012/d.nc'))
+        self.assertNotIn('modis/2012/a.nc', cache)
+
+        self.assertEqual(2, cache.pop('avhrr/2012/b.nc'))
+        self.assertIsNone(cache.pop('avhrr/2012/b.nc'))
+        self.assertEqual(2, len(cache))
+
+    def test_nbytes(self):
+        cache = S3KeyCache('avhrr/')
+        empty = cache.nbytes()
+        for i in range(1000):
+            cache.append(f'avhrr/2012/{i:04}.nc', i)
+        self.assertGreater(cache.nbytes(), empty + 1000 * 8)
+
+        for i in range(1000):
+            cache.pop(f'avhrr/2012/{i:04}.nc')
+        self.assertLess(cache.nbytes(), empty + 1000 * 16)
+
+    def test_keys_outside_the_prefix_are_rejected(self):
+        with self.assertRaises(KeyError):
+            S3KeyCache('avhrr/').set('modis/a.nc', 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import contextlib
+import datetime
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from collection_manager.services import S3NotificationObserver
+from common.async_test_utils.AsyncTestUtils import async_test
+
+
+class FakeS3NotificationObserver(S3NotificationObserver):
+
+    def __init__(self, objects, queue='/dev/null'):
+        super().__init__('test-bucket', queue, initial_scan=True)
+        self.objects = objects
+
+    @contextlib.asynccontextmanager
+    async def _client(self):
+        yield None
+
+    async def _list_objects(self, s3, prefix, start_after=None):
+        for key in sorted(self.objects):
+            if key.startswith(prefix):
+                yield key, self.objects[key]
+
+
+def notification(event_name, key, event_time='2020-01-02T00:00:00.000Z', bucket='test-bucket'):
+    return json.dumps({'Records': [{'eventName': event_name,
+                                    'eventTime': event_time,
+                                    's3': {'bucket': {'name': bucket}, 'object': {'key': key}}}]})
+
+
+class TestS3NotificationObserver(unittest.TestCase):
+
+    @async_test
+    async def test_notifications_are_converted_to_events(self):
+        observer = FakeS3NotificationObserver({})
+        avhrr_handler = mock.Mock()
+        modis_handler = mock.Mock()
+        observer.schedule(avhrr_handler, 's3://test-bucket/avhrr')
+        observer.schedule(modis_handler, 's3://test-bucket/modis')
+        await observer._poll()
+
+        await observer._handle_notification(notification('ObjectCreated:Put', 'avhrr/2012/a+b.nc'))
+        await observer._handle_notification(notification('ObjectCreated:Put', 'other/c.nc'))
+        await observer._handle_notification(notification('ObjectCreated:Put', 'modis/d.nc', bucket='other-bucket'))
+        sns_message = json.dumps({'Type': 'Notification',
+                                  'Message': notification('ObjectCreated:Put', 'avhrr/2012/a+b.nc',
+                                                          event_time='2020-01-03T00:00:00Z')})
+        await observer._handle_notification(sns_message)
+        await observer._handle_notification('not json')
+
+        created = avhrr_handler.on_created.call_args.args[0]
+        self.assertEqual('s3://test-bucket/avhrr/2012/a b.nc', created.src_path)
+        self.assertEqual(datetime.datetime(2020, 1, 2, tzinfo=datetime.timezone.utc), created.modified_time)
+        modified = avhrr_handler.on_modified.call_args.args[0]
+        self.assertEqual(datetime.datetime(2020, 1, 3, tzinfo=datetime.timezone.utc), modified.modified_time)
+        modis_handler.on_created.assert_not_called()
+
+        await observer._handle_notification(notification('ObjectRemoved:Delete', 'avhrr/2012/a+b.nc'))
+        self.assertNotIn('avhrr/2012/a b.nc', observer._caches['avhrr'])
+
+    @async_test
+    async def test_reconciliation_reports_missed_objects_only(self):
+        listed_time = datetime.datetime(2020, 1, 1, 23, 59, 59, tzinfo=datetime.timezone.utc)
+        objects = {'avhrr/notified.nc': listed_time}
+        observer = FakeS3NotificationObserver(objects)
+        handler = mock.Mock()
+        observer.schedule(handler, 's3://test-bucket/avhrr')
+
+        await observer._handle_notification(notification('ObjectCreated:Put', 'avhrr/notified.nc'))
+        objects['avhrr/missed.nc'] = listed_time
+        handler.reset_mock()
+        await observer._poll()
+
+        self.assertEqual(['s3://test-bucket/avhrr/missed.nc'],
+                         [c.args[0].src_path for c in handler.on_created.call_args_list])
+        handler.on_modified.assert_not_called()
+        self.assertEqual(int(listed_time.timestamp()), observer._caches['avhrr'].get('avhrr/notified.nc'))
+
+    @async_test
+    async def test_file_feed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            feed_path = os.path.join(directory, 'events.jsonl')
+            with open(feed_path, 'w') as feed:
+                feed.write(notification('ObjectCreated:Put', 'avhrr/a.nc') + '\n')
+
+            observer = FakeS3NotificationObserver({}, queue=feed_path)
+            handler = mock.Mock()
+            observer.schedule(handler, 's3://test-bucket/avhrr')
+            task = asyncio.create_task(observer._consume_file(feed_path))
+            try:
+                await asyncio.sleep(0.1)
+                with open(feed_path, 'a') as feed:
+                    feed.write(notification('ObjectCreated:Put', 'avhrr/b.nc') + '\n')
+                await asyncio.sleep(1.5)
+            finally:
+                task.cancel()
+
+        self.assertEqual(['s3://test-bucket/avhrr/a.nc', 's3://test-bucket/avhrr/b.nc'],
+                         [c.args[0].src_path for c in handler.on_created.call_args_list])
+
+
+if __name__ == '__main__':
+    unittest.main()
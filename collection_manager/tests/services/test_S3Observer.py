@@ -13,11 +13,193 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from collection_manager.services import S3Observer
+import asyncio
+import contextlib
+import datetime
+import time
 import unittest
+from unittest import mock
+
+from collection_manager.services import S3Observer
+from collection_manager.services.S3KeyCache import S3KeyCache
+from common.async_test_utils.AsyncTestUtils import async_test
+
+
+class FakeS3Observer(S3Observer):
+    """
+    Lists the objects of an in-memory bucket, and records the listings that were made.
+    """
+
+    def __init__(self, objects, **kwargs):
+        super().__init__('test-bucket', initial_scan=True, **kwargs)
+        self.objects = objects
+        self.listings = []
+        # The listings raise an error after yielding this key.
+        self.fail_after = None
+
+    @contextlib.asynccontextmanager
+    async def _client(self):
+        yield None
+
+    async def _list_objects(self, s3, prefix, start_after=None):
+        self.listings.append((prefix, start_after))
+        for key in sorted(self.objects):
+            if key.startswith(prefix) and (start_after is None or key > start_after):
+                yield key, self.objects[key]
+                if key == self.fail_after:
+                    raise ConnectionError('listing interrupted')
+
+
+class ConcurrencyCountingS3Observer(FakeS3Observer):
+    """
+    Holds every listing until as many as possible are running, and records how many ran at once.
+    """
+
+    def __init__(self, objects, **kwargs):
+        super().__init__(objects, **kwargs)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _list_objects(self, s3, prefix, start_after=None):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Give the other listings a chance to start before this one yields anything.
+            for _ in range(10):
+                await asyncio.sleep(0)
+            async for item in super()._list_objects(s3, prefix, start_after):
+                yield item
+        finally:
+            self.in_flight -= 1
+
+
+def date(day):
+    return datetime.datetime(2020, 1, day, tzinfo=datetime.timezone.utc)
 
 
 class TestS3Observer(unittest.TestCase):
 
     def test_get_object_key(self):
         self.assertEqual('test_dir/object.nc', S3Observer._get_object_key('s3://test-bucket/test_dir/object.nc'))
+
+    @async_test
+    async def test_poll_reports_new_and_modified_objects(self):
+        objects = {'avhrr/2012/01/a.nc': date(1), 'avhrr/2012/02/b.nc': date(2)}
+        observer = FakeS3Observer(objects)
+        handler = mock.Mock()
+        observer.schedule(handler, 'avhrr')
+
+        await observer._poll()
+        self.assertEqual(2, handler.on_created.call_count)
+
+        objects['avhrr/2012/01/a.nc'] = date(3)
+        objects['avhrr/2012/03/c.nc'] = date(3)
+        handler.reset_mock()
+        await observer._poll()
+
+        self.assertEqual(['s3://test-bucket/avhrr/2012/03/c.nc'],
+                         [c.args[0].src_path for c in handler.on_created.call_args_list])
+        self.assertEqual(['s3://test-bucket/avhrr/2012/01/a.nc'],
+                         [c.args[0].src_path for c in handler.on_modified.call_args_list])
+        self.assertEqual([('avhrr', None), ('avhrr', None)], observer.listings)
+
+    @async_test
+    async def test_incremental_poll_lists_from_latest_partition(self):
+        objects = {'avhrr/2012/01/a.nc': date(1), 'avhrr/2012/02/b.nc': date(2)}
+        observer = FakeS3Observer(objects, full_listing_interval=3600)
+        handler = mock.Mock()
+        observer.schedule(handler, 'avhrr')
+        await observer._poll()
+
+        objects['avhrr/2012/01/late.nc'] = date(3)
+        objects['avhrr/2012/02/a.nc'] = date(3)
+        objects['avhrr/2012/03/c.nc'] = date(3)
+        handler.reset_mock()
+        await observer._poll()
+
+        self.assertEqual(('avhrr', 'avhrr/2012/02/'), observer.listings[-1])
+        self.assertEqual({'s3://test-bucket/avhrr/2012/02/a.nc', 's3://test-bucket/avhrr/2012/03/c.nc'},
+                         {c.args[0].src_path for c in handler.on_created.call_args_list})
+        handler.on_modified.assert_not_called()
+
+        # The object added to an older partition is found by the next full listing.
+        observer._last_full_listing = time.monotonic() - 3600
+        handler.reset_mock()
+        del objects['avhrr/2012/02/b.nc']
+        await observer._poll()
+
+        self.assertEqual(('avhrr', None), observer.listings[-1])
+        self.assertEqual(['s3://test-bucket/avhrr/2012/01/late.nc'],
+                         [c.args[0].src_path for c in handler.on_created.call_args_list])
+        self.assertNotIn('avhrr/2012/02/b.nc', observer._caches['avhrr'])
+        self.assertEqual(4, len(observer._caches['avhrr']))
+
+    @async_test
+    async def test_failed_incremental_listing_is_listed_again(self):
+        objects = {'avhrr/2012/01/a.nc': date(1)}
+        observer = FakeS3Observer(objects, full_listing_interval=3600)
+        handler = mock.Mock()
+        observer.schedule(handler, 'avhrr')
+        await observer._poll()
+
+        objects['avhrr/2012/02/b.nc'] = date(2)
+        objects['avhrr/2012/02/c.nc'] = date(2)
+        observer.fail_after = 'avhrr/2012/02/b.nc'
+        handler.reset_mock()
+        await observer._poll()
+        handler.on_created.assert_not_called()
+        self.assertNotIn('avhrr/2012/02/b.nc', observer._caches['avhrr'])
+
+        observer.fail_after = None
+        await observer._poll()
+        self.assertEqual(('avhrr', 'avhrr/2012/01/'), observer.listings[-1])
+        self.assertEqual({'s3://test-bucket/avhrr/2012/02/b.nc', 's3://test-bucket/avhrr/2012/02/c.nc'},
+                         {c.args[0].src_path for c in handler.on_created.call_args_list})
+
+    def test_start_after(self):
+        observer = S3Observer('test-bucket')
+        self.assertIsNone(observer._start_after('avhrr'))
+
+        observer._caches['avhrr'] = S3KeyCache('avhrr')
+        observer._caches['avhrr'].append('avhrr/2012/01/c.nc', 0)
+        observer._caches['avhrr'].append('avhrr/2012/02/b.nc', 0)
+        self.assertEqual('avhrr/2012/02/', observer._start_after('avhrr'))
+
+        observer._caches['flat'] = S3KeyCache('flat')
+        observer._caches['flat'].append('flat/b.nc', 0)
+        self.assertEqual('flat/b.nc', observer._start_after('flat'))
+
+    @async_test
+    async def test_prefixes_are_listed_concurrently(self):
+        objects = {f'{prefix}/{i}.nc': date(1) for prefix in ('a', 'b', 'c', 'd') for i in range(3)}
+        observer = ConcurrencyCountingS3Observer(objects, listing_concurrency=2)
+        handler = mock.Mock()
+        for prefix in ('a', 'b', 'c', 'd'):
+            observer.schedule(handler, f's3://test-bucket/{prefix}')
+
+        await observer._poll()
+
+        self.assertEqual({'a', 'b', 'c', 'd'}, {prefix for prefix, _ in observer.listings})
+        self.assertEqual(2, observer.max_in_flight)
+        self.assertEqual(12, handler.on_created.call_count)
+        self.assertEqual({'a', 'b', 'c', 'd'}, set(observer._caches))
+
+    @async_test
+    async def test_failed_prefix_does_not_hold_back_the_others(self):
+        objects = {'a/1.nc': date(1), 'b/1.nc': date(1), 'b/2.nc': date(1)}
+        observer = FakeS3Observer(objects)
+        handler = mock.Mock()
+        observer.schedule(handler, 's3://test-bucket/a')
+        observer.schedule(handler, 's3://test-bucket/b')
+        await observer._poll()
+
+        objects['a/2.nc'] = date(2)
+        objects['b/3.nc'] = date(2)
+        observer.fail_after = 'b/1.nc'
+        handler.reset_mock()
+        await observer._poll()
+
+        self.assertEqual(['s3://test-bucket/a/2.nc'], [c.args[0].src_path for c in handler.on_created.call_args_list])
+        self.assertEqual(2, len(observer._caches['b']))
+        # The full listing that failed is retried by the next poll.
+        self.assertIsNone(observer._last_full_listing)
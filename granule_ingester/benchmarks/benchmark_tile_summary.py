@@ -0,0 +1,176 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Micro-benchmark of the statistics computed by TileSummarizingProcessor: bounding box, min, max, count and the
+cos-latitude weighted mean. The plain-array kernels of the processor are timed against the masked array
+implementation they replaced, on the tiles of the test granules and on synthetic grid and swath tiles, after checking
+that both give the same results.
+
+Run from the granule_ingester directory:
+
+    python benchmarks/benchmark_tile_summary.py [--repeat 5]
+"""
+
+import argparse
+import logging
+import os
+import time
+import warnings
+
+import numpy
+import xarray as xr
+from nexusproto import DataTile_pb2 as nexusproto
+from nexusproto.serialization import from_shaped_array, to_shaped_array
+
+from granule_ingester.processors.TileSummarizingProcessor import (TileSummarizingProcessor, finite_min_max,
+                                                                  nan_min_max_count)
+from granule_ingester.processors.reading_processors import GridReadingProcessor
+from granule_ingester.slicers import SliceFileByStepSize
+
+GRANULES_DIR = os.path.join(os.path.dirname(__file__), '..', 'tests', 'granules')
+
+# name, granule file, reading processor arguments, step sizes
+GRANULE_CASES = [
+    ('mur', 'not_empty_mur.nc4', ('analysed_sst', 'lat', 'lon'), {'time': 1, 'lat': 10, 'lon': 10}),
+    ('ccmp', 'not_empty_ccmp.nc', ('uwnd', 'latitude', 'longitude'), {'time': 1, 'latitude': 38, 'longitude': 87}),
+]
+
+
+def legacy_summary(tile_data, tile_type: str):
+    """
+    The statistics of TileSummarizingProcessor before they were computed on plain arrays.
+    """
+    latitudes = numpy.ma.masked_invalid(from_shaped_array(tile_data.latitude))
+    longitudes = numpy.ma.masked_invalid(from_shaped_array(tile_data.longitude))
+    data = from_shaped_array(tile_data.variable_data)
+
+    bbox = (numpy.nanmin(latitudes).item(), numpy.nanmax(latitudes).item(),
+            numpy.nanmin(longitudes).item(), numpy.nanmax(longitudes).item())
+    if all(numpy.isnan(data).flatten()):
+        minimum, maximum = numpy.nan, numpy.nan
+    else:
+        minimum, maximum = numpy.nanmin(data).item(), numpy.nanmax(data).item()
+    count = data.size - numpy.count_nonzero(numpy.isnan(data))
+
+    if tile_type == 'swath_tile':
+        mean = numpy.ma.average(numpy.ma.masked_invalid(data), weights=numpy.cos(numpy.radians(latitudes))).item()
+    else:
+        repeated_latitudes = numpy.repeat(latitudes, len(longitudes))
+        mean = numpy.ma.average(numpy.ma.masked_invalid(data).flatten(),
+                                weights=numpy.cos(numpy.radians(repeated_latitudes))).item()
+    return bbox + (minimum, maximum, count, mean)
+
+
+def current_summary(tile_data, tile_type: str):
+    latitudes = from_shaped_array(tile_data.latitude)
+    longitudes = from_shaped_array(tile_data.longitude)
+    data = from_shaped_array(tile_data.variable_data)
+
+    bbox = finite_min_max(latitudes) + finite_min_max(longitudes)
+    if tile_type == 'swath_tile':
+        mean = TileSummarizingProcessor.calculate_mean_for_swath_tile(data, latitudes)
+    else:
+        mean = TileSummarizingProcessor.calculate_mean_for_grid_tile(data, latitudes, longitudes)
+    return bbox + nan_min_max_count(data) + (mean,)
+
+
+def granule_tiles(file_name: str, reader_args: tuple, step_sizes: dict):
+    granule_path = os.path.join(GRANULES_DIR, file_name)
+    if not os.path.exists(granule_path):
+        return None
+
+    reading_processor = GridReadingProcessor(*reader_args, time='time')
+    with xr.open_dataset(granule_path) as ds:
+        step_sizes = {dim: step for dim, step in step_sizes.items() if dim in ds.sizes}
+        slicer = SliceFileByStepSize(dimension_step_sizes=step_sizes)
+        tiles = []
+        for tile in slicer.generate_tiles(ds, file_name):
+            try:
+                tiles.append(reading_processor.process(tile, ds))
+            except Exception:
+                return None
+    return [tile for tile in tiles if tile.tile.WhichOneof('tile_type') == 'grid_tile']
+
+
+def synthetic_grid_tile(size: int, rng: numpy.random.Generator):
+    tile = nexusproto.NexusTile()
+    grid_tile = tile.tile.grid_tile
+    grid_tile.latitude.CopyFrom(to_shaped_array(numpy.linspace(-60, 60, size, dtype='f4')))
+    grid_tile.longitude.CopyFrom(to_shaped_array(numpy.linspace(0, 100, size, dtype='f4')))
+    data = rng.random((size, size)).astype('f4')
+    data[data < 0.3] = numpy.nan
+    grid_tile.variable_data.CopyFrom(to_shaped_array(data))
+    return tile
+
+
+def synthetic_swath_tile(shape: tuple, rng: numpy.random.Generator):
+    tile = nexusproto.NexusTile()
+    swath_tile = tile.tile.swath_tile
+    swath_tile.latitude.CopyFrom(to_shaped_array(rng.uniform(-80, 80, shape).astype('f4')))
+    swath_tile.longitude.CopyFrom(to_shaped_array(rng.uniform(-180, 180, shape).astype('f4')))
+    data = rng.random(shape).astype('f4')
+    data[data < 0.3] = numpy.nan
+    swath_tile.variable_data.CopyFrom(to_shaped_array(data))
+    return tile
+
+
+def best_time(summary, tiles, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for tile in tiles:
+            summary(getattr(tile.tile, tile.tile.WhichOneof('tile_type')), tile.tile.WhichOneof('tile_type'))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def same_results(tiles) -> bool:
+    for tile in tiles:
+        tile_type = tile.tile.WhichOneof('tile_type')
+        tile_data = getattr(tile.tile, tile_type)
+        legacy = numpy.array(legacy_summary(tile_data, tile_type), dtype='f8')
+        current = numpy.array(current_summary(tile_data, tile_type), dtype='f8')
+        if not numpy.array_equal(legacy, current, equal_nan=True):
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='Number of timed runs per case; the best is reported')
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    logging.disable(logging.CRITICAL)
+
+    rng = numpy.random.default_rng(0)
+    cases = [(name, granule_tiles(file_name, reader_args, step_sizes))
+             for name, file_name, reader_args, step_sizes in GRANULE_CASES]
+    cases.append(('500x500 grid', [synthetic_grid_tile(500, rng)]))
+    cases.append(('swath', [synthetic_swath_tile((100, 60), rng) for _ in range(20)]))
+
+    for name, tiles in cases:
+        if not tiles:
+            print(f'{name:14s} skipped: test granule not available')
+            continue
+        legacy = best_time(legacy_summary, tiles, args.repeat)
+        current = best_time(current_summary, tiles, args.repeat)
+        print(f'{name:14s} {len(tiles):4d} tiles  {legacy * 1e3:8.1f}ms -> {current * 1e3:7.1f}ms  '
+              f'({legacy / current:.1f}x){"" if same_results(tiles) else "  RESULTS DIFFER"}')
+
+
+if __name__ == '__main__':
+    main()
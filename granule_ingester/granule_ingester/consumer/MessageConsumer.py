@@ -19,7 +19,7 @@ import aio_pika
 from granule_ingester.exceptions import PipelineBuildingError, PipelineRunningError, RabbitMQLostConnectionError, \
     RabbitMQFailedHealthCheckError, LostConnectionError
 from granule_ingester.healthcheck import HealthCheck
-from granule_ingester.pipeline import Pipeline
+from granule_ingester.pipeline import Pipeline, WorkerTuner
 
 logger = logging.getLogger(__name__)
 
@@ -69,7 +69,8 @@ class MessageConsumer(HealthCheck):
                                 data_store_factory,
                                 metadata_store_factory,
                                 pipeline_max_concurrency: int,
-                                log_level=logging.INFO):
+                                log_level=logging.INFO,
+                                worker_tuner: WorkerTuner = None):
         logger.info("Received a job from the queue. Starting pipeline.")
         try:
             config_str = message.body.decode("utf-8")
@@ -77,7 +78,8 @@ class MessageConsumer(HealthCheck):
             pipeline = Pipeline.from_string(config_str=config_str,
                                             data_store_factory=data_store_factory,
                                             metadata_store_factory=metadata_store_factory,
-                                            max_concurrency=pipeline_max_concurrency)
+                                            max_concurrency=pipeline_max_concurrency,
+                                            worker_tuner=worker_tuner)
             pipeline.set_log_level(log_level)
             await pipeline.run()
             await message.ack()
@@ -96,6 +98,13 @@ class MessageConsumer(HealthCheck):
             logger.exception(f"Processing message failed. Message will be re-queued. The exception was:\n{e}")
 
     async def start_consuming(self, pipeline_max_concurrency=16):
+        worker_tuner = None
+        if str(pipeline_max_concurrency).lower() == 'auto':
+            worker_tuner = WorkerTuner()
+            pipeline_max_concurrency = worker_tuner.settings()[0]
+            logger.info('Worker concurrency will be tuned automatically: {}'.format(
+                ' '.join(f'{k}={v}' for k, v in worker_tuner.metrics().items())))
+
         channel = await self._connection.channel()
         await channel.set_qos(prefetch_count=1)
         queue = await channel.declare_queue(self._rabbitmq_queue, durable=True, arguments={'x-max-priority': 10})
@@ -106,7 +115,8 @@ class MessageConsumer(HealthCheck):
                                              self._data_store_factory,
                                              self._metadata_store_factory,
                                              pipeline_max_concurrency,
-                                             self._level)
+                                             self._level,
+                                             worker_tuner)
             except aio_pika.exceptions.MessageProcessError:
                 # Do not try to close() the queue iterator! If we get here, that means the RabbitMQ
                 # connection has died, and attempting to close the queue will only raise another exception.
@@ -13,6 +13,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
+import importlib.util
 import logging
 import os
 import tempfile
@@ -26,6 +28,10 @@ from granule_ingester.preprocessors import GranulePreprocessor
 
 logger = logging.getLogger(__name__)
 
+ZARR_METADATA_FILES = ['.zgroup', '.zmetadata', 'zarr.json']
+ZARR_PACKAGES = ['zarr']
+ZARR_S3_PACKAGES = ['fsspec', 's3fs']
+
 
 class GranuleLoader:
 
@@ -39,9 +45,20 @@ class GranuleLoader:
         else:
             self._group = None
 
+        self._store_type = kwargs.get('store_type')
+
         if 'preprocess' in kwargs:
             self._preprocess = [GranuleLoader._parse_module(module) for module in kwargs['preprocess']]
 
+    def with_resource(self, resource: str) -> 'GranuleLoader':
+        """
+        Returns a loader for another granule that shares this loader's settings and preprocessors.
+        """
+        loader = copy.copy(self)
+        loader._resource = resource
+        loader._granule_temp_file = None
+        return loader
+
     async def __aenter__(self):
         return await self.open()
 
@@ -51,7 +68,12 @@ class GranuleLoader:
 
     async def open(self) -> (xr.Dataset, str):
         resource_url = parse.urlparse(self._resource)
-        if resource_url.scheme == 's3':
+        is_zarr = self._is_zarr_store(self._resource)
+
+        if resource_url.scheme == 's3' and is_zarr:
+            # Zarr stores are read in place, chunk by chunk, so there is nothing to download.
+            file_path = self._resource
+        elif resource_url.scheme == 's3':
             # We need to save a reference to the temporary granule file so we can delete it when the context manager
             # closes. The file needs to be kept around until nothing is reading the dataset anymore.
             self._granule_temp_file = await self._download_s3_file(self._resource)
@@ -61,27 +83,53 @@ class GranuleLoader:
         else:
             raise RuntimeError("Granule path scheme '{}' is not supported.".format(resource_url.scheme))
 
-        granule_name = os.path.basename(self._resource)
+        if is_zarr:
+            self._check_zarr_backend(resource_url.scheme)
+
+        granule_name = os.path.basename(self._resource.rstrip('/'))
         try:
             additional_params = {}
 
             if self._group is not None:
                 additional_params['group'] = self._group
 
-            ds = xr.open_dataset(file_path, lock=False, **additional_params)
+            if is_zarr:
+                # chunks=None keeps the variables lazily indexed without requiring dask. Each worker only reads the
+                # chunks that back its own tiles.
+                ds = xr.open_dataset(file_path, engine='zarr', chunks=None, **additional_params)
+            else:
+                ds = xr.open_dataset(file_path, lock=False, **additional_params)
 
             if self._preprocess is not None:
                 logger.info(f'There are {len(self._preprocess)} preprocessors to apply for granule {self._resource}')
-                while len(self._preprocess) > 0:
-                    preprocessor: GranulePreprocessor = self._preprocess.pop(0)
-
+                for preprocessor in self._preprocess:
                     ds = preprocessor.process(ds)
 
             return ds, granule_name
         except FileNotFoundError:
             raise GranuleLoadingError(f"The granule file {self._resource} does not exist.")
-        except Exception:
-            raise GranuleLoadingError(f"The granule {self._resource} is not a valid NetCDF file.")
+        except ImportError as e:
+            raise GranuleLoadingError(f"Reading the granule {self._resource} requires a package that is not "
+                                      f"installed: {e}") from e
+        except Exception as e:
+            if is_zarr:
+                raise GranuleLoadingError(f"The granule {self._resource} is not a valid Zarr store: {e}") from e
+            raise GranuleLoadingError(f"The granule {self._resource} is not a valid NetCDF file.") from e
+
+    def _check_zarr_backend(self, scheme: str):
+        packages = ZARR_PACKAGES + (ZARR_S3_PACKAGES if scheme == 's3' else [])
+        missing = [package for package in packages if importlib.util.find_spec(package) is None]
+        if missing:
+            raise GranuleLoadingError(f"Reading the Zarr store {self._resource} requires the missing package(s) "
+                                      f"{', '.join(missing)}. Install the granule ingester with the 'zarr' extra.")
+
+    def _is_zarr_store(self, resource: str) -> bool:
+        if self._store_type is not None:
+            return self._store_type == 'zarr'
+        if resource.rstrip('/').endswith('.zarr'):
+            return True
+        return os.path.isdir(resource) and \
+            any(os.path.exists(os.path.join(resource, f)) for f in ZARR_METADATA_FILES)
 
     @staticmethod
     async def _download_s3_file(url: str):
@@ -27,8 +27,9 @@ from granule_ingester.writers import CassandraStore, SolrStore
 from granule_ingester.writers.ElasticsearchStore import ElasticsearchStore
 
 
-def cassandra_factory(contact_points, port, keyspace, username, password):
-    store = CassandraStore(contact_points=contact_points, port=port, keyspace=keyspace, username=username, password=password)
+def cassandra_factory(contact_points, port, keyspace, username, password, compact_elevation=False):
+    store = CassandraStore(contact_points=contact_points, port=port, keyspace=keyspace, username=username, password=password,
+                           compact_elevation=compact_elevation)
     store.connect()
     return store
 
@@ -95,6 +96,11 @@ async def main(loop):
                         metavar="PASSWORD",
                         default=None,
                         help='Cassandra password. Optional.')
+    parser.add_argument('--cassandra-compact-elevation',
+                        action='store_true',
+                        help='Store elevation arrays whose cells all hold the same value (tiles from a single depth or '
+                             'height level) as one value instead of a full array. Tiles written this way need a '
+                             'reader that understands the compact encoding.')
 
     # METADATA STORE
     parser.add_argument('--metadata-store',
@@ -130,7 +136,9 @@ async def main(loop):
     parser.add_argument('--max-threads',
                         default=16,
                         metavar='MAX_THREADS',
-                        help='Maximum number of threads to use when processing granules. (Default: 16)')
+                        help='Maximum number of threads to use when processing granules, or "auto" to size the worker '
+                             'pool from the container CPU and memory limits and the measured cost of each tile. '
+                             '(Default: 16)')
     parser.add_argument('-v',
                         '--verbose',
                         action='store_true',
@@ -175,7 +183,8 @@ async def main(loop):
                                                               cassandra_port,
                                                               cassandra_keyspace,
                                                               cassandra_username,
-                                                              cassandra_password),
+                                                              cassandra_password,
+                                                              args.cassandra_compact_elevation),
                                    metadata_store_factory=partial(solr_factory, solr_host_and_port, zk_host_and_port),
                                    log_level=logging_level)
         try:
@@ -209,7 +218,8 @@ async def main(loop):
                                                               cassandra_port,
                                                               cassandra_keyspace,
                                                               cassandra_username,
-                                                              cassandra_password),
+                                                              cassandra_password,
+                                                              args.cassandra_compact_elevation),
                                    metadata_store_factory=partial(elasticsearch_factory, 
                                                                   elastic_url, 
                                                                   elastic_username, 
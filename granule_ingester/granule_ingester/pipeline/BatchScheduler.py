@@ -0,0 +1,153 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import logging
+import math
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Sequence
+
+import numpy as np
+import xarray as xr
+
+logger = logging.getLogger(__name__)
+
+# Each worker should receive at least this many tasks per granule, so that a slow task does not leave the other
+# workers idle at the end of the granule.
+TASKS_PER_WORKER = 4
+
+# Upper bound on the estimated size of the tiles returned by a single task. Results are pickled through a
+# multiprocessing queue, so very large tasks stall the main process while they are transferred.
+MAX_TASK_BYTES = 64 * 2 ** 20
+
+# Preferred duration of a single task, once the per-tile processing time is known.
+TARGET_TASK_SECONDS = 2.0
+
+MAX_BATCH_SIZE = 1024
+
+# Protobuf fields, summary and tile id that come on top of the array data of every tile.
+TILE_OVERHEAD_BYTES = 1024
+
+
+class BatchScheduler:
+    """
+    Splits the tiles of a granule into worker tasks and runs them on the worker pool.
+
+    The number of tiles per task is derived from the tile count, the estimated size of a tile and the number of
+    workers, aiming at TARGET_TASK_SECONDS per task when the per-tile processing time is known. Tasks are submitted
+    with a bounded number in flight and their results are yielded in completion order.
+    """
+
+    def __init__(self, workers: int, child_concurrency: int = 1, seconds_per_tile: Optional[float] = None):
+        self._workers = max(1, workers)
+        self._child_concurrency = max(1, child_concurrency)
+        self._seconds_per_tile = seconds_per_tile
+
+    def batch_size(self, tile_count: int, bytes_per_tile: int) -> int:
+        if tile_count <= 0:
+            return 1
+
+        sizes = [
+            math.ceil(tile_count / (self._workers * TASKS_PER_WORKER)),
+            MAX_TASK_BYTES // max(bytes_per_tile, 1),
+            MAX_BATCH_SIZE
+        ]
+        if self._seconds_per_tile:
+            sizes.append(math.ceil(TARGET_TASK_SECONDS / self._seconds_per_tile))
+
+        return max(1, min(sizes))
+
+    def make_batches(self, items: List, bytes_per_tile: int, group_size: int = 1) -> List[List]:
+        """
+        Splits the items into batches. Consecutive groups of group_size items, e.g. the tiles of one time step that
+        reading processors cut out of a single slab read, are kept in the same batch when batches can hold them.
+        """
+        batch_size = self.batch_size(len(items), bytes_per_tile)
+        if 1 < group_size <= batch_size:
+            batch_size -= batch_size % group_size
+        logger.info(f'Splitting {len(items)} tiles into batches of {batch_size} '
+                    f'(~{bytes_per_tile} bytes per tile, {self._workers} workers)')
+        return [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+
+    async def run_unordered(self, submit: Callable[[Sequence], Awaitable], batches: List[Sequence]) -> AsyncIterator:
+        """
+        Submits every batch with submit() and yields the results as soon as each task completes.
+
+        Only a bounded number of tasks is in flight at any time, which keeps the pool queue well under the
+        multiprocessing queue size limit. If a task fails, the remaining tasks are cancelled and the error is raised.
+        """
+        max_in_flight = self._workers * (self._child_concurrency + 1)
+        pending = set()
+        remaining = iter(batches)
+
+        try:
+            while True:
+                while len(pending) < max_in_flight:
+                    batch = next(remaining, None)
+                    if batch is None:
+                        break
+                    pending.add(asyncio.ensure_future(submit(batch)))
+
+                if not pending:
+                    return
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+def estimate_tile_bytes(dataset: xr.Dataset, section_spec: str) -> int:
+    """
+    Estimates the size of a tile from the largest data variable spanning the dimensions in the section spec.
+    """
+    dim_lengths = {}
+    for dim_spec in section_spec.split(','):
+        name, start, stop = dim_spec.split(':')
+        dim_lengths[name] = int(stop) - int(start)
+
+    largest = 0
+    for variable in dataset.data_vars.values():
+        if not variable.dims:
+            continue
+        elements = np.prod([dim_lengths.get(dim, length) for dim, length in zip(variable.dims, variable.shape)])
+        largest = max(largest, int(elements) * variable.dtype.itemsize)
+
+    return largest + TILE_OVERHEAD_BYTES
+
+
+def slab_group_size(section_specs: List[str]) -> int:
+    """
+    Counts the leading tiles that share the indexes of the length-1 dimensions of the first tile, i.e. how many
+    consecutive tiles belong to the same time (or depth) slab.
+    """
+    def outer_key(section_spec: str):
+        return tuple(dim_spec for dim_spec in section_spec.split(',')
+                     if int(dim_spec.split(':')[2]) - int(dim_spec.split(':')[1]) == 1)
+
+    if not section_specs:
+        return 1
+
+    first_key = outer_key(section_specs[0])
+    if not first_key:
+        return 1
+
+    count = 0
+    for section_spec in section_specs:
+        if outer_key(section_spec) != first_key:
+            break
+        count += 1
+    return count
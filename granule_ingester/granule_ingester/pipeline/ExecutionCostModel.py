@@ -0,0 +1,88 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+from enum import Enum
+
+logger = logging.getLogger(__name__)
+
+# Starting estimates, replaced by measurements as granules are processed.
+DEFAULT_POOL_OVERHEAD_SECONDS = 2.0
+DEFAULT_SECONDS_PER_TILE = 0.05
+DEFAULT_THREAD_PARALLELISM = 1.0
+MIN_THREAD_PARALLELISM = 0.1
+
+# Granules with more tiles than this always go to the process pool, whatever the estimates say.
+MAX_THREADED_TILES = 512
+
+SMOOTHING = 0.3
+
+
+class ExecutionMode(Enum):
+    PROCESS = 'process'
+    THREAD = 'thread'
+
+
+class ExecutionCostModel:
+    """
+    Estimates whether a granule is processed faster by the worker process pool or by threads in the consumer process.
+
+    The process pool pays a fixed cost per granule (spawning the workers, pickling the dataset, and serializing every
+    tile across processes) but runs tiles in parallel. Threads have no fixed cost, but only the parts of a tile that
+    release the GIL run in parallel. Both the fixed cost and the effective thread parallelism are measured on the
+    granules that go through each mode.
+    """
+
+    def __init__(self):
+        self.pool_overhead_seconds = DEFAULT_POOL_OVERHEAD_SECONDS
+        self.seconds_per_tile = DEFAULT_SECONDS_PER_TILE
+        self.thread_parallelism = DEFAULT_THREAD_PARALLELISM
+
+    def estimate_process_seconds(self, tile_count: int, processes: int) -> float:
+        return self.pool_overhead_seconds + tile_count * self.seconds_per_tile / max(processes, 1)
+
+    def estimate_thread_seconds(self, tile_count: int, threads: int) -> float:
+        return tile_count * self.seconds_per_tile / min(self.thread_parallelism, max(threads, 1))
+
+    def choose(self, tile_count: int, workers: int) -> ExecutionMode:
+        if tile_count > MAX_THREADED_TILES:
+            return ExecutionMode.PROCESS
+
+        process_seconds = self.estimate_process_seconds(tile_count, workers)
+        thread_seconds = self.estimate_thread_seconds(tile_count, workers)
+        mode = ExecutionMode.THREAD if thread_seconds < process_seconds else ExecutionMode.PROCESS
+
+        logger.info(f'Estimated {thread_seconds:.2f}s in threads and {process_seconds:.2f}s in the process pool '
+                    f'for {tile_count} tiles; using {mode.value} mode')
+        return mode
+
+    def record_process_run(self, tile_count: int, processes: int, wall_seconds: float, worker_seconds: float):
+        if tile_count <= 0:
+            return
+        self.seconds_per_tile = self._smooth(self.seconds_per_tile, worker_seconds / tile_count)
+        overhead = max(0.0, wall_seconds - worker_seconds / max(processes, 1))
+        self.pool_overhead_seconds = self._smooth(self.pool_overhead_seconds, overhead)
+
+    def record_thread_run(self, tile_count: int, wall_seconds: float):
+        if tile_count <= 0 or wall_seconds <= 0:
+            return
+        # Time measured inside the threads includes waiting for the GIL, so the per-tile cost is only learned from
+        # the process pool. Threaded runs measure how much faster (or slower) than one worker process they were.
+        parallelism = tile_count * self.seconds_per_tile / wall_seconds
+        self.thread_parallelism = self._smooth(self.thread_parallelism, max(parallelism, MIN_THREAD_PARALLELISM))
+
+    @staticmethod
+    def _smooth(previous: float, latest: float) -> float:
+        return (1 - SMOOTHING) * previous + SMOOTHING * latest
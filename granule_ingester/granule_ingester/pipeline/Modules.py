@@ -15,12 +15,13 @@
 
 from granule_ingester.processors import *
 from granule_ingester.processors.reading_processors import *
-from granule_ingester.slicers import SliceFileByStepSize
+from granule_ingester.slicers import SliceFileByStepSize, SliceFileByChunks
 from granule_ingester.granule_loaders import GranuleLoader
 
 modules = {
     "granule": GranuleLoader,
     "sliceFileByStepSize": SliceFileByStepSize,
+    "sliceFileByChunks": SliceFileByChunks,
     "generateTileId": GenerateTileId,
     "ECCO": EccoReadingProcessor,
     "Grid": GridReadingProcessor,
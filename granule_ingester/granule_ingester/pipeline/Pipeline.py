@@ -13,11 +13,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import copy
+import json
 import logging
 import pickle
+import resource
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from multiprocessing import Manager
-from typing import List
+from typing import Dict, List, Tuple
 
 import xarray as xr
 import yaml
@@ -27,7 +34,11 @@ from granule_ingester.exceptions import PipelineBuildingError
 from granule_ingester.granule_loaders import GranuleLoader
 from granule_ingester.pipeline.Modules import \
     modules as processor_module_mappings
+from granule_ingester.pipeline.BatchScheduler import BatchScheduler, estimate_tile_bytes, slab_group_size
+from granule_ingester.pipeline.ExecutionCostModel import ExecutionCostModel, ExecutionMode
+from granule_ingester.pipeline.WorkerTuner import WorkerTuner
 from granule_ingester.processors.TileProcessor import TileProcessor
+from granule_ingester.processors.reading_processors import TileReadingProcessor
 from granule_ingester.slicers import TileSlicer
 from granule_ingester.writers import DataStore, MetadataStore
 from nexusproto import DataTile_pb2 as nexusproto
@@ -35,22 +46,42 @@ from tblib import pickling_support
 
 logger = logging.getLogger(__name__)
 
-# Could not find any info on the aforementioned bug; though I did find that macos restricts the queue size to 2**15-1.
-# Trying to bump this size up a bit as it seems to cause a performance bottleneck when handling a lot of tiles.
-MAX_CHUNK_SIZE = 2 ** 14 - 1
-BATCH_SIZE = 256
-
 _worker_data_store: DataStore = None
 _worker_metadata_store: MetadataStore = None
 _worker_processor_list: List[TileProcessor] = None
 _worker_dataset = None
 _shared_memory = None
+_worker_baseline_memory = 0
+
+_thread_read_lock = threading.Lock()
+_default_cost_model = ExecutionCostModel()
+
+# Number of collection configurations whose slicer and processor chain are kept for reuse.
+PIPELINE_CACHE_SIZE = 32
+_pipeline_cache: 'OrderedDict[str, Tuple[GranuleLoader, TileSlicer, List[TileProcessor]]]' = OrderedDict()
+
+_manager = None
+
+
+def _get_manager():
+    # A SyncManager is used to communicate exceptions from the worker processes back to the main process. It runs in
+    # its own process, so it is started once, the first time the process pool is used, and shared by all pipelines.
+    global _manager
+    if _manager is None:
+        _manager = Manager()
+    return _manager
+
+
+def _peak_memory() -> int:
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
 
 
 def _init_worker(processor_list, dataset, data_store_factory, metadata_store_factory, shared_memory, log_level):
     global _worker_processor_list
     global _worker_dataset
     global _shared_memory
+    global _worker_baseline_memory
 
     # _worker_data_store and _worker_metadata_store open multiple TCP sockets from each worker process;
     # however, these sockets will be automatically closed by the OS once the worker processes die so no need to worry.
@@ -65,8 +96,21 @@ def _init_worker(processor_list, dataset, data_store_factory, metadata_store_fac
     for logger in loggers:
         logger.setLevel(log_level)
 
+    _prepare_processors(processor_list, dataset)
+
+    _worker_baseline_memory = _peak_memory()
+
     logger.debug("worker init")
 
+def _prepare_processors(processor_list: List[TileProcessor], dataset: xr.Dataset):
+    for processor in processor_list:
+        try:
+            processor.prepare(dataset)
+        except Exception as e:
+            # Processors fall back to per-tile work when they are not prepared, which reports the error per tile.
+            logger.warning(f'Could not prepare {type(processor).__name__} for the granule: {e}')
+
+
 async def _process_tile_in_worker(serialized_input_tile: str):
     try:
         logger.debug('Starting tile creation subprocess')
@@ -95,14 +139,61 @@ async def _process_tile_batch_in_worker(tile_list:List[str]):
     logger.info('Starting tile creation batch')
 
     result = []
+    start = time.perf_counter()
 
     for tile in tile_list:
         output = await _process_tile_in_worker(tile)
         result.append(output)
 
+    stats = {
+        'seconds': time.perf_counter() - start,
+        'baseline_memory': _worker_baseline_memory,
+        'peak_memory': _peak_memory(),
+        'coordinate_cache': _drain_coordinate_caches(_worker_processor_list)
+    }
+
     logger.info('Batch complete! Sending results back to pool')
 
-    return result
+    return result, stats
+
+
+def _drain_coordinate_caches(processor_list: List[TileProcessor]) -> Dict[int, list]:
+    # Coordinate subsets cached by a worker are sent back to the main process, so the workers of the next granule with
+    # the same coordinates receive them with the pickled processors.
+    entries = {}
+    for index, processor in enumerate(processor_list):
+        if isinstance(processor, TileReadingProcessor):
+            new_entries = processor.coordinate_cache.drain_new()
+            if new_entries:
+                entries[index] = new_entries
+    return entries
+
+
+def _share_coordinate_caches(processor_list: List[TileProcessor], dataset: xr.Dataset):
+    # Workers only receive the cached subsets of this granule's coordinates, which bounds what is pickled for each
+    # of them by the size of the cache.
+    for processor in processor_list:
+        if isinstance(processor, TileReadingProcessor):
+            try:
+                processor.share_coordinate_cache(dataset)
+            except Exception as e:
+                processor.coordinate_cache.share([])
+                logger.warning(f'Could not select the cached coordinates of {type(processor).__name__}: {e}')
+
+
+def _process_tile_in_thread(processor_list: List[TileProcessor],
+                            dataset: xr.Dataset,
+                            tile: nexusproto.NexusTile) -> nexusproto.NexusTile:
+    for processor in processor_list:
+        if isinstance(processor, TileReadingProcessor):
+            # Granules are opened without the netCDF/HDF5 lock, which is only safe with one reader per process.
+            with _thread_read_lock:
+                tile = processor.process(tile=tile, dataset=dataset)
+        else:
+            tile = processor.process(tile=tile, dataset=dataset)
+        if not tile:
+            return None
+    return tile
 
 
 def _recurse(processor_list: List[TileProcessor],
@@ -122,7 +213,10 @@ class Pipeline:
                  metadata_store_factory,
                  tile_processors: List[TileProcessor],
                  max_concurrency: int,
-                 log_level=logging.INFO):
+                 log_level=logging.INFO,
+                 worker_tuner: WorkerTuner = None,
+                 execution_mode: str = None,
+                 cost_model: ExecutionCostModel = None):
         self._granule_loader = granule_loader
         self._tile_processors = tile_processors
         self._slicer = slicer
@@ -130,31 +224,72 @@ class Pipeline:
         self._metadata_store_factory = metadata_store_factory
         self._max_concurrency = int(max_concurrency)
         self._level = log_level
+        self._worker_tuner = worker_tuner
 
-        # Create a SyncManager so that we can to communicate exceptions from the
-        # worker processes back to the main process.
-        self._manager = Manager()
+        self._execution_mode = ExecutionMode(execution_mode) if execution_mode is not None else None
+        self._cost_model = cost_model if cost_model is not None else _default_cost_model
 
-    def __del__(self):
-        self._manager.shutdown()
 
     def set_log_level(self, level):
         self._level = level
 
     @classmethod
-    def from_string(cls, config_str: str, data_store_factory, metadata_store_factory, max_concurrency: int = 16):
+    def from_string(cls, config_str: str, data_store_factory, metadata_store_factory, max_concurrency: int = 16,
+                    worker_tuner: WorkerTuner = None):
         logger.debug(f'config_str: {config_str}')
         try:
-            config = yaml.load(config_str, yaml.FullLoader)
+            config = cls._load_config(config_str)
             cls._validate_config(config)
-            return cls._build_pipeline(config,
+        except yaml.scanner.ScannerError:
+            raise PipelineBuildingError("Cannot build pipeline because of a syntax error in the YAML.")
+
+        # Granules of the same collection only differ by their resource, so the slicer and processors that were built
+        # for a previous granule are reused. Messages are consumed one at a time, so they are never used concurrently.
+        cache_key = cls._cache_key(config)
+        cached = _pipeline_cache.get(cache_key)
+        if cached is not None:
+            _pipeline_cache.move_to_end(cache_key)
+            granule_loader, slicer, tile_processors = cached
+            return cls(granule_loader.with_resource(config['granule']['resource']),
+                       slicer,
+                       data_store_factory,
+                       metadata_store_factory,
+                       tile_processors,
+                       max_concurrency,
+                       worker_tuner=worker_tuner)
+
+        pipeline = cls._build_pipeline(config,
                                        data_store_factory,
                                        metadata_store_factory,
                                        processor_module_mappings,
-                                       max_concurrency)
+                                       max_concurrency,
+                                       worker_tuner)
 
-        except yaml.scanner.ScannerError:
-            raise PipelineBuildingError("Cannot build pipeline because of a syntax error in the YAML.")
+        if cache_key is not None:
+            _pipeline_cache[cache_key] = (pipeline._granule_loader, pipeline._slicer, pipeline._tile_processors)
+            if len(_pipeline_cache) > PIPELINE_CACHE_SIZE:
+                _pipeline_cache.popitem(last=False)
+
+        return pipeline
+
+    @staticmethod
+    def _load_config(config_str: str):
+        # The collection manager sends YAML, but JSON messages are parsed much faster by the json module.
+        if config_str.lstrip().startswith('{'):
+            try:
+                return json.loads(config_str)
+            except ValueError:
+                pass
+        return yaml.load(config_str, getattr(yaml, 'CFullLoader', yaml.FullLoader))
+
+    @staticmethod
+    def _cache_key(config: dict):
+        try:
+            normalized = copy.deepcopy(config)
+            del normalized['granule']['resource']
+            return json.dumps(normalized, sort_keys=True, default=str)
+        except (KeyError, TypeError):
+            return None
 
     # TODO: this method should validate the config against an actual schema definition
     @staticmethod
@@ -169,7 +304,8 @@ class Pipeline:
                         data_store_factory,
                         metadata_store_factory,
                         module_mappings: dict,
-                        max_concurrency: int):
+                        max_concurrency: int,
+                        worker_tuner: WorkerTuner = None):
         try:
             if 'preprocess' in config:
                 granule_loader = GranuleLoader(**config['granule'], **{'preprocess': config['preprocess']})
@@ -189,7 +325,8 @@ class Pipeline:
                        data_store_factory,
                        metadata_store_factory,
                        tile_processors,
-                       max_concurrency)
+                       max_concurrency,
+                       worker_tuner=worker_tuner)
         except PipelineBuildingError:
             raise
         except KeyError as e:
@@ -216,52 +353,120 @@ class Pipeline:
         async with self._granule_loader as (dataset, granule_name):
             start = time.perf_counter()
 
-            shared_memory = self._manager.Namespace()
-            async with Pool(processes=self._max_concurrency,
-                            initializer=_init_worker,
-                            initargs=(self._tile_processors,
-                                      dataset,
-                                      self._data_store_factory,
-                                      self._metadata_store_factory,
-                                      shared_memory,
-                                      self._level),
-                            childconcurrency=self._max_concurrency) as pool:
-                serialized_tiles = [nexusproto.NexusTile.SerializeToString(tile) for tile in
-                                    self._slicer.generate_tiles(dataset, granule_name)]
-                # aiomultiprocess is built on top of the stdlib multiprocessing library, which has the limitation that
-                # a queue can't have more than 2**15-1 tasks. So, we have to batch it.
-
-                results = []
-
-                batches = self._chunk_list(serialized_tiles, BATCH_SIZE)
-
-                for chunk in self._chunk_list(batches, MAX_CHUNK_SIZE):
-                    try:
-                        logger.info(f'Starting batch of {len(chunk)} tasks in worker pool')
-                        for rb in await pool.map(_process_tile_batch_in_worker, chunk):
-                            for r in rb:
-                                if r is not None:
-                                    results.append(nexusproto.NexusTile.FromString(r))
-                        logger.info(f'Finished batch of {len(chunk)} tasks in worker pool')
-
-                    except ProxyException:
-                        logger.info(f'Finished batch of {len(chunk)} tasks in worker pool with error')
-                        pool.terminate()
-                        # Give the shared memory manager some time to write the exception
-                        # await asyncio.sleep(1)
-                        raise pickle.loads(shared_memory.error)
-
-                tile_gen_end = time.perf_counter()
-
-                logger.info(f"Finished generating tiles in {tile_gen_end - start} seconds")
-                logger.info(f"Now writing generated tiles...")
-
-                await self._data_store_factory().save_batch(results)
-                await self._metadata_store_factory().save_batch(results)
+            if self._worker_tuner is not None:
+                processes, child_concurrency = self._worker_tuner.settings()
+            else:
+                processes, child_concurrency = self._max_concurrency, self._max_concurrency
+
+            tiles = list(self._slicer.generate_tiles(dataset, granule_name))
+
+            if self._execution_mode is not None:
+                mode = self._execution_mode
+            else:
+                mode = self._cost_model.choose(len(tiles), processes)
+
+            if mode == ExecutionMode.THREAD:
+                results = await self._process_tiles_in_threads(dataset, tiles, threads=processes)
+                self._cost_model.record_thread_run(len(tiles), time.perf_counter() - start)
+            else:
+                results = await self._process_tiles_in_pool(dataset, tiles, processes, child_concurrency, start)
+
+            tile_gen_end = time.perf_counter()
+
+            logger.info(f"Finished generating tiles in {tile_gen_end - start} seconds")
+            logger.info(f"Now writing generated tiles...")
+
+            await self._data_store_factory().save_batch(results)
+            await self._metadata_store_factory().save_batch(results)
 
         end = time.perf_counter()
         logger.info("Pipeline finished in {} seconds".format(end - start))
 
-    @staticmethod
-    def _chunk_list(items, chunk_size: int):
-        return [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    async def _process_tiles_in_pool(self,
+                                     dataset: xr.Dataset,
+                                     tiles: List[nexusproto.NexusTile],
+                                     processes: int,
+                                     child_concurrency: int,
+                                     start: float) -> List[nexusproto.NexusTile]:
+        logger.info(f'Using {processes} worker processes with a concurrency of {child_concurrency}')
+
+        shared_memory = _get_manager().Namespace()
+        _share_coordinate_caches(self._tile_processors, dataset)
+        async with Pool(processes=processes,
+                        initializer=_init_worker,
+                        initargs=(self._tile_processors,
+                                  dataset,
+                                  self._data_store_factory,
+                                  self._metadata_store_factory,
+                                  shared_memory,
+                                  self._level),
+                        childconcurrency=child_concurrency) as pool:
+            serialized_tiles = [nexusproto.NexusTile.SerializeToString(tile) for tile in tiles]
+
+            results = []
+            worker_seconds = 0.0
+            worker_baseline_memory = 0
+            worker_peak_memory = 0
+
+            scheduler = BatchScheduler(workers=processes,
+                                       child_concurrency=child_concurrency,
+                                       seconds_per_tile=self._worker_tuner.seconds_per_tile
+                                       if self._worker_tuner is not None else None)
+            bytes_per_tile = estimate_tile_bytes(dataset, tiles[0].summary.section_spec) if tiles else 0
+            group_size = slab_group_size([tile.summary.section_spec for tile in tiles])
+            batches = scheduler.make_batches(serialized_tiles, bytes_per_tile, group_size)
+
+            try:
+                logger.info(f'Starting {len(batches)} tasks in worker pool')
+                async for rb, stats in scheduler.run_unordered(
+                        lambda batch: pool.apply(_process_tile_batch_in_worker, (batch,)), batches):
+                    for r in rb:
+                        if r is not None:
+                            results.append(nexusproto.NexusTile.FromString(r))
+                    worker_seconds += stats['seconds']
+                    worker_baseline_memory = max(worker_baseline_memory, stats['baseline_memory'])
+                    worker_peak_memory = max(worker_peak_memory, stats['peak_memory'])
+                    for index, entries in stats['coordinate_cache'].items():
+                        self._tile_processors[index].coordinate_cache.merge(entries)
+                logger.info(f'Finished {len(batches)} tasks in worker pool')
+
+            except ProxyException:
+                logger.info(f'Finished tasks in worker pool with error')
+                pool.terminate()
+                raise pickle.loads(shared_memory.error)
+
+        self._cost_model.record_process_run(tile_count=len(tiles),
+                                            processes=processes,
+                                            wall_seconds=time.perf_counter() - start,
+                                            worker_seconds=worker_seconds)
+        if self._worker_tuner is not None:
+            self._worker_tuner.record(tile_count=len(tiles),
+                                      worker_seconds=worker_seconds,
+                                      worker_baseline_memory=worker_baseline_memory,
+                                      worker_peak_memory=worker_peak_memory)
+        return results
+
+    async def _process_tiles_in_threads(self,
+                                        dataset: xr.Dataset,
+                                        tiles: List[nexusproto.NexusTile],
+                                        threads: int) -> List[nexusproto.NexusTile]:
+        threads = max(1, min(threads, len(tiles)))
+        logger.info(f'Processing {len(tiles)} tiles in {threads} threads')
+
+        # Processors use the dataset attributes to pass per-tile state along the chain (e.g. _FlippedLat), so every
+        # thread gets its own shallow copy. The variable data is shared.
+        local = threading.local()
+
+        def process(tile):
+            if not hasattr(local, 'dataset'):
+                local.dataset = dataset.copy(deep=False)
+                with _thread_read_lock:
+                    _prepare_processors(self._tile_processors, local.dataset)
+            return _process_tile_in_thread(self._tile_processors, local.dataset, tile)
+
+        loop = asyncio.get_event_loop()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            outputs = await asyncio.gather(*[loop.run_in_executor(executor, process, tile) for tile in tiles])
+
+        return [tile for tile in outputs if tile is not None]
+
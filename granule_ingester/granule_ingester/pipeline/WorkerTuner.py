@@ -0,0 +1,193 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import math
+import os
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+
+# Fraction of the container memory limit that worker processes are allowed to use. The rest is left for the consumer
+# process itself, the shared memory manager and the tiles that are buffered before being written.
+MEMORY_HEADROOM = 0.75
+
+# Per-worker memory assumed before any granule has been measured.
+DEFAULT_WORKER_MEMORY = 256 * 2 ** 20
+
+# aiomultiprocess workers poll their queues every 50ms at most, so tasks shorter than this benefit from being
+# prefetched by the worker.
+WORKER_POLL_INTERVAL = 0.05
+
+# Weight given to the latest granule when updating the per-tile measurements.
+SMOOTHING = 0.3
+
+
+def _read_file(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except (OSError, ValueError):
+        return None
+
+
+class WorkerTuner:
+    """
+    Chooses the number of worker processes and the per-process concurrency of the pipeline pool.
+
+    The settings are derived from the CPU and memory limits of the container (read from the cgroup v2 or v1
+    filesystem, falling back to the host resources) and from the per-tile processing time and the peak worker memory
+    measured on previous granules. The measurements are smoothed, so the settings adapt from one granule to the next.
+    """
+
+    def __init__(self,
+                 max_processes: Optional[int] = None,
+                 max_concurrency: Optional[int] = None,
+                 cgroup_root: str = CGROUP_ROOT):
+        self._cgroup_root = cgroup_root
+        self._cpu_limit = self._read_cpu_limit()
+        self._memory_limit = self._read_memory_limit()
+        self._max_processes = max_processes or max(1, math.ceil(self._cpu_limit))
+        self._max_concurrency = max_concurrency or 16
+
+        self._seconds_per_tile: Optional[float] = None
+        self._worker_baseline_memory: Optional[float] = None
+        # Peak memory of a worker above its baseline while processing a batch of tiles
+        self._worker_memory: Optional[float] = None
+        self._granules = 0
+
+        self._processes, self._concurrency = self._compute_settings()
+
+    @property
+    def cpu_limit(self) -> float:
+        return self._cpu_limit
+
+    @property
+    def memory_limit(self) -> int:
+        return self._memory_limit
+
+    @property
+    def seconds_per_tile(self) -> Optional[float]:
+        return self._seconds_per_tile
+
+    @property
+    def worker_memory(self) -> Optional[float]:
+        return self._worker_memory
+
+    def settings(self) -> Tuple[int, int]:
+        """
+        :return: the (processes, childconcurrency) pair to use for the next granule
+        """
+        return self._processes, self._concurrency
+
+    def record(self, tile_count: int, worker_seconds: float,
+               worker_baseline_memory: int, worker_peak_memory: int):
+        """
+        Records the measurements of a finished granule and recomputes the settings.
+
+        :param tile_count: number of tiles processed
+        :param worker_seconds: total time spent processing tiles, summed over all workers
+        :param worker_baseline_memory: largest resident memory of a worker right after initialization, in bytes
+        :param worker_peak_memory: largest peak resident memory of a worker, in bytes
+        """
+        if tile_count <= 0:
+            return
+
+        seconds_per_tile = worker_seconds / tile_count
+        worker_memory = max(0, worker_peak_memory - worker_baseline_memory)
+
+        self._seconds_per_tile = self._smooth(self._seconds_per_tile, seconds_per_tile)
+        self._worker_memory = self._smooth(self._worker_memory, worker_memory)
+        self._worker_baseline_memory = self._smooth(self._worker_baseline_memory, worker_baseline_memory)
+        self._granules += 1
+
+        self._processes, self._concurrency = self._compute_settings()
+        logger.info('Worker tuning: {}'.format(' '.join(f'{k}={v}' for k, v in self.metrics().items())))
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            'processes': self._processes,
+            'childconcurrency': self._concurrency,
+            'cpu_limit': round(self._cpu_limit, 2),
+            'memory_limit_mb': round(self._memory_limit / 2 ** 20, 1),
+            'seconds_per_tile': round(self._seconds_per_tile, 4) if self._seconds_per_tile is not None else None,
+            'worker_memory_mb': round(self._worker_memory / 2 ** 20, 2) if self._worker_memory is not None
+            else None,
+            'granules_measured': self._granules
+        }
+
+    @staticmethod
+    def _smooth(previous: Optional[float], latest: float) -> float:
+        if previous is None:
+            return float(latest)
+        return (1 - SMOOTHING) * previous + SMOOTHING * latest
+
+    def _compute_settings(self) -> Tuple[int, int]:
+        # Tile processing is CPU bound and never yields to the event loop, so more processes than CPUs only adds
+        # contention.
+        processes = min(self._max_processes, max(1, math.ceil(self._cpu_limit)))
+
+        if self._seconds_per_tile:
+            # Prefetch enough tasks per worker to cover the queue polling delay, but no more.
+            concurrency = math.ceil(WORKER_POLL_INTERVAL / self._seconds_per_tile)
+        else:
+            concurrency = 2
+        concurrency = max(1, min(self._max_concurrency, concurrency))
+
+        # Every prefetched task holds its input and output tiles in the worker, so memory bounds both settings.
+        if self._worker_baseline_memory is not None:
+            memory_per_worker = self._worker_baseline_memory + (self._worker_memory or 0)
+        else:
+            memory_per_worker = DEFAULT_WORKER_MEMORY
+        memory_budget = self._memory_limit * MEMORY_HEADROOM
+        processes = max(1, min(processes, int(memory_budget // max(memory_per_worker, 1))))
+
+        return processes, concurrency
+
+    def _read_cpu_limit(self) -> float:
+        # cgroup v2
+        cpu_max = _read_file(os.path.join(self._cgroup_root, 'cpu.max'))
+        if cpu_max:
+            quota, _, period = cpu_max.partition(' ')
+            if quota != 'max' and period:
+                return max(float(quota) / float(period), 1.0)
+
+        # cgroup v1
+        quota = _read_file(os.path.join(self._cgroup_root, 'cpu', 'cpu.cfs_quota_us'))
+        period = _read_file(os.path.join(self._cgroup_root, 'cpu', 'cpu.cfs_period_us'))
+        if quota and period and int(quota) > 0:
+            return max(float(quota) / float(period), 1.0)
+
+        try:
+            return float(len(os.sched_getaffinity(0)))
+        except AttributeError:
+            return float(os.cpu_count() or 1)
+
+    def _read_memory_limit(self) -> int:
+        try:
+            host_memory = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+        except (ValueError, OSError, AttributeError):
+            host_memory = 4 * 2 ** 30
+
+        for path in (os.path.join(self._cgroup_root, 'memory.max'),
+                     os.path.join(self._cgroup_root, 'memory', 'memory.limit_in_bytes')):
+            limit = _read_file(path)
+            if limit and limit.isdigit():
+                # cgroup v1 reports a huge number when there is no limit
+                return min(int(limit), host_memory)
+
+        return host_memory
@@ -13,5 +13,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from granule_ingester.pipeline.BatchScheduler import BatchScheduler
+from granule_ingester.pipeline.ExecutionCostModel import ExecutionCostModel, ExecutionMode
 from granule_ingester.pipeline.Pipeline import Pipeline
 from granule_ingester.pipeline.Modules import modules
+from granule_ingester.pipeline.WorkerTuner import WorkerTuner
@@ -0,0 +1,109 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compact encoding of constant (scalar-broadcast) arrays, such as the elevation of a tile cut from a single depth level.
+
+A compact ShapedArray keeps the full shape in its shape field, but its array_data holds a single 0-d value instead of
+one value per cell. A full ShapedArray always stores an array of the shape it declares, so the two can be told apart
+from the stored array alone, and tiles written before the compact encoding keep decoding as they always have.
+"""
+
+import io
+from typing import Tuple
+
+import numpy as np
+from nexusproto import DataTile_pb2 as nexusproto
+from nexusproto.serialization import from_shaped_array, to_shaped_array
+
+
+def to_constant_shaped_array(shape: Tuple[int, ...], value, dtype=None) -> nexusproto.ShapedArray:
+    """
+    Returns the compact ShapedArray of np.full(shape, value, dtype).
+    """
+    scalar = np.full((), value, dtype=dtype)
+
+    memfile = io.BytesIO()
+    np.save(memfile, scalar)
+
+    shaped_array = nexusproto.ShapedArray()
+    shaped_array.shape.extend([int(dimension) for dimension in shape])
+    shaped_array.dtype = str(scalar.dtype)
+    shaped_array.array_data = memfile.getvalue()
+    return shaped_array
+
+
+def _stored_shape(shaped_array: nexusproto.ShapedArray) -> Tuple[int, ...]:
+    memfile = io.BytesIO(shaped_array.array_data)
+    version = np.lib.format.read_magic(memfile)
+    if version == (1, 0):
+        shape, _, _ = np.lib.format.read_array_header_1_0(memfile)
+    elif version == (2, 0):
+        shape, _, _ = np.lib.format.read_array_header_2_0(memfile)
+    else:
+        shape = from_shaped_array(shaped_array).shape
+    return shape
+
+
+def is_compact_shaped_array(shaped_array: nexusproto.ShapedArray) -> bool:
+    """
+    True if the ShapedArray holds a single value standing for every cell of its shape. Only the header of the stored
+    array is read.
+    """
+    if len(shaped_array.shape) == 0 or not shaped_array.array_data:
+        return False
+    return _stored_shape(shaped_array) == ()
+
+
+def from_compact_shaped_array(shaped_array: nexusproto.ShapedArray) -> np.ndarray:
+    """
+    Decodes a ShapedArray written either in full or in compact form. Compact arrays are expanded lazily, as a
+    read-only broadcast view of their value.
+    """
+    array = from_shaped_array(shaped_array)
+    if array.ndim == 0 and len(shaped_array.shape) > 0:
+        return np.broadcast_to(array, tuple(shaped_array.shape))
+    return array
+
+
+def compact_shaped_array(shaped_array: nexusproto.ShapedArray) -> bool:
+    """
+    Replaces a full ShapedArray whose values are all identical with its compact form, in place. Returns True if the
+    array was compacted.
+    """
+    if len(shaped_array.shape) == 0 or not shaped_array.array_data or is_compact_shaped_array(shaped_array):
+        return False
+
+    array = from_shaped_array(shaped_array)
+    if array.size < 2:
+        return False
+
+    flat = array.ravel()
+    if not np.array_equal(flat, np.broadcast_to(flat[0], flat.shape), equal_nan=array.dtype.kind in 'fc'):
+        return False
+
+    shaped_array.CopyFrom(to_constant_shaped_array(array.shape, flat[0], array.dtype))
+    return True
+
+
+def expand_shaped_array(shaped_array: nexusproto.ShapedArray) -> bool:
+    """
+    Replaces a compact ShapedArray with its full form, in place, for consumers that do not know the compact encoding.
+    Returns True if the array was expanded.
+    """
+    if not is_compact_shaped_array(shaped_array):
+        return False
+    shaped_array.CopyFrom(to_shaped_array(np.array(from_compact_shaped_array(shaped_array))))
+    return True
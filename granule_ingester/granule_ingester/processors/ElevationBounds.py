@@ -15,9 +15,10 @@
 
 import logging
 
+from granule_ingester.processors.CompactShapedArray import to_constant_shaped_array
 from granule_ingester.processors.TileProcessor import TileProcessor
 import numpy as np
-from nexusproto.serialization import from_shaped_array, to_shaped_array
+from nexusproto.serialization import to_shaped_array
 
 
 logger = logging.getLogger(__name__)
@@ -28,6 +29,7 @@ class ElevationBounds(TileProcessor):
         self.dimension = reference_dimension
         self.coordinate = bounds_coordinate
         self.flip_min_max = kwargs.get('flip_min_max', False)
+        self.compact_elevation = kwargs.get('compact_elevation', False)
 
     def process(self, tile, dataset):
         tile_type = tile.tile.WhichOneof("tile_type")
@@ -58,16 +60,19 @@ class ElevationBounds(TileProcessor):
         # else:
         #     elev_shape = from_shaped_array(tile_data.latitude).shape
 
-        elev_shape = from_shaped_array(tile_data.variable_data).shape
-
-        tile_data.elevation.CopyFrom(
-            to_shaped_array(
-                np.full(
-                    elev_shape,
-                    tile_data.min_elevation
+        elev_shape = tuple(tile_data.variable_data.shape)
+
+        if self.compact_elevation:
+            tile_data.elevation.CopyFrom(to_constant_shaped_array(elev_shape, tile_data.min_elevation))
+        else:
+            tile_data.elevation.CopyFrom(
+                to_shaped_array(
+                    np.full(
+                        elev_shape,
+                        tile_data.min_elevation
+                    )
                 )
             )
-        )
 
         tile_data.min_elevation = bounds[0].item()
         tile_data.max_elevation = bounds[1].item()
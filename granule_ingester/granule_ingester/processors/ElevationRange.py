@@ -15,17 +15,19 @@
 
 import logging
 
+from granule_ingester.processors.CompactShapedArray import to_constant_shaped_array
 from granule_ingester.processors.TileProcessor import TileProcessor
 import numpy as np
-from nexusproto.serialization import from_shaped_array, to_shaped_array
+from nexusproto.serialization import to_shaped_array
 
 
 logger = logging.getLogger(__name__)
 
 
 class ElevationRange(TileProcessor):
-    def __init__(self, elevation_dimension_name, start, stop, step):
+    def __init__(self, elevation_dimension_name, start, stop, step, **kwargs):
         self.dimension = elevation_dimension_name
+        self.compact_elevation = kwargs.get('compact_elevation', False)
 
         self.start = float(start)
         self.stop = float(stop)
@@ -62,18 +64,21 @@ class ElevationRange(TileProcessor):
         # else:
         #     elev_shape = from_shaped_array(tile_data.latitude).shape
 
-        elev_shape = from_shaped_array(tile_data.variable_data).shape
+        elev_shape = tuple(tile_data.variable_data.shape)
 
         # print(f'Elev shape: {elev_shape}')
 
-        tile_data.elevation.CopyFrom(
-            to_shaped_array(
-                np.full(
-                    elev_shape,
-                    elevation
+        if self.compact_elevation:
+            tile_data.elevation.CopyFrom(to_constant_shaped_array(elev_shape, elevation))
+        else:
+            tile_data.elevation.CopyFrom(
+                to_shaped_array(
+                    np.full(
+                        elev_shape,
+                        elevation
+                    )
                 )
             )
-        )
 
         tile_data.max_elevation = elevation
         tile_data.min_elevation = elevation
@@ -0,0 +1,111 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import weakref
+from typing import Any, Dict, List, Tuple
+
+import xarray as xr
+
+logger = logging.getLogger(__name__)
+
+UNIT_ATTRIBUTES = ('units', 'Units', 'UNITS')
+FILL_VALUE_ATTRIBUTES = ('_FillValue', 'missing_value')
+KELVIN_UNITS = ('kelvin', 'degk', 'deg_k', 'degreesk', 'degrees_k', 'degree_k', 'degreek')
+
+
+class GranuleMetadata:
+    """
+    Variable attributes of a granule that processors look up for every tile (units, standard names, fill values), and
+    the decisions derived from them, computed once per dataset and shared by all processors.
+
+    Use GranuleMetadata.of(dataset) rather than the constructor, so that every processor gets the same instance.
+    """
+
+    _instances: Dict[int, Tuple[weakref.ref, 'GranuleMetadata']] = {}
+
+    def __init__(self, dataset: xr.Dataset):
+        self.units: Dict[str, List[str]] = {}
+        self.standard_names: Dict[str, str] = {}
+        # Fill value of each variable, or None; xarray moves it to the encoding when it masks the variable.
+        self.fill_values: Dict[str, Any] = {}
+
+        for name, variable in dataset.variables.items():
+            self.units[name] = type(self)._variable_units(variable.attrs)
+            self.standard_names[name] = variable.attrs.get('standard_name')
+            self.fill_values[name] = type(self)._variable_fill_value(variable)
+
+        self._standard_names_json = {}
+        self._kelvin = {}
+
+    @classmethod
+    def of(cls, dataset: xr.Dataset) -> 'GranuleMetadata':
+        entry = cls._instances.get(id(dataset))
+        if entry is not None and entry[0]() is dataset:
+            return entry[1]
+
+        metadata = cls(dataset)
+        instances = {key: value for key, value in cls._instances.items() if value[0]() is not None}
+        instances[id(dataset)] = (weakref.ref(dataset), metadata)
+        cls._instances = instances
+        return metadata
+
+    def standard_names_json(self, data_var_name: str) -> str:
+        """
+        Returns the JSON list of the standard names of the variables in a tile's data_var_name.
+        """
+        encoded = self._standard_names_json.get(data_var_name)
+        if encoded is None:
+            encoded = json.dumps([self.standard_names[name] for name in type(self)._variable_names(data_var_name)])
+            self._standard_names_json[data_var_name] = encoded
+        return encoded
+
+    def is_kelvin(self, data_var_name: str) -> bool:
+        """
+        True if any of the variables in a tile's data_var_name has a Kelvin unit.
+        """
+        kelvin = self._kelvin.get(data_var_name)
+        if kelvin is None:
+            units = []
+            for name in type(self)._variable_names(data_var_name):
+                if name in self.units:
+                    units.extend(self.units[name])
+                else:
+                    logger.error(f'Variable {name} is not in the granule; cannot look up its units')
+            kelvin = any(unit.lower() in KELVIN_UNITS for unit in units)
+            self._kelvin[data_var_name] = kelvin
+        return kelvin
+
+    @staticmethod
+    def _variable_names(data_var_name: str) -> List[str]:
+        names = json.loads(data_var_name)
+        return names if isinstance(names, list) else [names]
+
+    @staticmethod
+    def _variable_fill_value(variable: xr.Variable):
+        for attrs in (variable.encoding, variable.attrs):
+            for fill_value_attr in FILL_VALUE_ATTRIBUTES:
+                if fill_value_attr in attrs:
+                    return attrs[fill_value_attr]
+        return None
+
+    @staticmethod
+    def _variable_units(attrs: dict) -> List[str]:
+        for unit_attr in UNIT_ATTRIBUTES:
+            if unit_attr in attrs:
+                units = attrs[unit_attr]
+                return [str(unit) for unit in units] if isinstance(units, list) else [str(units)]
+        return []
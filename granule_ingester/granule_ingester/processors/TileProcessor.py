@@ -14,12 +14,21 @@
 # limitations under the License.
 
 from abc import ABC, abstractmethod
+
+import xarray as xr
 from nexusproto.serialization import from_shaped_array, to_shaped_array
 from nexusproto.DataTile_pb2 import NexusTile
 
 
 # TODO: make this an informal interface, not an abstract class
 class TileProcessor(ABC):
+    def prepare(self, dataset: xr.Dataset):
+        """
+        Called once per granule (and per worker) before any tile of the granule is processed. Processors can override
+        this to compute granule-wide state, such as decoded coordinates, so that process() only does per-tile work.
+        """
+        pass
+
     @abstractmethod
     def process(self, tile: NexusTile, *args, **kwargs):
         # accessing the data
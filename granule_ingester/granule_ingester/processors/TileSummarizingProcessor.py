@@ -19,6 +19,7 @@ import numpy
 from nexusproto import DataTile_pb2 as nexusproto
 from nexusproto.serialization import from_shaped_array
 
+from granule_ingester.processors.GranuleMetadata import GranuleMetadata
 from granule_ingester.processors.TileProcessor import TileProcessor
 logger = logging.getLogger(__name__)
 
@@ -44,13 +45,16 @@ class TileSummarizingProcessor(TileProcessor):
         super().__init__(*args, **kwargs)
         self._dataset_name = dataset_name
 
+    def prepare(self, dataset):
+        GranuleMetadata.of(dataset)
+
     def process(self, tile, dataset, *args, **kwargs):
         tile_type = tile.tile.WhichOneof("tile_type")
         logger.debug(f'processing granule: {tile.summary.granule}')
         tile_data = getattr(tile.tile, tile_type)
 
-        latitudes = numpy.ma.masked_invalid(from_shaped_array(tile_data.latitude))
-        longitudes = numpy.ma.masked_invalid(from_shaped_array(tile_data.longitude))
+        latitudes = from_shaped_array(tile_data.latitude)
+        longitudes = from_shaped_array(tile_data.longitude)
         data = from_shaped_array(tile_data.variable_data)
         logger.debug(f'retrieved lat, long, data')
 
@@ -58,18 +62,10 @@ class TileSummarizingProcessor(TileProcessor):
         logger.debug(f'retrieved summary')
 
         tile_summary.dataset_name = self._dataset_name
-        tile_summary.bbox.lat_min = numpy.nanmin(latitudes).item()
-        tile_summary.bbox.lat_max = numpy.nanmax(latitudes).item()
-        tile_summary.bbox.lon_min = numpy.nanmin(longitudes).item()
-        tile_summary.bbox.lon_max = numpy.nanmax(longitudes).item()
-
-        if all(numpy.isnan(data).flatten()):
-            tile_summary.stats.min = numpy.nan
-            tile_summary.stats.max = numpy.nan
-        else:
-            tile_summary.stats.min = numpy.nanmin(data).item()
-            tile_summary.stats.max = numpy.nanmax(data).item()
-        tile_summary.stats.count = data.size - numpy.count_nonzero(numpy.isnan(data))
+        tile_summary.bbox.lat_min, tile_summary.bbox.lat_max = finite_min_max(latitudes)
+        tile_summary.bbox.lon_min, tile_summary.bbox.lon_max = finite_min_max(longitudes)
+
+        tile_summary.stats.min, tile_summary.stats.max, tile_summary.stats.count = nan_min_max_count(data)
         logger.debug(f'set summary fields')
 
         data_var_name = json.loads(tile_summary.data_var_name)
@@ -104,22 +100,71 @@ class TileSummarizingProcessor(TileProcessor):
         except NoTimeException:
             pass
         logger.debug(f'calc standard_name')
-        standard_names = [dataset.variables[k].attrs.get('standard_name')for k in data_var_name]
-        logger.debug(f'using standard_names: {standard_names}')
-        tile_summary.standard_name = json.dumps(standard_names)
+        tile_summary.standard_name = GranuleMetadata.of(dataset).standard_names_json(tile_summary.data_var_name)
+        logger.debug(f'using standard_names: {tile_summary.standard_name}')
         logger.debug(f'copy tile_summary to tile')
         tile.summary.CopyFrom(tile_summary)
         return tile
 
     @staticmethod
     def calculate_mean_for_grid_tile(variable_data, latitudes, longitudes, data_var_name_len=1):
-        flattened_variable_data = numpy.ma.masked_invalid(variable_data).flatten()
-        repeated_latitudes = numpy.repeat(latitudes, len(longitudes) * data_var_name_len)
-        weights = numpy.cos(numpy.radians(repeated_latitudes))
-        return numpy.ma.average(flattened_variable_data, weights=weights).item()
+        latitudes = numpy.ma.filled(latitudes, numpy.nan)
+        if variable_data.size != len(latitudes) * len(longitudes) * data_var_name_len:
+            raise ValueError(f'Grid data of shape {variable_data.shape} does not match {len(latitudes)} latitudes, '
+                             f'{len(longitudes)} longitudes and {data_var_name_len} variables')
+        # Every row of the data shares the weight of its latitude, which is broadcast rather than repeated.
+        weights = numpy.cos(numpy.radians(latitudes)).reshape(len(latitudes), 1)
+        return weighted_mean(variable_data.reshape(len(latitudes), -1), weights)
 
     @staticmethod
     def calculate_mean_for_swath_tile(variable_data, latitudes):
-        weights = numpy.cos(numpy.radians(latitudes))
-        return numpy.ma.average(numpy.ma.masked_invalid(variable_data),
-                                weights=weights).item()
+        latitudes = numpy.ma.filled(latitudes, numpy.nan)
+        if variable_data.shape != latitudes.shape:
+            raise TypeError(f'Swath data of shape {variable_data.shape} does not match latitudes of shape '
+                            f'{latitudes.shape}')
+        return weighted_mean(variable_data, numpy.cos(numpy.radians(latitudes)))
+
+
+def finite_min_max(values: numpy.ndarray):
+    """
+    Equivalent to the nanmin and nanmax of numpy.ma.masked_invalid(values), without the masked array.
+    """
+    if values.size:
+        minimum = numpy.fmin.reduce(values, axis=None)
+        maximum = numpy.fmax.reduce(values, axis=None)
+        if numpy.isfinite(minimum) and numpy.isfinite(maximum):
+            return minimum.item(), maximum.item()
+
+    # Only infinite values, or no finite value at all, need the masked array.
+    masked = numpy.ma.masked_invalid(values)
+    return numpy.nanmin(masked).item(), numpy.nanmax(masked).item()
+
+
+def nan_min_max_count(data: numpy.ndarray):
+    """
+    Returns the minimum, maximum and number of the non-NaN values of data, with NaN extrema if all values are NaN.
+    """
+    count = data.size - numpy.count_nonzero(numpy.isnan(data))
+    if count == 0:
+        return numpy.nan, numpy.nan, count
+    # fmin and fmax ignore NaN without copying the data like nanmin and nanmax do.
+    return numpy.fmin.reduce(data, axis=None).item(), numpy.fmax.reduce(data, axis=None).item(), count
+
+
+def weighted_mean(values: numpy.ndarray, weights: numpy.ndarray) -> float:
+    """
+    Equivalent to numpy.ma.average(numpy.ma.masked_invalid(values), weights=weights) with weights that may be
+    broadcast to the shape of values and are invalid where they are not finite. Returns 0.0 if no value is valid.
+    """
+    if issubclass(values.dtype.type, (numpy.integer, numpy.bool_)):
+        result_dtype = numpy.result_type(values.dtype, weights.dtype, 'f8')
+    else:
+        result_dtype = numpy.result_type(values.dtype, weights.dtype)
+
+    valid = numpy.isfinite(values) & numpy.isfinite(weights)
+    if not valid.any():
+        return 0.0
+
+    weights = numpy.where(valid, weights, 0).ravel()
+    weighted = numpy.multiply(numpy.where(valid, values, 0).ravel(), weights, dtype=result_dtype)
+    return (weighted.sum() / weights.sum(dtype=result_dtype)).item()
@@ -0,0 +1,117 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+from collections import OrderedDict
+from typing import Hashable, Iterable, List, Tuple
+
+import numpy as np
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_MAX_BYTES = 32 * 2 ** 20
+
+
+def coordinate_fingerprint(name: str, values: np.ndarray) -> str:
+    """
+    Identifies a decoded coordinate array by its name, shape, dtype and content, so that the slices of a coordinate
+    can be reused by any granule with identical coordinates.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f'{name}|{values.shape}|{values.dtype.str}|'.encode())
+    digest.update(np.ascontiguousarray(values).tobytes())
+    return digest.hexdigest()
+
+
+class CoordinateCache:
+    """
+    Bounded LRU cache of coordinate tile subsets, holding both the decoded array and its serialized
+    ShapedArray.
+
+    Only the entries of the coordinates selected with share() are pickled with the reading processor, so the workers
+    of a granule receive the subsets cached for its own coordinates and nothing else. Entries added in a worker can be
+    sent back with drain_new() and merged into the processor of the main process, where they are available to the
+    workers of the next granule with the same coordinates. The cache is not thread-safe; in thread mode reading
+    processors are serialized by the pipeline.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._new_keys = []
+        self._shared_fingerprints = frozenset()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable):
+        return key in self._entries
+
+    def get(self, key: Hashable):
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Tuple):
+        if self._add(key, value):
+            self._new_keys.append(key)
+
+    def share(self, fingerprints: Iterable[str]):
+        """
+        Selects the coordinates, by fingerprint, whose entries are pickled with the cache.
+        """
+        self._shared_fingerprints = frozenset(fingerprints)
+
+    def drain_new(self) -> List[Tuple[Hashable, Tuple]]:
+        """
+        Returns the entries added with put() since the last call and are still cached.
+        """
+        entries = [(key, self._entries[key]) for key in self._new_keys if key in self._entries]
+        self._new_keys = []
+        return entries
+
+    def merge(self, entries: List[Tuple[Hashable, Tuple]]):
+        for key, value in entries:
+            self._add(key, value)
+
+    def _add(self, key: Hashable, value: Tuple) -> bool:
+        if key in self._entries:
+            return False
+
+        size = self._size_of(value)
+        if size > self._max_bytes:
+            return False
+
+        self._entries[key] = value
+        self._bytes += size
+        while len(self._entries) > self._max_entries or self._bytes > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= self._size_of(evicted)
+        return True
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_entries'] = OrderedDict((key, value) for key, value in self._entries.items()
+                                        if key[0] in self._shared_fingerprints)
+        state['_bytes'] = sum(self._size_of(value) for value in state['_entries'].values())
+        state['_new_keys'] = []
+        return state
+
+    @staticmethod
+    def _size_of(value: Tuple) -> int:
+        array, _, encoded = value
+        return array.nbytes + len(encoded)
@@ -43,13 +43,10 @@ class EccoReadingProcessor(TileReadingProcessor):
         data_variable = self.variable[0] if isinstance(self.variable, list) else self.variable
         new_tile = nexusproto.EccoTile()
 
-        lat_subset = ds[self.latitude][type(self)._slices_for_variable(ds[self.latitude], dimensions_to_slices)]
-        lon_subset = ds[self.longitude][type(self)._slices_for_variable(ds[self.longitude], dimensions_to_slices)]
-        lat_subset = np.ma.filled(np.squeeze(lat_subset), np.NaN)
-        lon_subset = np.ma.filled(np.squeeze(lon_subset), np.NaN)
+        lat_subset = np.squeeze(self._read_coordinate(ds, self.latitude, dimensions_to_slices))
+        lon_subset = np.squeeze(self._read_coordinate(ds, self.longitude, dimensions_to_slices))
 
-        data_subset = ds[data_variable][
-            type(self)._slices_for_variable(ds[data_variable], dimensions_to_slices)]
+        data_subset = self._read_variable(ds, data_variable, dimensions_to_slices)
         data_subset = np.ma.filled(np.squeeze(data_subset), np.NaN)
 
         new_tile.tile = ds[self.tile][dimensions_to_slices[self.tile].start].item()
@@ -71,7 +68,7 @@ class EccoReadingProcessor(TileReadingProcessor):
                 raise RuntimeError(
                     "Time slices must have length 1, but '{dim}' has length {dim_len}.".format(dim=self.time,
                                                                                                dim_len=time_slice_len))
-            new_tile.time = int(ds[self.time][time_slice.start].item() / 1e9)
+            new_tile.time = self._epoch_time(ds, time_slice.start)
 
         new_tile.latitude.CopyFrom(to_shaped_array(lat_subset))
         new_tile.longitude.CopyFrom(to_shaped_array(lon_subset))
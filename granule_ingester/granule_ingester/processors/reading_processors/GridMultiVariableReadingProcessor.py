@@ -16,8 +16,6 @@
 import logging
 from typing import Dict
 
-import cftime
-import numpy as np
 import xarray as xr
 from granule_ingester.processors.reading_processors.MultiBandUtils import MultiBandUtils
 from nexusproto import DataTile_pb2 as nexusproto
@@ -61,31 +59,16 @@ class GridMultiVariableReadingProcessor(TileReadingProcessor):
         """
         new_tile = nexusproto.GridMultiVariableTile()
 
-        lat_subset = ds[self.latitude][type(self)._slices_for_variable(ds[self.latitude], dimensions_to_slices)]
-        lon_subset = ds[self.longitude][type(self)._slices_for_variable(ds[self.longitude], dimensions_to_slices)]
-
-        lat_subset = np.squeeze(lat_subset)
-        if lat_subset.shape == ():
-            lat_subset = np.expand_dims(lat_subset, 0)
-
-        lon_subset = np.squeeze(lon_subset)
-        if lon_subset.shape == ():
-            lon_subset = np.expand_dims(lon_subset, 0)
-
-        lat_subset = np.ma.filled(lat_subset, np.NaN)
-        lon_subset = np.ma.filled(lon_subset, np.NaN)
+        _, _, lat_encoded = self._coordinate_tile(ds, self.latitude, dimensions_to_slices)
+        _, _, lon_encoded = self._coordinate_tile(ds, self.longitude, dimensions_to_slices)
 
         if not isinstance(self.variable, list):
             raise ValueError(f'self.variable `{self.variable}` needs to be a list. use GridReadingProcessor for single band Grid files.')
         logger.debug(f'reading as banded grid as self.variable is a list. self.variable: {self.variable}')
         if len(self.variable) < 1:
             raise ValueError(f'list of variable is empty. Need at least 1 variable')
-        data_subset = [ds[k][type(self)._slices_for_variable(ds[k], dimensions_to_slices)] for k in self.variable]
-        updated_dims, updated_dims_indices = MultiBandUtils.move_band_dimension(list(data_subset[0].dims))
-        data_subset = [ds.data for ds in data_subset]
-        data_subset = np.array(data_subset)
-        logger.debug(f'transposing data_subset')
-        data_subset = data_subset.transpose(updated_dims_indices)
+        updated_dims, _ = MultiBandUtils.move_band_dimension(list(ds[self.variable[0]].dims))
+        data_subset = self._read_bands(ds, self.variable, dimensions_to_slices)
         logger.debug(f'adding summary.data_dim_names')
         input_tile.summary.data_dim_names.extend(updated_dims)
         if self.height:
@@ -97,18 +80,12 @@ class GridMultiVariableReadingProcessor(TileReadingProcessor):
                     "Depth slices must have length 1, but '{dim}' has length {dim_len}.".format(dim=depth_dim,
                                                                                                 dim_len=depth_slice_len))
 
-            if self.invert_z:
-                ds[self.height] = ds[self.height] * -1
+            elevation = self._height_value(ds, depth_slice.start)
 
-            new_tile.min_elevation = ds[self.height][depth_slice].item()
-            new_tile.max_elevation = ds[self.height][depth_slice].item()
+            new_tile.min_elevation = elevation
+            new_tile.max_elevation = elevation
 
-            new_tile.elevation.CopyFrom(to_shaped_array(
-                np.full(
-                    data_subset.shape,
-                    ds[self.height][depth_slice].item()
-                )
-            ))
+            new_tile.elevation.ParseFromString(self._constant_elevation(ds, data_subset.shape, elevation))
 
         if self.time:
             time_slice = dimensions_to_slices[self.time]
@@ -118,12 +95,10 @@ class GridMultiVariableReadingProcessor(TileReadingProcessor):
                     "Time slices must have length 1, but '{dim}' has length {dim_len}.".format(dim=self.time,
                                                                                                dim_len=time_slice_len))
 
-            if isinstance(ds[self.time][time_slice.start].item(), cftime.datetime):
-                ds[self.time] = ds.indexes[self.time].to_datetimeindex()
-            new_tile.time = int(ds[self.time][time_slice.start].item() / 1e9)
+            new_tile.time = self._epoch_time(ds, time_slice.start)
 
-        new_tile.latitude.CopyFrom(to_shaped_array(lat_subset))
-        new_tile.longitude.CopyFrom(to_shaped_array(lon_subset))
+        new_tile.latitude.ParseFromString(lat_encoded)
+        new_tile.longitude.ParseFromString(lon_encoded)
         new_tile.variable_data.CopyFrom(to_shaped_array(data_subset))
 
         input_tile.tile.grid_multi_variable_tile.CopyFrom(new_tile)
@@ -15,7 +15,6 @@
 
 from typing import Dict
 
-import cftime
 import numpy as np
 import xarray as xr
 from nexusproto import DataTile_pb2 as nexusproto
@@ -46,24 +45,14 @@ class GridReadingProcessor(TileReadingProcessor):
 
         expand_axes = []
 
-        lat_subset = ds[self.latitude][type(self)._slices_for_variable(ds[self.latitude], dimensions_to_slices)]
-        lon_subset = ds[self.longitude][type(self)._slices_for_variable(ds[self.longitude], dimensions_to_slices)]
-
-        lat_subset = np.squeeze(lat_subset)
-        if lat_subset.shape == ():
-            lat_subset = np.expand_dims(lat_subset, 0)
+        _, lat_expanded, lat_encoded = self._coordinate_tile(ds, self.latitude, dimensions_to_slices)
+        _, lon_expanded, lon_encoded = self._coordinate_tile(ds, self.longitude, dimensions_to_slices)
+        if lat_expanded:
             expand_axes.append(0)
-
-        lon_subset = np.squeeze(lon_subset)
-        if lon_subset.shape == ():
-            lon_subset = np.expand_dims(lon_subset, 0)
+        if lon_expanded:
             expand_axes.append(1)
 
-        lat_subset = np.ma.filled(lat_subset, np.NaN)
-        lon_subset = np.ma.filled(lon_subset, np.NaN)
-
-        data_subset = ds[data_variable][type(self)._slices_for_variable(ds[data_variable],
-                                                                        dimensions_to_slices)].data
+        data_subset = self._read_variable(ds, data_variable, dimensions_to_slices)
         data_subset = np.array(np.squeeze(data_subset))
 
         if len(expand_axes) > 0:
@@ -78,18 +67,12 @@ class GridReadingProcessor(TileReadingProcessor):
                 raise RuntimeError(
                     "Depth slices must have length 1, but '{dim}' has length {dim_len}.".format(dim=depth_dim,
                                                                                                 dim_len=depth_slice_len))
-            if self.invert_z:
-                ds[self.height] = ds[self.height] * -1
+            elevation = self._height_value(ds, depth_slice.start)
 
-            new_tile.min_elevation = ds[self.height][depth_slice].item()
-            new_tile.max_elevation = ds[self.height][depth_slice].item()
+            new_tile.min_elevation = elevation
+            new_tile.max_elevation = elevation
 
-            new_tile.elevation.CopyFrom(to_shaped_array(
-                np.full(
-                    data_subset.shape,
-                    ds[self.height][depth_slice].item()
-                )
-            ))
+            new_tile.elevation.ParseFromString(self._constant_elevation(ds, data_subset.shape, elevation))
 
         if self.time:
             time_slice = dimensions_to_slices[self.time]
@@ -98,12 +81,10 @@ class GridReadingProcessor(TileReadingProcessor):
                 raise RuntimeError(
                     "Time slices must have length 1, but '{dim}' has length {dim_len}.".format(dim=self.time,
                                                                                                dim_len=time_slice_len))
-            if isinstance(ds[self.time][time_slice.start].item(), cftime.datetime):
-                ds[self.time] = ds.indexes[self.time].to_datetimeindex()
-            new_tile.time = int(ds[self.time][time_slice.start].item() / 1e9)
+            new_tile.time = self._epoch_time(ds, time_slice.start)
 
-        new_tile.latitude.CopyFrom(to_shaped_array(lat_subset))
-        new_tile.longitude.CopyFrom(to_shaped_array(lon_subset))
+        new_tile.latitude.ParseFromString(lat_encoded)
+        new_tile.longitude.ParseFromString(lon_encoded)
         new_tile.variable_data.CopyFrom(to_shaped_array(data_subset))
 
         input_tile.tile.grid_tile.CopyFrom(new_tile)
@@ -16,7 +16,6 @@
 import logging
 from typing import Dict
 
-import numpy as np
 import xarray as xr
 from granule_ingester.processors.reading_processors.MultiBandUtils import MultiBandUtils
 from nexusproto import DataTile_pb2 as nexusproto
@@ -28,6 +27,8 @@ logger = logging.getLogger(__name__)
 
 
 class SwathMultiVariableReadingProcessor(TileReadingProcessor):
+    prepares_epoch_times = True
+
     def __init__(
             self,
             variable,
@@ -49,20 +50,13 @@ class SwathMultiVariableReadingProcessor(TileReadingProcessor):
             raise ValueError(f'list of variable is empty. Need at least 1 variable')
 
         new_tile = nexusproto.SwathMultiVariableTile()
-        lat_subset = ds[self.latitude][type(self)._slices_for_variable(ds[self.latitude], dimensions_to_slices)]
-        lon_subset = ds[self.longitude][type(self)._slices_for_variable(ds[self.longitude], dimensions_to_slices)]
-        lat_subset = np.ma.filled(lat_subset, np.NaN)
-        lon_subset = np.ma.filled(lon_subset, np.NaN)
-
-        time_subset = ds[self.time][type(self)._slices_for_variable(ds[self.time], dimensions_to_slices)]
-        time_subset = np.ma.filled(type(self)._convert_to_timestamp(time_subset), np.NaN)
-
-        data_subset = [ds[k][type(self)._slices_for_variable(ds[k], dimensions_to_slices)] for k in self.variable]
-        updated_dims, updated_dims_indices = MultiBandUtils.move_band_dimension(list(data_subset[0].dims))
-        data_subset = [ds.data for ds in data_subset]
-        data_subset = np.array(data_subset)
-        logger.debug(f'transposing data_subset')
-        data_subset = data_subset.transpose(updated_dims_indices)
+        lat_subset = self._read_coordinate(ds, self.latitude, dimensions_to_slices)
+        lon_subset = self._read_coordinate(ds, self.longitude, dimensions_to_slices)
+
+        time_subset = self._epoch_times(ds, dimensions_to_slices)
+
+        updated_dims, _ = MultiBandUtils.move_band_dimension(list(ds[self.variable[0]].dims))
+        data_subset = self._read_bands(ds, self.variable, dimensions_to_slices)
         logger.debug(f'adding summary.data_dim_names')
         input_tile.summary.data_dim_names.extend(updated_dims)
 
@@ -75,18 +69,12 @@ class SwathMultiVariableReadingProcessor(TileReadingProcessor):
                     "Depth slices must have length 1, but '{dim}' has length {dim_len}.".format(dim=depth_dim,
                                                                                                 dim_len=depth_slice_len))
 
-            if self.invert_z:
-                ds[self.height] = ds[self.height] * -1
+            elevation = self._height_value(ds, depth_slice.start)
 
-            new_tile.min_elevation = ds[self.height][depth_slice].item()
-            new_tile.max_elevation = ds[self.height][depth_slice].item()
+            new_tile.min_elevation = elevation
+            new_tile.max_elevation = elevation
 
-            new_tile.elevation.CopyFrom(to_shaped_array(
-                np.full(
-                    data_subset.shape,
-                    ds[self.height][depth_slice].item()
-                )
-            ))
+            new_tile.elevation.ParseFromString(self._constant_elevation(ds, data_subset.shape, elevation))
 
         new_tile.latitude.CopyFrom(to_shaped_array(lat_subset))
         new_tile.longitude.CopyFrom(to_shaped_array(lon_subset))
@@ -24,6 +24,8 @@ from granule_ingester.processors.reading_processors.TileReadingProcessor import
 
 
 class SwathReadingProcessor(TileReadingProcessor):
+    prepares_epoch_times = True
+
     def __init__(
             self,
             variable,
@@ -43,16 +45,12 @@ class SwathReadingProcessor(TileReadingProcessor):
         data_variable = self.variable[0] if isinstance(self.variable, list) else self.variable
         new_tile = nexusproto.SwathTile()
 
-        lat_subset = ds[self.latitude][type(self)._slices_for_variable(ds[self.latitude], dimensions_to_slices)]
-        lon_subset = ds[self.longitude][type(self)._slices_for_variable(ds[self.longitude], dimensions_to_slices)]
-        lat_subset = np.ma.filled(lat_subset, np.NaN)
-        lon_subset = np.ma.filled(lon_subset, np.NaN)
+        lat_subset = self._read_coordinate(ds, self.latitude, dimensions_to_slices)
+        lon_subset = self._read_coordinate(ds, self.longitude, dimensions_to_slices)
 
-        time_subset = ds[self.time][type(self)._slices_for_variable(ds[self.time], dimensions_to_slices)]
-        time_subset = np.ma.filled(type(self)._convert_to_timestamp(time_subset), np.NaN)
+        time_subset = self._epoch_times(ds, dimensions_to_slices)
 
-        data_subset = ds[data_variable][type(self)._slices_for_variable(ds[data_variable],
-                                                                                dimensions_to_slices)].data
+        data_subset = self._read_variable(ds, data_variable, dimensions_to_slices)
         data_subset = np.array(data_subset)
 
         if self.height:
@@ -64,18 +62,12 @@ class SwathReadingProcessor(TileReadingProcessor):
                     "Depth slices must have length 1, but '{dim}' has length {dim_len}.".format(dim=depth_dim,
                                                                                                 dim_len=depth_slice_len))
 
-            if self.invert_z:
-                ds[self.height] = ds[self.height] * -1
+            elevation = self._height_value(ds, depth_slice.start)
 
-            new_tile.min_elevation = ds[self.height][depth_slice].item()
-            new_tile.max_elevation = ds[self.height][depth_slice].item()
+            new_tile.min_elevation = elevation
+            new_tile.max_elevation = elevation
 
-            new_tile.elevation.CopyFrom(to_shaped_array(
-                np.full(
-                    data_subset.shape,
-                    ds[self.height][depth_slice].item()
-                )
-            ))
+            new_tile.elevation.ParseFromString(self._constant_elevation(ds, data_subset.shape, elevation))
 
         new_tile.latitude.CopyFrom(to_shaped_array(lat_subset))
         new_tile.longitude.CopyFrom(to_shaped_array(lon_subset))
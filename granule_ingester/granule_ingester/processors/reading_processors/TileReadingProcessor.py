@@ -15,19 +15,50 @@
 import datetime
 import json
 import logging
+import weakref
 from abc import ABC, abstractmethod
-from typing import Dict, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple, Union
 
+import cftime
 import numpy as np
 import xarray as xr
 from granule_ingester.exceptions import TileProcessingError
+from granule_ingester.processors.CompactShapedArray import to_constant_shaped_array
 from granule_ingester.processors.TileProcessor import TileProcessor
+from granule_ingester.processors.reading_processors.CoordinateCache import CoordinateCache, coordinate_fingerprint
 from nexusproto import DataTile_pb2 as nexusproto
+from nexusproto.serialization import to_shaped_array
 
 logger = logging.getLogger(__name__)
 
+# Coordinates larger than this are read tile by tile instead of being decoded once for the whole granule.
+MAX_PREPARED_COORDINATE_BYTES = 64 * 2 ** 20
+
+# Largest slab of a data variable that is read at once and kept in memory for the tiles sharing its outer indexes.
+DEFAULT_SLAB_MEMORY_LIMIT = 128 * 2 ** 20
+
+
+class GranuleContext:
+    """
+    Granule-wide values computed once by TileReadingProcessor.prepare() and sliced by every tile.
+    """
+
+    def __init__(self):
+        self.dims = {}
+        self.coordinates = {}
+        self.fingerprints = {}
+        self.slabs = {}
+        self.columns = {}
+        self.times = None
+        self.epoch_times = None
+        self.elevations = {}
+        self.heights = None
+
 
 class TileReadingProcessor(TileProcessor, ABC):
+    # Readers that put a time array in their tiles set this to convert the whole time variable once per granule.
+    prepares_epoch_times = False
 
     def __init__(
             self,
@@ -37,6 +68,9 @@ class TileReadingProcessor(TileProcessor, ABC):
             height: str = None,
             depth: str = None,
             *args,
+            slab_memory_limit: int = DEFAULT_SLAB_MEMORY_LIMIT,
+            band_read_threads: int = 1,
+            compact_elevation: bool = False,
             **kwargs
     ):
         try:
@@ -64,6 +98,224 @@ class TileReadingProcessor(TileProcessor, ABC):
 
         # self.invert_z: if depth is specified instead of height, multiply it by -1, so it becomes height
 
+        # Tiles sharing the outer (e.g. time or depth) indexes of a data variable are cut out of a single read of the
+        # whole slab, as long as the slab is no larger than this many bytes. 0 disables slab reads.
+        self.slab_memory_limit = int(slab_memory_limit)
+
+        # Multi-variable readers read their bands on this many threads. Only worth it, and only safe, for backends that
+        # release the GIL and can be read concurrently (e.g. Zarr); the HDF5 library serializes or is not thread-safe.
+        self.band_read_threads = int(band_read_threads)
+
+        # Constant elevations (from the height or depth dimension) are written in the compact ShapedArray encoding,
+        # a single value standing for the whole tile, instead of one value per cell.
+        self.compact_elevation = compact_elevation
+
+        self._contexts = {}
+        self.coordinate_cache = CoordinateCache()
+
+    def __getstate__(self):
+        # Prepared contexts hold decoded granule data; each worker prepares its own. The coordinate cache pickles
+        # only the entries of the coordinates it shares.
+        state = self.__dict__.copy()
+        state['_contexts'] = {}
+        return state
+
+    def prepare(self, dataset: xr.Dataset):
+        self._get_context(dataset)
+
+    def share_coordinate_cache(self, dataset: xr.Dataset):
+        """
+        Selects the cached subsets of the dataset's coordinates to be pickled with the processor.
+        """
+        self.coordinate_cache.share(self._get_context(dataset).fingerprints.values())
+
+    def _get_context(self, ds: xr.Dataset) -> GranuleContext:
+        # Contexts are keyed by dataset so that a processor shared by several threads, each with its own shallow copy
+        # of the dataset, and tests calling _generate_tile() directly without prepare() both get the right values.
+        entry = self._contexts.get(id(ds))
+        if entry is not None and entry[0]() is ds:
+            return entry[1]
+
+        self._contexts = {key: value for key, value in self._contexts.items() if value[0]() is not None}
+        context = self._build_context(ds)
+        self._contexts[id(ds)] = (weakref.ref(ds), context)
+        return context
+
+    def _build_context(self, ds: xr.Dataset) -> GranuleContext:
+        context = GranuleContext()
+
+        for name in (self.latitude, self.longitude):
+            if name in ds.variables:
+                context.dims[name] = ds[name].dims
+                if ds[name].nbytes <= MAX_PREPARED_COORDINATE_BYTES:
+                    context.coordinates[name] = np.asarray(ds[name].values)
+                    context.fingerprints[name] = coordinate_fingerprint(name, context.coordinates[name])
+
+        time = getattr(self, 'time', None)
+        if time and time in ds.variables:
+            times = ds[time]
+            if times.ndim == 1 and times.size > 0 and isinstance(times.values[0], cftime.datetime):
+                times = ds.indexes[time].to_datetimeindex()
+            if np.ndim(times) == 1:
+                # tolist() gives the same Python values as .item() on each element, e.g. nanoseconds for datetime64
+                context.times = np.asarray(times).tolist()
+
+        if self.prepares_epoch_times and time and time in ds.variables:
+            times = ds[time]
+            # Offsets from a reference time are converted against the reference of each tile, so only absolute or
+            # numeric times can be converted for the whole granule at once.
+            if times.dtype.type != np.timedelta64 and times.nbytes <= MAX_PREPARED_COORDINATE_BYTES:
+                try:
+                    context.epoch_times = type(self)._epoch_seconds(np.asarray(times.values))
+                except TypeError:
+                    pass
+
+        if self.height and self.height in ds.variables:
+            heights = ds[self.height].values
+            if self.invert_z:
+                heights = heights * -1
+            context.heights = np.ravel(heights).tolist()
+
+        return context
+
+    def _read_coordinate(self, ds: xr.Dataset, name: str, dimensions_to_slices: Dict[str, slice]) -> np.ndarray:
+        """
+        Equivalent to np.ma.filled(ds[name][slices], np.NaN), using the decoded coordinate when it was prepared.
+        """
+        context = self._get_context(ds)
+        values = context.coordinates.get(name)
+        if values is None:
+            return np.ma.filled(ds[name][type(self)._slices_for_variable(ds[name], dimensions_to_slices)], np.NaN)
+        return values[tuple(dimensions_to_slices[dim] for dim in context.dims[name])]
+
+    def _read_variable(self, ds: xr.Dataset, name: str, dimensions_to_slices: Dict[str, slice]) -> np.ndarray:
+        """
+        Equivalent to ds[name][slices].data. When consecutive tiles share the leading length-1 (outer) indexes of the
+        variable, the whole slab at those indexes is read once and the following tiles are cut out of it in memory, so
+        the returned array may be a view that must not be modified.
+        """
+        variable = ds[name]
+        slices = type(self)._slices_for_variable(variable, dimensions_to_slices)
+        slices = [slices[dim] for dim in variable.dims]
+
+        outer_count = 0
+        while outer_count < len(slices) - 1 and slices[outer_count].stop - slices[outer_count].start == 1:
+            outer_count += 1
+
+        inner_slices = slices[outer_count:]
+        inner_shape = variable.shape[outer_count:]
+        slab_bytes = int(np.prod(inner_shape)) * variable.dtype.itemsize
+        covers_slab = all(s.start == 0 and s.stop >= length for s, length in zip(inner_slices, inner_shape))
+
+        if outer_count == 0 or covers_slab or slab_bytes > self.slab_memory_limit or variable.chunks is not None:
+            return variable[dict(zip(variable.dims, slices))].data
+
+        context = self._get_context(ds)
+        outer_key = tuple((s.start, s.stop) for s in slices[:outer_count])
+        key, slab = context.slabs.get(name, (None, None))
+
+        if key != outer_key:
+            # The first tile of a slab is read on its own: the slab only pays off once a second tile needs it.
+            context.slabs[name] = (outer_key, None)
+            return variable[dict(zip(variable.dims, slices))].data
+
+        if slab is None:
+            slab = np.asarray(variable[dict(zip(variable.dims[:outer_count], slices[:outer_count]))].values)
+            context.slabs[name] = (outer_key, slab)
+
+        return slab[(slice(None),) * outer_count + tuple(inner_slices)]
+
+    def _read_bands(self, ds: xr.Dataset, variables: List[str], dimensions_to_slices: Dict[str, slice]) -> np.ndarray:
+        """
+        Equivalent to np.array([ds[k][slices].data for k in variables]) with the band dimension moved last, but each band
+        is copied straight into its slot of a preallocated band-last array, which needs no further copy to be encoded.
+        """
+        self._get_context(ds)
+
+        if self.band_read_threads > 1 and len(variables) > 1:
+            # The threads only live for the bands of this tile, so no idle threads are left behind in the workers.
+            with ThreadPoolExecutor(max_workers=min(self.band_read_threads, len(variables))) as executor:
+                bands = executor.map(lambda name: self._read_variable(ds, name, dimensions_to_slices), variables)
+                return self._stack_bands(ds, variables, bands)
+        return self._stack_bands(ds, variables, (self._read_variable(ds, name, dimensions_to_slices)
+                                                 for name in variables))
+
+    @staticmethod
+    def _stack_bands(ds: xr.Dataset, variables: List[str], bands) -> np.ndarray:
+        output = None
+        for index, band in enumerate(bands):
+            if output is None:
+                dtype = np.result_type(*[ds[name].dtype for name in variables])
+                output = np.empty(np.shape(band) + (len(variables),), dtype=dtype)
+            output[..., index] = band
+        return output
+
+    def _coordinate_tile(self, ds: xr.Dataset, name: str,
+                         dimensions_to_slices: Dict[str, slice]) -> Tuple[np.ndarray, bool, bytes]:
+        """
+        Returns the squeezed coordinate subset of a tile (expanded to one dimension if it was a scalar), whether it had
+        to be expanded, and its serialized ShapedArray. Subsets of prepared coordinates are served from the coordinate
+        cache, so tiles and granules sharing the same coordinates decode and encode them only once.
+        """
+        context = self._get_context(ds)
+        fingerprint = context.fingerprints.get(name)
+        key = None
+        if fingerprint is not None:
+            key = (fingerprint,
+                   tuple((dimensions_to_slices[dim].start, dimensions_to_slices[dim].stop) for dim in context.dims[name]))
+            cached = self.coordinate_cache.get(key)
+            if cached is not None:
+                return cached
+
+        subset = np.squeeze(self._read_coordinate(ds, name, dimensions_to_slices))
+        expanded = subset.shape == ()
+        if expanded:
+            subset = np.expand_dims(subset, 0)
+
+        entry = (subset, expanded, to_shaped_array(subset).SerializeToString())
+        if key is not None:
+            self.coordinate_cache.put(key, entry)
+        return entry
+
+    def _epoch_times(self, ds: xr.Dataset, dimensions_to_slices: Dict[str, slice]) -> np.ndarray:
+        """
+        Equivalent to np.ma.filled(_convert_to_timestamp(ds[self.time][slices]), np.NaN), cut from the epoch seconds of
+        the whole time variable when they were prepared.
+        """
+        context = self._get_context(ds)
+        if context.epoch_times is None:
+            time_subset = ds[self.time][type(self)._slices_for_variable(ds[self.time], dimensions_to_slices)]
+            return np.ma.filled(type(self)._convert_to_timestamp(time_subset), np.NaN)
+        return context.epoch_times[tuple(dimensions_to_slices[dim] for dim in ds[self.time].dims)]
+
+    def _constant_elevation(self, ds: xr.Dataset, shape: Tuple[int, ...], elevation) -> bytes:
+        """
+        Returns the serialized ShapedArray of np.full(shape, elevation), in compact form if compact_elevation is set.
+        Only the shape and value are kept per granule, so tiles of the same shape and level share one encoding.
+        """
+        context = self._get_context(ds)
+        key = (shape, type(elevation), elevation)
+        encoded = context.elevations.get(key)
+        if encoded is None:
+            if self.compact_elevation:
+                encoded = to_constant_shaped_array(shape, elevation).SerializeToString()
+            else:
+                encoded = to_shaped_array(np.full(shape, elevation)).SerializeToString()
+            context.elevations[key] = encoded
+        return encoded
+
+    def _epoch_time(self, ds: xr.Dataset, index: int) -> int:
+        context = self._get_context(ds)
+        value = context.times[index] if context.times is not None else ds[self.time][index].item()
+        return int(value / 1e9)
+
+    def _height_value(self, ds: xr.Dataset, index: int):
+        context = self._get_context(ds)
+        if context.heights is not None:
+            return context.heights[index]
+        value = ds[self.height][index].item()
+        return value * -1 if self.invert_z else value
+
     def process(self, tile, dataset: xr.Dataset, *args, **kwargs):
         logger.debug(f'Reading Processor: {type(self)}')
         try:
@@ -105,6 +357,17 @@ class TileReadingProcessor(TileProcessor, ABC):
 
         return dim_to_slice
 
+    @staticmethod
+    def _epoch_seconds(times: np.ndarray) -> np.ndarray:
+        """
+        _convert_to_timestamp() for absolute or numeric times, on the NumPy array instead of a DataArray.
+        """
+        if np.issubdtype(times.dtype, np.number):
+            return times
+
+        epoch = np.datetime64(datetime.datetime(1970, 1, 1, 0, 0, 0))
+        return ((times - epoch) / 1e9).astype(int)
+
     @staticmethod
     def _convert_to_timestamp(times: xr.DataArray) -> xr.DataArray:
         if times.dtype.type == np.timedelta64:  # If time is an array of offsets from a fixed reference
@@ -24,6 +24,8 @@ from granule_ingester.processors.reading_processors.TileReadingProcessor import
 
 
 class TimeSeriesReadingProcessor(TileReadingProcessor):
+    prepares_epoch_times = True
+
     def __init__(self, variable, latitude, longitude, time, depth=None, **kwargs):
         super().__init__(variable, latitude, longitude, **kwargs)
         if isinstance(variable, list) and len(variable) != 1:
@@ -35,13 +37,10 @@ class TimeSeriesReadingProcessor(TileReadingProcessor):
         data_variable = self.variable[0] if isinstance(self.variable, list) else self.variable
         new_tile = nexusproto.TimeSeriesTile()
 
-        lat_subset = ds[self.latitude][type(self)._slices_for_variable(ds[self.latitude], dimensions_to_slices)]
-        lon_subset = ds[self.longitude][type(self)._slices_for_variable(ds[self.longitude], dimensions_to_slices)]
-        lat_subset = np.ma.filled(lat_subset, np.NaN)
-        lon_subset = np.ma.filled(lon_subset, np.NaN)
+        lat_subset = self._read_coordinate(ds, self.latitude, dimensions_to_slices)
+        lon_subset = self._read_coordinate(ds, self.longitude, dimensions_to_slices)
 
-        data_subset = ds[data_variable][type(self)._slices_for_variable(ds[data_variable],
-                                                                        dimensions_to_slices)]
+        data_subset = self._read_column(ds, data_variable, dimensions_to_slices)
         data_subset = np.ma.filled(data_subset, np.NaN)
 
         if self.depth:
@@ -54,8 +53,7 @@ class TimeSeriesReadingProcessor(TileReadingProcessor):
                                                                                                 dim_len=depth_slice_len))
             new_tile.depth = ds[self.depth][depth_slice].item()
 
-        time_subset = ds[self.time][type(self)._slices_for_variable(ds[self.time], dimensions_to_slices)]
-        time_subset = np.ma.filled(type(self)._convert_to_timestamp(time_subset), np.NaN)
+        time_subset = self._epoch_times(ds, dimensions_to_slices)
 
         new_tile.latitude.CopyFrom(to_shaped_array(lat_subset))
         new_tile.longitude.CopyFrom(to_shaped_array(lon_subset))
@@ -65,6 +63,24 @@ class TimeSeriesReadingProcessor(TileReadingProcessor):
         input_tile.tile.time_series_tile.CopyFrom(new_tile)
         return input_tile
 
+    def _read_column(self, ds: xr.Dataset, name: str, dimensions_to_slices: Dict[str, slice]) -> np.ndarray:
+        """
+        Equivalent to ds[name][slices].data. Variables that fit in slab_memory_limit are read once per granule into a
+        column-ordered (Fortran) array, so the tile of a single station or point is a contiguous view of it.
+        """
+        context = self._get_context(ds)
+        variable = ds[name]
+        columns = context.columns.get(name)
+        if columns is None:
+            if variable.nbytes > self.slab_memory_limit or variable.chunks is not None:
+                return self._read_variable(ds, name, dimensions_to_slices)
+            columns = np.asfortranarray(variable.values)
+            context.columns[name] = columns
+
+        subset = columns[tuple(dimensions_to_slices[dim] for dim in variable.dims)]
+        # Tiles of several columns are copied to C order, so they are encoded exactly like a direct read.
+        return subset if subset.flags.c_contiguous else np.ascontiguousarray(subset)
+
     # def read_data(self, tile_specifications, file_path, output_tile):
     #     with xr.decode_cf(xr.open_dataset(file_path, decode_cf=False), decode_times=False) as ds:
     #         for section_spec, dimtoslice in tile_specifications:
@@ -0,0 +1,101 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+from typing import Dict, List, Optional
+
+import xarray as xr
+
+from granule_ingester.slicers.SliceFileByStepSize import SliceFileByStepSize
+
+logger = logging.getLogger(__name__)
+
+
+class SliceFileByChunks(SliceFileByStepSize):
+    """
+    Slices a granule along the storage chunk boundaries of one of its variables, so every tile is backed by whole
+    chunks and no chunk is read (and decompressed) by more than one worker. This is mostly useful for Zarr stores,
+    but works for any chunked NetCDF4/HDF5 variable as well.
+
+    Step sizes given in dimension_step_sizes are treated as targets: a step larger than the chunk is rounded down to
+    a multiple of the chunk size, a smaller one is rounded down to a divisor of the chunk size. Dimensions that are
+    not chunked fall back to the requested step size, or to the full dimension length.
+    """
+
+    def __init__(self,
+                 variable: Optional[str] = None,
+                 dimension_step_sizes: Optional[Dict[str, int]] = None,
+                 *args, **kwargs):
+        super().__init__(dimension_step_sizes=dimension_step_sizes or {}, *args, **kwargs)
+        self._variable = variable
+        self._requested_step_sizes = dict(dimension_step_sizes or {})
+
+    def _generate_dataset_slices(self, dataset: xr.Dataset) -> List[str]:
+        # The step sizes depend on the chunking of each granule, so they are not kept on the slicer.
+        return self._generate_step_slices(dataset.sizes, self._chunk_aligned_step_sizes(dataset))
+
+    def _chunk_aligned_step_sizes(self, dataset: xr.Dataset) -> Dict[str, int]:
+        chunk_sizes = self._get_chunk_sizes(dataset)
+
+        step_sizes = {}
+        for dim_name, dim_len in dataset.sizes.items():
+            requested = self._requested_step_sizes.get(dim_name)
+            chunk = chunk_sizes.get(dim_name)
+
+            if chunk is None:
+                if requested is not None:
+                    step_sizes[dim_name] = requested
+                continue
+
+            chunk = min(chunk, dim_len)
+            if requested is None or requested == chunk:
+                step_sizes[dim_name] = chunk
+            elif requested > chunk:
+                step_sizes[dim_name] = (requested // chunk) * chunk
+            else:
+                step_sizes[dim_name] = max(d for d in range(1, requested + 1) if chunk % d == 0)
+
+        logger.info("Using chunk-aligned step sizes {}".format(step_sizes))
+        return step_sizes
+
+    def _get_chunk_sizes(self, dataset: xr.Dataset) -> Dict[str, int]:
+        if self._variable is not None:
+            if self._variable not in dataset.variables:
+                raise KeyError('Provided variable "{}" not found in dataset'.format(self._variable))
+            variables = [dataset[self._variable]]
+        else:
+            variables = [var for var in dataset.data_vars.values() if len(var.dims) > 1]
+
+        for var in variables:
+            chunks = self._variable_chunks(var)
+            if chunks:
+                return chunks
+        return {}
+
+    @staticmethod
+    def _variable_chunks(var: xr.DataArray) -> Dict[str, int]:
+        if var.chunks is not None:
+            # Dask-backed variable; the first block of each dimension is the nominal chunk size.
+            return {dim: sizes[0] for dim, sizes in zip(var.dims, var.chunks)}
+
+        preferred = var.encoding.get('preferred_chunks')
+        if preferred:
+            return {dim: int(size) for dim, size in preferred.items()}
+
+        chunks = var.encoding.get('chunks') or var.encoding.get('chunksizes')
+        if chunks and len(chunks) == len(var.dims):
+            return {dim: int(size) for dim, size in zip(var.dims, chunks)}
+
+        return {}
@@ -30,21 +30,25 @@ class SliceFileByStepSize(TileSlicer):
         self._dimension_step_sizes = dimension_step_sizes
 
     def _generate_slices(self, dimension_specs: Dict[str, int]) -> List[str]:
+        return self._generate_step_slices(dimension_specs, self._dimension_step_sizes)
+
+    def _generate_step_slices(self, dimension_specs: Dict[str, int], step_sizes: Dict[str, int]) -> List[str]:
         # make sure all provided dimensions are in dataset
-        for dim_name in self._dimension_step_sizes.keys():
+        for dim_name in step_sizes.keys():
             if dim_name not in list(dimension_specs.keys()):
                 raise KeyError('Provided dimension "{}" not found in dataset'.format(dim_name))
 
-        slices = self._generate_chunk_boundary_slices(dimension_specs)
+        slices = self._generate_chunk_boundary_slices(dimension_specs, step_sizes)
         logger.info("Sliced granule into {} slices.".format(len(slices)))
         return slices
 
-    def _generate_chunk_boundary_slices(self, dimension_specs) -> list:
+    def _generate_chunk_boundary_slices(self, dimension_specs, step_sizes: Dict[str, int] = None) -> list:
         dimension_bounds = []
-        dim_step_keys = self._dimension_step_sizes.keys()
+        if step_sizes is None:
+            step_sizes = self._dimension_step_sizes
 
         for dim_name, dim_len in dimension_specs.items():
-            step_size = self._dimension_step_sizes[dim_name] if dim_name in dim_step_keys else dim_len
+            step_size = step_sizes.get(dim_name, dim_len)
 
             bounds = []
             for i in range(0, dim_len, step_size):
@@ -13,18 +13,42 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
+import logging
 from abc import ABC, abstractmethod
-from typing import List
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union
 
+import numpy as np
 import xarray as xr
 from nexusproto.DataTile_pb2 import NexusTile
 
+logger = logging.getLogger(__name__)
+
+# Largest slab of a variable read at once when looking for empty tiles; larger slabs are checked tile by tile.
+DEFAULT_EMPTY_TILE_MEMORY_LIMIT = 128 * 2 ** 20
+
 
 class TileSlicer(ABC):
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self,
+                 empty_tile_variables: Optional[Union[str, List[str]]] = None,
+                 empty_tile_memory_limit: int = DEFAULT_EMPTY_TILE_MEMORY_LIMIT,
+                 *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+        # When set, tiles in which all of these variables are NaN (i.e. the tiles EmptyTileFilter would discard) are
+        # not generated at all. Finding them costs one read of the variables, which pays off for sparse granules.
+        if isinstance(empty_tile_variables, str):
+            try:
+                empty_tile_variables = json.loads(empty_tile_variables)
+            except ValueError:
+                pass
+        if isinstance(empty_tile_variables, str):
+            empty_tile_variables = [empty_tile_variables]
+        self._empty_tile_variables = empty_tile_variables or []
+        self._empty_tile_memory_limit = int(empty_tile_memory_limit)
+
         self._granule_name = None
         self._current_tile_spec_index = 0
         self._tile_spec_list: List[str] = []
@@ -46,11 +70,74 @@ class TileSlicer(ABC):
 
     def generate_tiles(self, dataset: xr.Dataset, granule_name: str = None):
         self._granule_name = granule_name
-        dimensions = dataset.dims
-        self._tile_spec_list = self._generate_slices(dimensions)
+        self._current_tile_spec_index = 0
+        self._tile_spec_list = self._generate_dataset_slices(dataset)
+
+        if self._empty_tile_variables:
+            self._tile_spec_list = self._remove_empty_slices(dataset, self._tile_spec_list)
 
         return self
 
+    def _generate_dataset_slices(self, dataset: xr.Dataset) -> List[str]:
+        return self._generate_slices(dataset.sizes)
+
+    def _remove_empty_slices(self, dataset: xr.Dataset, tile_specs: List[str]) -> List[str]:
+        remaining = tile_specs
+        non_empty = set()
+
+        for variable_name in self._empty_tile_variables:
+            variable = dataset[variable_name]
+            if not np.issubdtype(variable.dtype, np.floating):
+                # Without NaN no tile of this variable can be empty.
+                return tile_specs
+            non_empty.update(self._non_empty_slices(variable, remaining))
+            remaining = [spec for spec in remaining if spec not in non_empty]
+            if not remaining:
+                break
+
+        result = [spec for spec in tile_specs if spec in non_empty]
+        logger.info(f'Skipped {len(tile_specs) - len(result)} empty tiles out of {len(tile_specs)}')
+        return result
+
+    def _non_empty_slices(self, variable: xr.DataArray, tile_specs: List[str]) -> List[str]:
+        """
+        Returns the specs of the tiles with at least one non-NaN value of the variable. Tiles sharing the leading
+        length-1 dimensions of the variable (e.g. a time step) are checked on a single read of that slab.
+        """
+        slabs = OrderedDict()
+        for spec in tile_specs:
+            slices = self._convert_spec_to_slices(spec)
+            slices = [slices[dim] for dim in variable.dims]
+            outer_count = 0
+            while outer_count < len(slices) - 1 and slices[outer_count].stop - slices[outer_count].start == 1:
+                outer_count += 1
+            outer_key = tuple((s.start, s.stop) for s in slices[:outer_count])
+            slabs.setdefault(outer_key, []).append((spec, slices))
+
+        non_empty = []
+        for outer_key, tiles in slabs.items():
+            outer_count = len(outer_key)
+            slab_bytes = int(np.prod(variable.shape[outer_count:])) * variable.dtype.itemsize
+            if len(tiles) > 1 and slab_bytes <= self._empty_tile_memory_limit:
+                outer = {dim: slice(start, stop) for dim, (start, stop) in zip(variable.dims, outer_key)}
+                valid = ~np.isnan(np.asarray(variable[outer].values))
+                for spec, slices in tiles:
+                    if valid[(slice(None),) * outer_count + tuple(slices[outer_count:])].any():
+                        non_empty.append(spec)
+            else:
+                for spec, slices in tiles:
+                    if not np.isnan(np.asarray(variable[dict(zip(variable.dims, slices))].values)).all():
+                        non_empty.append(spec)
+        return non_empty
+
+    @staticmethod
+    def _convert_spec_to_slices(spec: str) -> Dict[str, slice]:
+        dim_to_slice = {}
+        for dimension in spec.split(','):
+            name, start, stop = dimension.split(':')
+            dim_to_slice[name] = slice(int(start), int(stop))
+        return dim_to_slice
+
     @abstractmethod
     def _generate_slices(self, dimensions):
         pass
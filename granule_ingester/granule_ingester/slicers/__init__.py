@@ -14,4 +14,5 @@
 # limitations under the License.
 
 from granule_ingester.slicers.SliceFileByStepSize import SliceFileByStepSize
+from granule_ingester.slicers.SliceFileByChunks import SliceFileByChunks
 from granule_ingester.slicers.TileSlicer import TileSlicer
@@ -31,6 +31,7 @@ from cassandra.query import BatchStatement, ConsistencyLevel
 from nexusproto.DataTile_pb2 import NexusTile, TileData
 
 from granule_ingester.exceptions import CassandraFailedHealthCheckError, CassandraLostConnectionError
+from granule_ingester.processors.CompactShapedArray import compact_shaped_array
 from granule_ingester.writers.DataStore import DataStore
 
 from typing import List
@@ -51,12 +52,14 @@ class TileModel(Model):
 
 
 class CassandraStore(DataStore):
-    def __init__(self, contact_points=None, port=9042, keyspace='nexustiles', username=None, password=None):
+    def __init__(self, contact_points=None, port=9042, keyspace='nexustiles', username=None, password=None,
+                 compact_elevation=False):
         self._contact_points = contact_points
         self._username = username
         self._password = password
         self._port = port
         self._keyspace = keyspace
+        self._compact_elevation = compact_elevation
         self._session = None
 
     async def health_check(self) -> bool:
@@ -108,7 +111,7 @@ class CassandraStore(DataStore):
     async def save_data(self, tile: NexusTile) -> None:
         try:
             tile_id = uuid.UUID(tile.summary.tile_id)
-            serialized_tile_data = TileData.SerializeToString(tile.tile)
+            serialized_tile_data = self._serialize_tile_data(tile)
             prepared_query = self._session.prepare("INSERT INTO sea_surface_temp (tile_id, tile_blob) VALUES (?, ?)")
             await self._execute_query_async(self._session, prepared_query,
                                             [tile_id, bytearray(serialized_tile_data)])
@@ -138,7 +141,7 @@ class CassandraStore(DataStore):
 
                 for tile in batch:
                     tile_id = uuid.UUID(tile.summary.tile_id)
-                    serialized_tile_data = TileData.SerializeToString(tile.tile)
+                    serialized_tile_data = self._serialize_tile_data(tile)
 
                     cassandra_future = self._session.execute_async(prepared_query, [tile_id, bytearray(serialized_tile_data)])
                     asyncio_future = asyncio.Future()
@@ -160,6 +163,15 @@ class CassandraStore(DataStore):
 
         logger.info(f'Wrote {len(tiles)} tiles to Cassandra in {str(datetime.now() - thetime)} seconds')
 
+    def _serialize_tile_data(self, tile: NexusTile) -> bytes:
+        if self._compact_elevation:
+            tile_type = tile.tile.WhichOneof('tile_type')
+            tile_data = getattr(tile.tile, tile_type) if tile_type else None
+            if tile_data is not None and hasattr(tile_data, 'elevation'):
+                # Tiles from a single depth or height level carry the same elevation in every cell.
+                compact_shaped_array(tile_data.elevation)
+        return TileData.SerializeToString(tile.tile)
+
     @staticmethod
     async def _execute_query_async(session: Session, query, parameters=None):
         cassandra_future = session.execute_async(query, parameters)
@@ -0,0 +1,78 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import unittest
+
+import numpy as np
+import xarray as xr
+
+from granule_ingester.pipeline.BatchScheduler import BatchScheduler, estimate_tile_bytes, slab_group_size, \
+    TILE_OVERHEAD_BYTES
+
+
+class TestBatchScheduler(unittest.TestCase):
+
+    def test_small_granule_is_spread_over_workers(self):
+        scheduler = BatchScheduler(workers=16)
+        batches = scheduler.make_batches(list(range(300)), bytes_per_tile=10000)
+
+        self.assertEqual(5, len(batches[0]))
+        self.assertEqual(60, len(batches))
+
+    def test_large_tiles_limit_batch_size(self):
+        scheduler = BatchScheduler(workers=2)
+        self.assertEqual(4, scheduler.batch_size(10000, bytes_per_tile=16 * 2 ** 20))
+
+    def test_tile_time_limits_batch_size(self):
+        scheduler = BatchScheduler(workers=1, seconds_per_tile=0.5)
+        self.assertEqual(4, scheduler.batch_size(10000, bytes_per_tile=1000))
+
+    def test_batches_keep_slabs_together(self):
+        scheduler = BatchScheduler(workers=2)
+        batches = scheduler.make_batches(list(range(1000)), bytes_per_tile=1000, group_size=40)
+
+        self.assertEqual(120, len(batches[0]))
+        self.assertEqual(5, len(scheduler.make_batches(list(range(10)), bytes_per_tile=1000, group_size=40)))
+
+    def test_slab_group_size(self):
+        specs = [f'time:{t}:{t + 1},lat:{lat}:{lat + 10},lon:0:20' for t in range(3) for lat in range(0, 40, 10)]
+
+        self.assertEqual(4, slab_group_size(specs))
+        self.assertEqual(1, slab_group_size(['lat:0:10,lon:0:20', 'lat:10:20,lon:0:20']))
+        self.assertEqual(1, slab_group_size([]))
+
+    def test_run_unordered_yields_in_completion_order(self):
+        scheduler = BatchScheduler(workers=2, child_concurrency=1)
+
+        async def submit(batch):
+            await asyncio.sleep(batch[0])
+            return batch[0]
+
+        async def collect():
+            return [r async for r in scheduler.run_unordered(submit, [[0.03], [0.0], [0.01]])]
+
+        self.assertEqual([0.0, 0.01, 0.03], asyncio.run(collect()))
+
+    def test_estimate_tile_bytes(self):
+        ds = xr.Dataset({'a': (('time', 'lat', 'lon'), np.zeros((2, 100, 100), dtype=np.float32)),
+                         'b': (('lat', 'lon'), np.zeros((100, 100), dtype=np.int8))})
+
+        self.assertEqual(10 * 20 * 4 + TILE_OVERHEAD_BYTES, estimate_tile_bytes(ds, 'time:0:1,lat:0:10,lon:20:40'))
+        self.assertEqual(2 * 10 * 20 * 4 + TILE_OVERHEAD_BYTES, estimate_tile_bytes(ds, 'lat:0:10,lon:20:40'))
+
+
+if __name__ == '__main__':
+    unittest.main()
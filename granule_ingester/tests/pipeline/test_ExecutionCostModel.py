@@ -0,0 +1,49 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+from granule_ingester.pipeline.ExecutionCostModel import ExecutionCostModel, ExecutionMode, MAX_THREADED_TILES
+
+
+class TestExecutionCostModel(unittest.TestCase):
+
+    def test_small_granules_use_threads(self):
+        model = ExecutionCostModel()
+        self.assertEqual(ExecutionMode.THREAD, model.choose(tile_count=4, workers=8))
+
+    def test_large_granules_use_processes(self):
+        model = ExecutionCostModel()
+        self.assertEqual(ExecutionMode.PROCESS, model.choose(tile_count=400, workers=8))
+        self.assertEqual(ExecutionMode.PROCESS, model.choose(tile_count=MAX_THREADED_TILES + 1, workers=1))
+
+    def test_measurements_move_the_threshold(self):
+        model = ExecutionCostModel()
+        self.assertEqual(ExecutionMode.PROCESS, model.choose(tile_count=200, workers=8))
+
+        # A cheap pool and expensive tiles make threads a bad choice even for small granules.
+        model.record_process_run(tile_count=100, processes=8, wall_seconds=5.5, worker_seconds=40)
+        model.record_thread_run(tile_count=10, wall_seconds=10)
+        self.assertEqual(ExecutionMode.PROCESS, model.choose(tile_count=10, workers=8))
+
+        # Threads running well in parallel make them worthwhile for larger granules.
+        model = ExecutionCostModel()
+        for _ in range(20):
+            model.record_thread_run(tile_count=200, wall_seconds=2.5)
+        self.assertEqual(ExecutionMode.THREAD, model.choose(tile_count=200, workers=8))
+
+
+if __name__ == '__main__':
+    unittest.main()
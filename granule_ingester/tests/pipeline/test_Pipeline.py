@@ -57,6 +57,48 @@ class TestPipeline(unittest.TestCase):
         self.assertEqual(type(pipeline._tile_processors[0]), EccoReadingProcessor)
         self.assertEqual(type(pipeline._tile_processors[1]), GenerateTileId)
 
+    def test_pipeline_cache(self):
+        config_template = """
+granule:
+  resource: {resource}
+slicer:
+  name: sliceFileByStepSize
+  dimension_step_sizes:
+    time: 1
+    lat: 10
+    lon: 10
+processors:
+  - name: generateTileId
+"""
+        first = Pipeline.from_string(config_str=config_template.format(resource='/data/granule_1.nc'),
+                                     data_store_factory=DataStore,
+                                     metadata_store_factory=MetadataStore)
+        second = Pipeline.from_string(config_str=config_template.format(resource='/data/granule_2.nc'),
+                                      data_store_factory=DataStore,
+                                      metadata_store_factory=MetadataStore)
+
+        self.assertIs(first._slicer, second._slicer)
+        self.assertIs(first._tile_processors, second._tile_processors)
+        self.assertEqual('/data/granule_1.nc', first._granule_loader._resource)
+        self.assertEqual('/data/granule_2.nc', second._granule_loader._resource)
+
+        other = Pipeline.from_string(config_str=config_template.format(resource='/data/granule_3.nc')
+                                     .replace('lat: 10', 'lat: 20'),
+                                     data_store_factory=DataStore,
+                                     metadata_store_factory=MetadataStore)
+        self.assertIsNot(first._slicer, other._slicer)
+
+    def test_parse_json_config(self):
+        config_str = '{"granule": {"resource": "/data/granule.nc"}, ' \
+                     '"slicer": {"name": "sliceFileByStepSize", "dimension_step_sizes": {"time": 1}}, ' \
+                     '"processors": [{"name": "generateTileId"}]}'
+        pipeline = Pipeline.from_string(config_str=config_str,
+                                        data_store_factory=DataStore,
+                                        metadata_store_factory=MetadataStore)
+
+        self.assertEqual(type(pipeline._slicer), SliceFileByStepSize)
+        self.assertEqual(type(pipeline._tile_processors[0]), GenerateTileId)
+
     def test_parse_module(self):
         module_mappings = {
             "sliceFileByStepSize": SliceFileByStepSize
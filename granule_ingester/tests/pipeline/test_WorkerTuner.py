@@ -0,0 +1,88 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import unittest
+
+from granule_ingester.pipeline.WorkerTuner import WorkerTuner
+
+MB = 2 ** 20
+
+
+class TestWorkerTuner(unittest.TestCase):
+
+    def setUp(self):
+        self._cgroup = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._cgroup.cleanup()
+
+    def _write(self, name, content):
+        path = os.path.join(self._cgroup.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def test_cgroup_v2_limits(self):
+        self._write('cpu.max', '250000 100000\n')
+        self._write('memory.max', str(2048 * MB))
+        tuner = WorkerTuner(cgroup_root=self._cgroup.name)
+
+        self.assertEqual(2.5, tuner.cpu_limit)
+        self.assertEqual(2048 * MB, tuner.memory_limit)
+        self.assertEqual(3, tuner.settings()[0])
+
+    def test_cgroup_v1_limits(self):
+        self._write('cpu/cpu.cfs_quota_us', '400000')
+        self._write('cpu/cpu.cfs_period_us', '100000')
+        self._write('memory/memory.limit_in_bytes', str(4096 * MB))
+        tuner = WorkerTuner(cgroup_root=self._cgroup.name)
+
+        self.assertEqual(4.0, tuner.cpu_limit)
+        self.assertEqual(4096 * MB, tuner.memory_limit)
+
+    def test_memory_bounds_processes(self):
+        self._write('cpu.max', '800000 100000')
+        self._write('memory.max', str(1024 * MB))
+        tuner = WorkerTuner(cgroup_root=self._cgroup.name)
+
+        tuner.record(tile_count=100, worker_seconds=10,
+                     worker_baseline_memory=200 * MB, worker_peak_memory=300 * MB)
+
+        # 75% of 1024MB leaves room for two workers of 300MB each
+        self.assertEqual(2, tuner.settings()[0])
+        # The peak memory of a worker is not divided among the tiles it processed.
+        self.assertEqual(100 * MB, tuner.worker_memory)
+        self.assertEqual(100.0, tuner.metrics()['worker_memory_mb'])
+
+    def test_concurrency_follows_tile_time(self):
+        self._write('cpu.max', '200000 100000')
+        self._write('memory.max', str(8192 * MB))
+        tuner = WorkerTuner(max_concurrency=16, cgroup_root=self._cgroup.name)
+
+        tuner.record(tile_count=1000, worker_seconds=5,
+                     worker_baseline_memory=100 * MB, worker_peak_memory=110 * MB)
+        self.assertEqual(10, tuner.settings()[1])
+
+        for _ in range(20):
+            tuner.record(tile_count=10, worker_seconds=10,
+                         worker_baseline_memory=100 * MB, worker_peak_memory=110 * MB)
+        self.assertEqual(1, tuner.settings()[1])
+        self.assertEqual(20 + 1, tuner.metrics()['granules_measured'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+
+import numpy as np
+from nexusproto.serialization import from_shaped_array, to_shaped_array
+
+from granule_ingester.processors.CompactShapedArray import (compact_shaped_array, expand_shaped_array,
+                                                            from_compact_shaped_array, is_compact_shaped_array,
+                                                            to_constant_shaped_array)
+
+
+class TestCompactShapedArray(unittest.TestCase):
+
+    def test_constant_array(self):
+        shaped_array = to_constant_shaped_array((30, 30), 10.0)
+
+        self.assertEqual([30, 30], shaped_array.shape)
+        self.assertEqual('float64', shaped_array.dtype)
+        self.assertTrue(is_compact_shaped_array(shaped_array))
+        self.assertLess(len(shaped_array.SerializeToString()), 200)
+
+        array = from_compact_shaped_array(shaped_array)
+        self.assertEqual((30, 30), array.shape)
+        self.assertTrue(np.array_equal(np.full((30, 30), 10.0), array))
+
+    def test_full_arrays_are_unchanged(self):
+        values = np.arange(12, dtype=np.float32).reshape((3, 4))
+        shaped_array = to_shaped_array(values)
+
+        self.assertFalse(is_compact_shaped_array(shaped_array))
+        self.assertFalse(compact_shaped_array(shaped_array))
+        self.assertFalse(expand_shaped_array(shaped_array))
+        self.assertTrue(np.array_equal(values, from_compact_shaped_array(shaped_array)))
+        self.assertFalse(is_compact_shaped_array(to_shaped_array(np.array(5.0))))
+
+    def test_compact_and_expand(self):
+        shaped_array = to_shaped_array(np.full((1, 5, 5), -25, dtype=np.int32))
+
+        self.assertTrue(compact_shaped_array(shaped_array))
+        self.assertTrue(is_compact_shaped_array(shaped_array))
+        self.assertEqual([1, 5, 5], shaped_array.shape)
+        self.assertEqual('int32', shaped_array.dtype)
+
+        self.assertTrue(expand_shaped_array(shaped_array))
+        expanded = from_shaped_array(shaped_array)
+        self.assertEqual(np.int32, expanded.dtype)
+        self.assertTrue(np.array_equal(np.full((1, 5, 5), -25), expanded))
+
+    def test_compact_nan(self):
+        shaped_array = to_shaped_array(np.full((4, 4), np.nan))
+        self.assertTrue(compact_shaped_array(shaped_array))
+        self.assertTrue(np.isnan(from_compact_shaped_array(shaped_array)).all())
+
+        values = np.full((4, 4), 1.0)
+        values[2, 3] = np.nan
+        self.assertFalse(compact_shaped_array(to_shaped_array(values)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import unittest
+
+import numpy as np
+import xarray as xr
+from nexusproto import DataTile_pb2 as nexusproto
+from nexusproto.serialization import from_shaped_array, to_shaped_array
+
+from granule_ingester.processors.GranuleMetadata import GranuleMetadata
+from granule_ingester.processors.kelvintocelsius import KelvinToCelsius
+
+
+class TestGranuleMetadata(unittest.TestCase):
+
+    def make_dataset(self):
+        return xr.Dataset({
+            'sst': xr.DataArray(np.full((2, 2), 300.0, dtype=np.float32), dims=('lat', 'lon'),
+                                attrs={'units': 'Kelvin', 'standard_name': 'sea_surface_temperature'}),
+            'wind': xr.DataArray(np.ones((2, 2)), dims=('lat', 'lon'), attrs={'Units': 'm s-1'}),
+            'mask': xr.DataArray(np.ones((2, 2)), dims=('lat', 'lon'), attrs={'missing_value': -1}),
+        })
+
+    def test_lookups(self):
+        ds = self.make_dataset()
+        metadata = GranuleMetadata.of(ds)
+
+        self.assertIs(metadata, GranuleMetadata.of(ds))
+        self.assertIsNot(metadata, GranuleMetadata.of(ds.copy()))
+
+        self.assertEqual(['Kelvin'], metadata.units['sst'])
+        self.assertEqual(['m s-1'], metadata.units['wind'])
+        self.assertEqual([], metadata.units['mask'])
+
+        self.assertIsNone(metadata.fill_values['sst'])
+        self.assertEqual(-1, metadata.fill_values['mask'])
+        ds['sst'].encoding['_FillValue'] = -32768
+        self.assertEqual(-32768, GranuleMetadata(ds).fill_values['sst'])
+
+        self.assertTrue(metadata.is_kelvin(json.dumps('sst')))
+        self.assertTrue(metadata.is_kelvin(json.dumps(['wind', 'sst'])))
+        self.assertFalse(metadata.is_kelvin(json.dumps(['wind', 'mask'])))
+        self.assertFalse(metadata.is_kelvin(json.dumps('missing')))
+
+        self.assertEqual('["sea_surface_temperature", null]', metadata.standard_names_json(json.dumps(['sst', 'mask'])))
+        with self.assertRaises(KeyError):
+            metadata.standard_names_json(json.dumps('missing'))
+
+    def test_kelvin_to_celsius(self):
+        ds = self.make_dataset()
+        processor = KelvinToCelsius()
+        processor.prepare(ds)
+
+        for variable, expected in (('sst', np.float32(300.0) - np.float32(273.15)), ('wind', 1.0)):
+            tile = nexusproto.NexusTile()
+            tile.summary.data_var_name = json.dumps(variable)
+            tile.tile.grid_tile.variable_data.CopyFrom(to_shaped_array(ds[variable].values))
+
+            output = processor.process(tile, dataset=ds)
+            data = from_shaped_array(output.tile.grid_tile.variable_data)
+
+            self.assertEqual(ds[variable].dtype, data.dtype)
+            self.assertTrue(np.array_equal(np.full((2, 2), expected, dtype=data.dtype), data))
+
+
+if __name__ == '__main__':
+    unittest.main()
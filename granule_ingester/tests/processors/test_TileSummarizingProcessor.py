@@ -17,8 +17,10 @@ import json
 import unittest
 from os import path
 
+import numpy
 import xarray as xr
 from granule_ingester.processors import TileSummarizingProcessor
+from granule_ingester.processors.TileSummarizingProcessor import finite_min_max, nan_min_max_count
 from granule_ingester.processors.reading_processors import GridMultiVariableReadingProcessor
 from granule_ingester.processors.reading_processors.GridReadingProcessor import GridReadingProcessor
 from nexusproto import DataTile_pb2 as nexusproto
@@ -123,4 +125,44 @@ class TestTileSummarizingProcessor(unittest.TestCase):
             new_tile = tile_summary_processor.process(tile=output_tile, dataset=ds)
             self.assertEqual('[null, null, null, null, null, null, null, null, null, null, null]', new_tile.summary.standard_name, f'wrong new_tile.summary.standard_name')
             self.assertEqual([None for _ in range(11)], json.loads(new_tile.summary.standard_name), f'unable to convert new_tile.summary.standard_name from JSON')
-            self.assertTrue(abs(new_tile.summary.stats.mean - 0.26523) < 0.001, f'mean value is not close expected: 0.26523. actual: {new_tile.summary.stats.mean}')
\ No newline at end of file
+            self.assertTrue(abs(new_tile.summary.stats.mean - 0.26523) < 0.001, f'mean value is not close expected: 0.26523. actual: {new_tile.summary.stats.mean}')
+
+
+class TestSummaryKernel(unittest.TestCase):
+
+    def setUp(self):
+        rng = numpy.random.default_rng(0)
+        self.latitudes = numpy.linspace(-80, 80, 12, dtype=numpy.float32)
+        self.latitudes[3] = numpy.nan
+        self.longitudes = numpy.linspace(0, 100, 9, dtype=numpy.float32)
+        self.data = rng.normal(size=(12, 9)).astype(numpy.float32)
+        self.data[rng.random(self.data.shape) < 0.3] = numpy.nan
+        self.data[0, 0] = numpy.inf
+
+    def test_matches_masked_array_statistics(self):
+        masked_latitudes = numpy.ma.masked_invalid(self.latitudes)
+        self.assertEqual((numpy.nanmin(masked_latitudes).item(), numpy.nanmax(masked_latitudes).item()),
+                         finite_min_max(self.latitudes))
+        self.assertEqual((numpy.nanmin(self.data).item(), numpy.nanmax(self.data).item(),
+                          self.data.size - numpy.count_nonzero(numpy.isnan(self.data))),
+                         nan_min_max_count(self.data))
+
+        weights = numpy.cos(numpy.radians(numpy.repeat(masked_latitudes, len(self.longitudes))))
+        expected = numpy.ma.average(numpy.ma.masked_invalid(self.data).flatten(), weights=weights).item()
+        self.assertEqual(expected, TileSummarizingProcessor.calculate_mean_for_grid_tile(
+            self.data, self.latitudes, self.longitudes))
+
+        swath_latitudes = numpy.repeat(self.latitudes, len(self.longitudes)).reshape(self.data.shape)
+        expected = numpy.ma.average(numpy.ma.masked_invalid(self.data),
+                                    weights=numpy.cos(numpy.radians(numpy.ma.masked_invalid(swath_latitudes))))
+        self.assertEqual(expected.item(), TileSummarizingProcessor.calculate_mean_for_swath_tile(
+            self.data, swath_latitudes))
+
+    def test_all_nan_data(self):
+        data = numpy.full((12, 9), numpy.nan)
+
+        minimum, maximum, count = nan_min_max_count(data)
+        self.assertTrue(numpy.isnan(minimum) and numpy.isnan(maximum))
+        self.assertEqual(0, count)
+        self.assertEqual(0.0, TileSummarizingProcessor.calculate_mean_for_grid_tile(
+            data, self.latitudes, self.longitudes))
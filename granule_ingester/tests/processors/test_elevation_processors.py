@@ -22,6 +22,7 @@ import xarray as xr
 from nexusproto import DataTile_pb2 as nexusproto
 from nexusproto.serialization import from_shaped_array
 
+from granule_ingester.processors.CompactShapedArray import from_compact_shaped_array, is_compact_shaped_array
 from granule_ingester.processors.ElevationBounds import ElevationBounds
 from granule_ingester.processors.ElevationOffset import ElevationOffset
 from granule_ingester.processors.ElevationRange import ElevationRange
@@ -184,3 +185,51 @@ class TestElevationProcessors(unittest.TestCase):
 
             self.assertEqual(expected_elevations[i], processed_tile.tile.grid_tile.min_elevation)
             self.assertEqual(expected_elevations[i], processed_tile.tile.grid_tile.max_elevation)
+
+    def test_compact_elevation_range(self):
+        tiles, ds = self.read_tiles_no_coord()
+
+        processor = ElevationRange('elevation', 10, 30, 10, compact_elevation=True)
+
+        for i in range(len(tiles)):
+            processed_tile = processor.process(tiles[i], ds)
+            elevation = processed_tile.tile.grid_tile.elevation
+
+            self.assertTrue(is_compact_shaped_array(elevation))
+            self.assertEqual([5, 5], elevation.shape)
+            self.assertTrue(np.array_equal(np.full((5, 5), 10.0 + 10 * i), from_compact_shaped_array(elevation)))
+
+    def test_compact_elevation_bounds(self):
+        tiles, ds = self.read_tiles()
+
+        processor = ElevationBounds('elevation', 'z_bnds', compact_elevation=True)
+
+        for i in range(len(tiles)):
+            processed_tile = processor.process(tiles[i], ds)
+            elevation = processed_tile.tile.grid_tile.elevation
+
+            self.assertTrue(is_compact_shaped_array(elevation))
+            self.assertTrue(np.array_equal(np.full((5, 5), 10 + 10 * i), from_compact_shaped_array(elevation)))
+
+    def test_compact_reader_elevation(self):
+        reading_processor = GridReadingProcessor('data_array', 'latitude', 'longitude', time='time', height='elevation',
+                                                 compact_elevation=True)
+        granule_path = path.join(path.dirname(__file__), '../granules/dummy_3d_gridded_granule.nc')
+
+        input_tile = nexusproto.NexusTile()
+        input_tile.summary.granule = granule_path
+        dimensions_to_slices = {
+            'time': slice(0, 1),
+            'elevation': slice(1, 2),
+            'latitude': slice(15, 20),
+            'longitude': slice(0, 5),
+        }
+
+        with xr.open_dataset(granule_path) as ds:
+            output_tile = reading_processor._generate_tile(ds, dimensions_to_slices, input_tile)
+
+        elevation = output_tile.tile.grid_tile.elevation
+        self.assertTrue(is_compact_shaped_array(elevation))
+        self.assertEqual([5, 5], elevation.shape)
+        self.assertTrue(np.array_equal(np.full((5, 5), 20), from_compact_shaped_array(elevation)))
+        self.assertEqual(20, output_tile.tile.grid_tile.min_elevation)
@@ -13,6 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import json
+import threading
 import unittest
 import warnings
 from os import path
@@ -234,5 +235,34 @@ class TestCalendars(unittest.TestCase):
         )
 
 
+class TestBandReads(unittest.TestCase):
+
+    def test_threaded_band_reads_match_sequential_reads(self):
+        rng = np.random.default_rng(0)
+        ds = xr.Dataset(
+            {
+                'b1': (('time', 'lat', 'lon'), rng.random((1, 6, 8)).astype(np.float32)),
+                'b2': (('time', 'lat', 'lon'), rng.random((1, 6, 8))),
+                'b3': (('time', 'lat', 'lon'), rng.random((1, 6, 8)).astype(np.float32))
+            },
+            coords={'time': np.array(['2023-06-12'], dtype='datetime64[ns]'), 'lat': np.arange(6.0), 'lon': np.arange(8.0)}
+        )
+        dimensions_to_slices = {'time': slice(0, 1), 'lat': slice(2, 6), 'lon': slice(0, 5)}
+        expected = np.array([ds[band][0:1, 2:6, 0:5].data for band in ['b1', 'b2', 'b3']]).transpose(1, 2, 3, 0)
+
+        for threads in [1, 3]:
+            reading_processor = GridMultiVariableReadingProcessor('["b1", "b2", "b3"]', 'lat', 'lon', time='time',
+                                                                  band_read_threads=threads)
+            thread_count = threading.active_count()
+            output_tile = reading_processor._generate_tile(ds, dimensions_to_slices, nexusproto.NexusTile())
+            # The band read threads are shut down once the tile is read.
+            self.assertEqual(thread_count, threading.active_count())
+            data = from_shaped_array(output_tile.tile.grid_multi_variable_tile.variable_data)
+
+            self.assertEqual(np.float64, data.dtype)
+            np.testing.assert_array_equal(expected, data)
+            self.assertEqual(['time', 'lat', 'lon', 'band'], list(output_tile.summary.data_dim_names))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -13,6 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import pickle
 import unittest
 import warnings
 from os import path
@@ -471,5 +472,122 @@ class TestCalendars(unittest.TestCase):
         )
 
 
+
+class TestPreparedGranule(unittest.TestCase):
+
+    def setUp(self):
+        self.ds = xr.Dataset(
+            {'data': (('time', 'depth', 'lat', 'lon'), np.random.rand(2, 3, 4, 4))},
+            coords={
+                'time': np.array(['2023-06-12', '2023-06-13'], dtype='datetime64[ns]'),
+                'depth': [5.0, 10.0, 20.0],
+                'lat': np.arange(4.0),
+                'lon': np.arange(4.0)
+            }
+        )
+
+    def test_depth_is_inverted_once(self):
+        reading_processor = GridReadingProcessor('data', 'lat', 'lon', depth='depth', time='time')
+        reading_processor.prepare(self.ds)
+
+        for _ in range(3):
+            for i, expected_elevation in enumerate([-5.0, -10.0, -20.0]):
+                dimensions_to_slices = {'time': slice(1, 2), 'depth': slice(i, i + 1),
+                                        'lat': slice(0, 2), 'lon': slice(0, 4)}
+                output_tile = reading_processor._generate_tile(self.ds, dimensions_to_slices, nexusproto.NexusTile())
+
+                self.assertEqual(expected_elevation, output_tile.tile.grid_tile.min_elevation)
+                self.assertEqual(1686614400, output_tile.tile.grid_tile.time)
+                np.testing.assert_array_equal([0.0, 1.0], from_shaped_array(output_tile.tile.grid_tile.latitude))
+
+        np.testing.assert_array_equal([5.0, 10.0, 20.0], self.ds['depth'].values)
+
+    def test_prepared_processor_can_be_pickled(self):
+        reading_processor = GridReadingProcessor('data', 'lat', 'lon', depth='depth', time='time')
+        reading_processor.prepare(self.ds)
+        unpickled = pickle.loads(pickle.dumps(reading_processor))
+
+        self.assertEqual({}, unpickled._contexts)
+
+    def test_coordinates_are_cached_across_tiles_and_granules(self):
+        reading_processor = GridReadingProcessor('data', 'lat', 'lon', depth='depth', time='time')
+        dimensions_to_slices = {'time': slice(0, 1), 'depth': slice(0, 1), 'lat': slice(0, 2), 'lon': slice(0, 4)}
+
+        reading_processor._generate_tile(self.ds, dimensions_to_slices, nexusproto.NexusTile())
+        self.assertEqual(2, len(reading_processor.coordinate_cache))
+
+        # Another time step, and another granule with the same coordinates, reuse the cached subsets.
+        next_granule = self.ds.copy(deep=True)
+        for ds, time_slice in [(self.ds, slice(1, 2)), (next_granule, slice(0, 1))]:
+            dimensions_to_slices['time'] = time_slice
+            output_tile = reading_processor._generate_tile(ds, dimensions_to_slices, nexusproto.NexusTile())
+            np.testing.assert_array_equal([0.0, 1.0], from_shaped_array(output_tile.tile.grid_tile.latitude))
+        self.assertEqual(2, len(reading_processor.coordinate_cache))
+
+        # A granule with different coordinates does not.
+        shifted_granule = self.ds.assign_coords(lat=self.ds['lat'] + 0.5)
+        output_tile = reading_processor._generate_tile(shifted_granule, dimensions_to_slices, nexusproto.NexusTile())
+        np.testing.assert_array_equal([0.5, 1.5], from_shaped_array(output_tile.tile.grid_tile.latitude))
+        self.assertEqual(3, len(reading_processor.coordinate_cache))
+
+    def test_pickled_processor_only_shares_current_coordinates(self):
+        reading_processor = GridReadingProcessor('data', 'lat', 'lon', depth='depth', time='time')
+        empty_size = len(pickle.dumps(reading_processor))
+
+        lats = np.arange(0, 180, 0.25)
+        lons = np.arange(0, 360, 0.25)
+        granule = xr.Dataset({'data': (('lat', 'lon'), np.zeros((len(lats), len(lons))))},
+                             coords={'lat': lats, 'lon': lons})
+        reading_processor.prepare(granule)
+        for lat in range(0, len(lats), 30):
+            for lon in range(0, len(lons), 30):
+                dimensions_to_slices = {'lat': slice(lat, lat + 30), 'lon': slice(lon, lon + 30)}
+                reading_processor._coordinate_tile(granule, 'lat', dimensions_to_slices)
+                reading_processor._coordinate_tile(granule, 'lon', dimensions_to_slices)
+        dimensions_to_slices = {'time': slice(0, 1), 'depth': slice(0, 1), 'lat': slice(0, 2), 'lon': slice(0, 4)}
+        reading_processor._generate_tile(self.ds, dimensions_to_slices, nexusproto.NexusTile())
+        self.assertEqual(24 + 48 + 2, len(reading_processor.coordinate_cache))
+
+        # Without shared coordinates, workers get the bounds of the cache, not its entries.
+        unpickled = pickle.loads(pickle.dumps(reading_processor))
+        self.assertEqual(empty_size, len(pickle.dumps(reading_processor)))
+        self.assertLess(empty_size, 4096)
+        self.assertEqual(0, len(unpickled.coordinate_cache))
+        self.assertEqual(reading_processor.coordinate_cache._max_bytes, unpickled.coordinate_cache._max_bytes)
+
+        # The workers of a granule get the entries of its own coordinates only.
+        reading_processor.share_coordinate_cache(self.ds)
+        unpickled = pickle.loads(pickle.dumps(reading_processor))
+        self.assertEqual(2, len(unpickled.coordinate_cache))
+        self.assertLess(len(pickle.dumps(reading_processor)), 8192)
+
+        # The entries a worker adds are merged back into the processor of the main process.
+        dimensions_to_slices['lat'] = slice(2, 4)
+        unpickled._generate_tile(self.ds, dimensions_to_slices, nexusproto.NexusTile())
+        new_entries = unpickled.coordinate_cache.drain_new()
+        self.assertEqual(1, len(new_entries))
+        self.assertEqual([], unpickled.coordinate_cache.drain_new())
+        reading_processor.coordinate_cache.merge(new_entries)
+        self.assertIn(new_entries[0][0], reading_processor.coordinate_cache)
+
+    def test_slab_reads_match_tile_reads(self):
+        slab_processor = GridReadingProcessor('data', 'lat', 'lon', depth='depth', time='time')
+        tile_processor = GridReadingProcessor('data', 'lat', 'lon', depth='depth', time='time', slab_memory_limit=0)
+
+        for t in range(2):
+            for d in range(3):
+                for lat in range(0, 4, 2):
+                    dimensions_to_slices = {'time': slice(t, t + 1), 'depth': slice(d, d + 1),
+                                            'lat': slice(lat, lat + 2), 'lon': slice(1, 3)}
+                    expected = tile_processor._generate_tile(self.ds, dimensions_to_slices, nexusproto.NexusTile())
+                    actual = slab_processor._generate_tile(self.ds, dimensions_to_slices, nexusproto.NexusTile())
+                    self.assertEqual(expected.SerializeToString(), actual.SerializeToString())
+
+        outer_key, slab = slab_processor._get_context(self.ds).slabs['data']
+        self.assertEqual(((1, 2), (2, 3)), outer_key)
+        self.assertEqual((1, 1, 4, 4), slab.shape)
+        self.assertEqual({}, tile_processor._get_context(self.ds).slabs)
+
+
 if __name__ == '__main__':
     unittest.main()
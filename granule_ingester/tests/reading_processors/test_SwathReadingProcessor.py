@@ -16,8 +16,10 @@
 import unittest
 from os import path
 
+import numpy as np
 import xarray as xr
 from nexusproto import DataTile_pb2 as nexusproto
+from nexusproto.serialization import from_shaped_array
 
 from granule_ingester.processors.reading_processors import SwathReadingProcessor
 
@@ -72,3 +74,35 @@ class TestReadSmapData(unittest.TestCase):
             self.assertEqual([38, 1], output_tile.tile.swath_tile.variable_data.shape)
             self.assertEqual([38, 1], output_tile.tile.swath_tile.latitude.shape)
             self.assertEqual([38, 1], output_tile.tile.swath_tile.longitude.shape)
+
+
+class TestPreparedSwath(unittest.TestCase):
+
+    def setUp(self):
+        times = np.datetime64('2020-01-01T00:00:00', 'ns') + np.arange(12).reshape(3, 4).astype('timedelta64[s]')
+        self.ds = xr.Dataset(
+            {
+                'data': (('depth', 'row', 'cell'), np.random.rand(2, 3, 4)),
+                'lat': (('row', 'cell'), np.random.rand(3, 4)),
+                'lon': (('row', 'cell'), np.random.rand(3, 4)),
+                'time': (('row', 'cell'), times)
+            },
+            coords={'depth': [5.0, 10.0]}
+        )
+
+    def test_depth_and_time(self):
+        reading_processor = SwathReadingProcessor('data', 'lat', 'lon', time='time', depth='depth')
+        dimensions_to_slices = {'depth': slice(1, 2), 'row': slice(1, 3), 'cell': slice(0, 2)}
+        expected_times = np.ma.filled(SwathReadingProcessor._convert_to_timestamp(self.ds['time'][1:3, 0:2]), np.NaN)
+
+        for _ in range(3):
+            output_tile = reading_processor._generate_tile(self.ds, dimensions_to_slices, nexusproto.NexusTile())
+            swath_tile = output_tile.tile.swath_tile
+
+            self.assertEqual(-10.0, swath_tile.min_elevation)
+            np.testing.assert_array_equal(np.full((1, 2, 2), -10.0), from_shaped_array(swath_tile.elevation))
+            np.testing.assert_array_equal(expected_times, from_shaped_array(swath_tile.time))
+            self.assertEqual(1577836804, from_shaped_array(swath_tile.time)[0, 0])
+
+        np.testing.assert_array_equal([5.0, 10.0], self.ds['depth'].values)
+        self.assertIsNotNone(reading_processor._get_context(self.ds).epoch_times)
@@ -84,3 +84,18 @@ class TestReadWSWMData(unittest.TestCase):
         #                        np.ma.masked_invalid(from_shaped_array(results[0].tile.time_series_tile.variable_data))[
         #                            0, 0],
         #                        places=3)
+
+    def test_granule_reads_match_tile_reads(self):
+        granule_path = path.join(path.dirname(__file__), '../granules/not_empty_wswm.nc')
+        granule_processor = TimeSeriesReadingProcessor('Qout', 'lat', 'lon', time='time')
+        tile_processor = TimeSeriesReadingProcessor('Qout', 'lat', 'lon', time='time', slab_memory_limit=0)
+
+        with xr.open_dataset(granule_path, decode_cf=True) as ds:
+            for rivid in [slice(0, 1), slice(7, 8), slice(40, 43)]:
+                dimensions_to_slices = {'time': slice(0, 5832), 'rivid': rivid}
+                expected = tile_processor._generate_tile(ds, dimensions_to_slices, nexusproto.NexusTile())
+                actual = granule_processor._generate_tile(ds, dimensions_to_slices, nexusproto.NexusTile())
+                self.assertEqual(expected.SerializeToString(), actual.SerializeToString())
+
+            self.assertIn('Qout', granule_processor._get_context(ds).columns)
+            self.assertEqual({}, tile_processor._get_context(ds).columns)
@@ -0,0 +1,102 @@
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import importlib.util
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import xarray as xr
+
+from granule_ingester.exceptions import GranuleLoadingError
+from granule_ingester.granule_loaders import GranuleLoader
+from granule_ingester.slicers.SliceFileByChunks import SliceFileByChunks
+
+
+def _chunked_dataset():
+    ds = xr.Dataset(
+        {'sst': (('time', 'lat', 'lon'), np.arange(2 * 30 * 40, dtype=np.float32).reshape((2, 30, 40)))},
+        coords={'time': np.arange(2), 'lat': np.linspace(-10, 10, 30), 'lon': np.linspace(0, 20, 40)}
+    )
+    ds['sst'].encoding['chunks'] = (1, 10, 20)
+    return ds
+
+
+class TestSliceFileByChunks(unittest.TestCase):
+
+    def test_generate_tiles_uses_chunk_sizes(self):
+        slicer = SliceFileByChunks(variable='sst')
+        tiles = list(slicer.generate_tiles(_chunked_dataset(), granule_name='test.zarr'))
+
+        self.assertEqual(2 * 3 * 2, len(tiles))
+        self.assertIn('time:0:1,lat:10:20,lon:20:40', [tile.summary.section_spec for tile in tiles])
+
+    def test_requested_step_sizes_are_aligned(self):
+        slicer = SliceFileByChunks(dimension_step_sizes={'lat': 25, 'lon': 15})
+        steps = slicer._chunk_aligned_step_sizes(_chunked_dataset())
+
+        self.assertEqual({'time': 1, 'lat': 20, 'lon': 10}, steps)
+
+    def test_step_sizes_follow_each_granule(self):
+        slicer = SliceFileByChunks(variable='sst')
+        list(slicer.generate_tiles(_chunked_dataset(), granule_name='first.zarr'))
+
+        rechunked = _chunked_dataset()
+        rechunked['sst'].encoding['chunks'] = (2, 30, 40)
+        tiles = list(slicer.generate_tiles(rechunked, granule_name='second.zarr'))
+
+        self.assertEqual(['time:0:2,lat:0:30,lon:0:40'], [tile.summary.section_spec for tile in tiles])
+        self.assertEqual({}, slicer._dimension_step_sizes)
+
+    def test_missing_variable(self):
+        slicer = SliceFileByChunks(variable='foo')
+        with self.assertRaises(KeyError):
+            slicer.generate_tiles(_chunked_dataset())
+
+    def test_zarr_store_round_trip(self):
+        try:
+            import zarr  # noqa: F401
+        except ImportError:
+            self.skipTest('zarr is not installed')
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store_path = os.path.join(tmp, 'granule.zarr')
+            _chunked_dataset().to_zarr(store_path)
+
+            async def open_store():
+                async with GranuleLoader(resource=store_path + '/') as (dataset, granule_name):
+                    tiles = list(SliceFileByChunks().generate_tiles(dataset, granule_name))
+                    return granule_name, tiles
+
+            granule_name, tiles = asyncio.run(open_store())
+
+            self.assertEqual('granule.zarr', granule_name)
+            self.assertEqual(12, len(tiles))
+
+    def test_zarr_store_missing_backend(self):
+        def find_spec(name):
+            return None if name == 's3fs' else importlib_find_spec(name)
+
+        importlib_find_spec = importlib.util.find_spec
+        with mock.patch('importlib.util.find_spec', side_effect=find_spec):
+            with self.assertRaisesRegex(GranuleLoadingError, 's3fs'):
+                asyncio.run(GranuleLoader(resource='s3://bucket/granule.zarr').open())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -17,6 +17,7 @@ import asyncio
 import os
 import unittest
 from granule_ingester.slicers.TileSlicer import TileSlicer
+import numpy as np
 import xarray as xr
 
 
@@ -72,6 +73,23 @@ class TestTileSlicer(unittest.TestCase):
         for tile in generated_tiles:
             self.assertEqual(file_path, tile.summary.granule)
 
+    def test_skip_empty_tiles(self):
+        data = np.full((3, 8, 8), np.nan)
+        data[0, 0, 0] = 1.0
+        data[1, 5, 6] = 2.0
+        other = np.full((3, 8, 8), np.nan)
+        other[2, 7, 0] = 3.0
+        dataset = xr.Dataset({'data': (('time', 'lat', 'lon'), data), 'other': (('time', 'lat', 'lon'), other)})
+
+        expected_slices = ['time:0:1,lat:0:4,lon:0:4', 'time:1:2,lat:4:8,lon:4:8']
+        for memory_limit in [2 ** 20, 0]:
+            slicer = TestTileSlicer.ToyTileSlicer(empty_tile_variables='data', empty_tile_memory_limit=memory_limit)
+            self.assertEqual(expected_slices, slicer.generate_tiles(dataset)._tile_spec_list)
+
+        slicer = TestTileSlicer.ToyTileSlicer(empty_tile_variables='["data", "other"]')
+        self.assertEqual(['time:0:1,lat:0:4,lon:0:4', 'time:2:3,lat:4:8,lon:0:4', 'time:1:2,lat:4:8,lon:4:8'],
+                         slicer.generate_tiles(dataset)._tile_spec_list)
+
     # def test_download_s3_file(self):
     #     slicer = TestTileSlicer.ToyTileSlicer(resource=None)
     #